@@ -0,0 +1 @@
+"""Local benchmarks for the scheduler and platform services (see publish_bench)."""
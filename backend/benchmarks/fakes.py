@@ -0,0 +1,357 @@
+"""In-process fakes for Supabase PostgREST and the platform / LLM APIs.
+
+FakeUpstreams is an httpx transport handler: pass ``httpx.MockTransport(
+upstreams.handle)`` (and ``resolver=upstreams.resolve``) to
+services.http_client.open_clients() and every pooled client talks to the
+fakes instead of the network. Each fake host has a
+configurable latency and error rate, and every call is counted.
+
+MockTransport has no connection pool, so a HostProfile can set the pool's
+max_connections: requests beyond it wait for a free connection, as they
+would in httpx's HTTP/1.1 pool. ``in_flight`` then counts connections in
+use; without a limit it counts concurrent requests.
+"""
+
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SUPABASE_HOST = "supabase.bench"
+SUPABASE_URL = f"https://{SUPABASE_HOST}"
+IMAGE_URL = "https://images.bench/photo.png"
+# What fake hosts resolve to unless listed in FakeUpstreams.addresses; any
+# public address will do, nothing connects to it.
+PUBLIC_ADDRESS = "93.184.215.14"
+
+# 1x1 transparent PNG served for IMAGE_URL.
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "or", "and", "columns"}
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d\d-\d\dT")
+
+
+def _ts(value: Any) -> Any:
+    """Parse ISO timestamps so comparisons are chronological, not lexical."""
+    if isinstance(value, str) and _TIMESTAMP_RE.match(value):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _split_top(expr: str) -> List[str]:
+    """Split on commas that are not inside parentheses."""
+    parts, depth, current = [], 0, ""
+    for ch in expr:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _match(row: Dict[str, Any], column: str, expr: str) -> bool:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, value = expr.partition(".")
+    cell = row.get(column)
+
+    if op == "in":
+        result = str(cell) in {v.strip('"') for v in value.strip("()").split(",") if v}
+    elif op == "is":
+        result = cell is None if value == "null" else cell is (value == "true")
+    elif op == "eq":
+        a, b = _ts(cell), _ts(value)
+        result = a == b if isinstance(a, datetime) else str(cell) == value
+    elif op == "neq":
+        result = str(cell) != value
+    elif cell is None:
+        result = False
+    else:
+        a, b = _ts(cell), _ts(value)
+        if not isinstance(a, datetime):
+            try:
+                a, b = float(a), float(b)
+            except (TypeError, ValueError):
+                a, b = str(a), str(b)
+        result = {"lt": a < b, "lte": a <= b, "gt": a > b, "gte": a >= b}[op]
+    return result != negate
+
+
+def _match_condition(row: Dict[str, Any], condition: str) -> bool:
+    if condition.startswith("and("):
+        return all(_match_condition(row, c) for c in _split_top(condition[4:-1]))
+    if condition.startswith("or("):
+        return any(_match_condition(row, c) for c in _split_top(condition[3:-1]))
+    column, _, expr = condition.partition(".")
+    return _match(row, column, expr)
+
+
+class FakePostgrest:
+    """Enough of PostgREST for the scheduler: filters, or=() / and=(), select with
+    one-level embeds, order/limit/offset, PATCH, DELETE and upserts."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            "posts": [],
+            "publisher_accounts": [],
+            "analytics": [],
+            "recurring_schedules": [],
+        }
+        self._seq = 0
+
+    def _filter(self, table: str, params: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        rows = []
+        for row in self.tables.setdefault(table, []):
+            ok = True
+            for key, values in params.items():
+                for value in values:
+                    if key == "or":
+                        ok = ok and any(_match_condition(row, c) for c in _split_top(value[1:-1]))
+                    elif key == "and":
+                        ok = ok and all(_match_condition(row, c) for c in _split_top(value[1:-1]))
+                    elif key not in _RESERVED_PARAMS:
+                        ok = ok and _match(row, key, value)
+            if ok:
+                rows.append(row)
+        return rows
+
+    def _select(self, rows: List[Dict[str, Any]], params: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        if "order" in params:
+            for part in reversed(params["order"][0].split(",")):
+                column, *mods = part.split(".")
+                rows = sorted(
+                    rows,
+                    key=lambda r: (r.get(column) is None, _ts(r.get(column)) if r.get(column) is not None else 0),
+                    reverse="desc" in mods,
+                )
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params["limit"][0]) if "limit" in params else None
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+        select = params.get("select", ["*"])[0]
+        if select == "*":
+            return [dict(r) for r in rows]
+        result = []
+        for row in rows:
+            out: Dict[str, Any] = {}
+            for item in _split_top(select):
+                embed = re.match(r"(\w+)\((.*)\)", item)
+                if embed:
+                    child, columns = embed.groups()
+                    out[child] = [
+                        {c: r.get(c) for c in columns.split(",")}
+                        for r in self.tables.get(child, []) if r.get("post_id") == row.get("id")
+                    ]
+                else:
+                    out[item] = row.get(item)
+            result.append(out)
+        return result
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        table = request.url.path.rsplit("/", 1)[-1]
+        params: Dict[str, List[str]] = {}
+        for key, value in request.url.params.multi_items():
+            params.setdefault(key, []).append(value)
+
+        if request.method == "GET":
+            return httpx.Response(200, json=self._select(self._filter(table, params), params))
+        if request.method == "PATCH":
+            body = json.loads(request.content)
+            rows = self._filter(table, params)
+            for row in rows:
+                row.update(body)
+            return httpx.Response(200, json=[dict(r) for r in rows])
+        if request.method == "POST":
+            body = json.loads(request.content)
+            keys = params.get("on_conflict", ["id"])[0].split(",")
+            ignore = "ignore-duplicates" in request.headers.get("prefer", "")
+            created = []
+            for item in body if isinstance(body, list) else [body]:
+                existing = None
+                if all(k in item for k in keys):
+                    existing = next(
+                        (r for r in self.tables.setdefault(table, []) if all(r.get(k) == item[k] for k in keys)),
+                        None,
+                    )
+                if existing is not None:
+                    if not ignore:
+                        existing.update(item)
+                        created.append(dict(existing))
+                    continue
+                self._seq += 1
+                row = {"id": f"{table}-{self._seq}", **item}
+                self.tables.setdefault(table, []).append(row)
+                created.append(dict(row))
+            return httpx.Response(201, json=created)
+        if request.method == "DELETE":
+            doomed = {id(r) for r in self._filter(table, params)}
+            deleted = [dict(r) for r in self.tables[table] if id(r) in doomed]
+            self.tables[table] = [r for r in self.tables[table] if id(r) not in doomed]
+            if "return=representation" in request.headers.get("prefer", ""):
+                return httpx.Response(200, json=deleted)
+            return httpx.Response(204)
+        return httpx.Response(405)
+
+
+@dataclass
+class HostProfile:
+    """Latency (seconds, uniformly jittered ±50%) and error rate for a fake host."""
+
+    latency: float = 0.05
+    error_rate: float = 0.0
+    error_status: int = 500
+    max_connections: Optional[int] = None
+
+
+@dataclass
+class FakeUpstreams:
+    """Transport handler routing requests to the fake Supabase and platform APIs."""
+
+    db: FakePostgrest = field(default_factory=FakePostgrest)
+    default: HostProfile = field(default_factory=HostProfile)
+    profiles: Dict[str, HostProfile] = field(default_factory=dict)
+    seed: Optional[int] = None
+    calls: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    host_in_flight: Counter = field(default_factory=Counter)
+    peak_by_host: Counter = field(default_factory=Counter)
+    pool_waits: Counter = field(default_factory=Counter)
+    addresses: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self._ids = 0
+        self._pools: Dict[str, asyncio.Semaphore] = {}
+
+    def profile(self, host: str) -> HostProfile:
+        return self.profiles.get(host, self.default)
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Stand-in for DNS: ``addresses[host]``, else PUBLIC_ADDRESS."""
+        return [self.addresses.get(host, PUBLIC_ADDRESS)]
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.errors.clear()
+        self.pool_waits.clear()
+        self.peak_in_flight = self.in_flight
+        self.peak_by_host = Counter(self.host_in_flight)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls[host] += 1
+        limit = self.profile(host).max_connections
+        if limit is None:
+            return await self._handle(request)
+        pool = self._pools.setdefault(host, asyncio.Semaphore(limit))
+        if pool.locked():
+            self.pool_waits[host] += 1
+        async with pool:
+            return await self._handle(request)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.host_in_flight[host] += 1
+        self.peak_by_host[host] = max(self.peak_by_host[host], self.host_in_flight[host])
+        try:
+            profile = self.profile(host)
+            if profile.latency > 0:
+                await asyncio.sleep(profile.latency * self._random.uniform(0.5, 1.5))
+            if profile.error_rate and self._random.random() < profile.error_rate:
+                self.errors[host] += 1
+                return httpx.Response(profile.error_status, json={"error": "injected failure"})
+            if host == SUPABASE_HOST:
+                return self.db.handle(request)
+            return self._platform(request)
+        finally:
+            self.in_flight -= 1
+            self.host_in_flight[host] -= 1
+
+    def _next_id(self) -> int:
+        self._ids += 1
+        return self._ids
+
+    def _platform(self, request: httpx.Request) -> httpx.Response:
+        host, path = request.url.host, request.url.path
+
+        if host == "api.telegram.org":
+            if path.endswith("/getChatMemberCount"):
+                return httpx.Response(200, json={"ok": True, "result": 1000})
+            result: Dict[str, Any] = {"message_id": self._next_id()}
+            if path.endswith("/sendPhoto"):
+                result["photo"] = [{"file_id": f"small-{self._ids}"}, {"file_id": f"file-{self._ids}"}]
+            return httpx.Response(200, json={"ok": True, "result": result})
+
+        if host == "api.linkedin.com":
+            if "socialMetadata" in path:
+                urns = request.url.query.decode().split("List(", 1)[-1].rstrip(")").split(",")
+                counts = {"numLikes": 10, "numComments": 2, "numShares": 1}
+                results = {u.replace("%3A", ":"): {"socialDetail": {"totalSocialActivityCounts": counts}} for u in urns}
+                return httpx.Response(200, json={"results": results, "errors": {}})
+            if path.endswith("/images"):
+                image = f"urn:li:image:{self._next_id()}"
+                return httpx.Response(200, json={"value": {"uploadUrl": "https://uploads.bench/li", "image": image}})
+            return httpx.Response(201, headers={"x-restli-id": f"urn:li:share:{self._next_id()}"})
+
+        if host == "api.vk.com":
+            method = path.rsplit("/", 1)[-1]
+            if method == "wall.getById":
+                posts = dict(httpx.QueryParams(request.content.decode())).get("posts", "")
+                items = []
+                for pid in filter(None, posts.split(",")):
+                    owner, _, post = pid.partition("_")
+                    items.append({
+                        "owner_id": int(owner), "id": int(post),
+                        "views": {"count": 100}, "likes": {"count": 5},
+                        "reposts": {"count": 1}, "comments": {"count": 2},
+                    })
+                return httpx.Response(200, json={"response": {"items": items}})
+            if method == "photos.getWallUploadServer":
+                return httpx.Response(200, json={"response": {"upload_url": "https://uploads.bench/vk"}})
+            if method == "photos.saveWallPhoto":
+                return httpx.Response(200, json={"response": [{"owner_id": -1, "id": self._next_id()}]})
+            if method == "users.get":
+                return httpx.Response(200, json={"response": [{"id": 1000, "first_name": "Bench"}]})
+            return httpx.Response(200, json={"response": {"post_id": self._next_id()}})
+
+        if host == "images.bench":
+            return httpx.Response(200, content=_PNG, headers={"content-type": "image/png"})
+
+        if host == "uploads.bench":
+            if path == "/vk":
+                return httpx.Response(200, json={"server": 1, "photo": "[{}]", "hash": "h"})
+            return httpx.Response(201)
+
+        if host in ("api.openai.com", "api.groq.com", "api-inference.huggingface.co"):
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Benchmark completion."}}]})
+        if host == "api.anthropic.com":
+            return httpx.Response(200, json={"content": [{"text": "Benchmark completion."}]})
+        if host == "generativelanguage.googleapis.com":
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "Benchmark completion."}]}}]})
+
+        return httpx.Response(404, json={"error": f"no fake for {host}{path}"})
@@ -0,0 +1,263 @@
+"""Benchmark the publish pipeline, analytics refresh and AI calls against fakes.
+
+Run from backend/:
+
+    python -m benchmarks.publish_bench                      # 500 posts due at once
+    python -m benchmarks.publish_bench --scenario analytics --posts 2000
+    python -m benchmarks.publish_bench --scenario publish --latency 0.2 --error-rate 0.05
+    python -m benchmarks.publish_bench --scenario ai --requests 200
+
+Nothing leaves the process: Supabase and every platform / LLM API are
+served by benchmarks.fakes through the shared HTTP client transport.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import IMAGE_URL, SUPABASE_HOST, SUPABASE_URL, FakeUpstreams, HostProfile
+
+_PLATFORMS = ("telegram", "linkedin", "vk")
+_AI_MODELS = ("gpt-4o-mini", "claude-3-5-haiku-20241022", "gemini-2.0-flash", "llama-3.1-8b-instant")
+
+
+def _configure_env() -> None:
+    # Service modules read configuration at import time, so this must run
+    # before anything from services/ is imported.
+    os.environ["SUPABASE_URL"] = SUPABASE_URL
+    for key in (
+        "SUPABASE_KEY", "SUPABASE_SERVICE_KEY", "OPENAI_API_KEY", "ANTHROPIC_API_KEY",
+        "GOOGLE_AI_API_KEY", "GROQ_API_KEY", "HUGGINGFACE_API_KEY",
+    ):
+        os.environ[key] = "bench"
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _seed_accounts(upstreams: FakeUpstreams, count: int) -> List[Dict[str, Any]]:
+    accounts = []
+    for i in range(count):
+        platform = _PLATFORMS[i % len(_PLATFORMS)]
+        channel = {"telegram": f"@bench{i}", "linkedin": f"urn:li:person:bench{i}", "vk": f"-{1000 + i}"}[platform]
+        accounts.append({"id": f"acct-{i}", "platform": platform, "token": f"token-{i}", "channel_id": channel})
+    upstreams.db.tables["publisher_accounts"] = accounts
+    return accounts
+
+
+def _seed_posts(
+    upstreams: FakeUpstreams,
+    accounts: List[Dict[str, Any]],
+    count: int,
+    scheduled_at: datetime,
+    status: str = "scheduled",
+    image_ratio: float = 0.0,
+) -> None:
+    posts = upstreams.db.tables["posts"]
+    for i in range(count):
+        account = accounts[i % len(accounts)]
+        post: Dict[str, Any] = {
+            "id": f"post-{len(posts)}",
+            "account_id": account["id"],
+            "platform": account["platform"],
+            "content": f"Benchmark post {i}",
+            "image_url": IMAGE_URL if i < count * image_ratio else None,
+            "status": status,
+            "scheduled_at": scheduled_at.isoformat(),
+            "created_at": scheduled_at.isoformat(),
+            "attempts": 0,
+        }
+        if status == "published":
+            post["published_at"] = scheduled_at.isoformat()
+            post["platform_post_id"] = {
+                "telegram": str(i + 1),
+                "linkedin": f"urn:li:share:{i + 1}",
+                "vk": f"{account['channel_id']}_{i + 1}",
+            }[account["platform"]]
+        posts.append(post)
+
+
+def _summarise_calls(upstreams: FakeUpstreams) -> Dict[str, int]:
+    return dict(sorted(upstreams.calls.items(), key=lambda kv: -kv[1]))
+
+
+async def _run_publish(upstreams: FakeUpstreams, args: argparse.Namespace) -> Dict[str, Any]:
+    from services.scheduler import check_and_publish_scheduled_posts, drain_publishes
+
+    accounts = _seed_accounts(upstreams, args.accounts)
+    _seed_posts(upstreams, accounts, args.posts, datetime.now(timezone.utc), image_ratio=args.image_ratio)
+    posts = upstreams.db.tables["posts"]
+
+    started = time.monotonic()
+    cycles = 0
+    deadline = started + args.timeout
+    while time.monotonic() < deadline:
+        await check_and_publish_scheduled_posts()
+        await drain_publishes()
+        cycles += 1
+        now = datetime.now(timezone.utc)
+        due = [
+            p for p in posts
+            if p["status"] == "scheduled"
+            and (p.get("next_attempt_at") is None or datetime.fromisoformat(p["next_attempt_at"]) <= now)
+        ]
+        if not due:
+            break
+    elapsed = time.monotonic() - started
+
+    lags = [
+        (datetime.fromisoformat(p["published_at"]) - datetime.fromisoformat(p["scheduled_at"])).total_seconds()
+        for p in posts if p["status"] == "published" and p.get("published_at")
+    ]
+    statuses: Dict[str, int] = {}
+    for p in posts:
+        statuses[p["status"]] = statuses.get(p["status"], 0) + 1
+    return {
+        "scenario": f"publish: {args.posts} posts due at once over {args.accounts} accounts",
+        "elapsed_s": round(elapsed, 3),
+        "cycles": cycles,
+        "published": len(lags),
+        "posts_per_s": round(len(lags) / elapsed, 1) if elapsed else None,
+        "lag_p50_s": _round(_percentile(lags, 50)),
+        "lag_p99_s": _round(_percentile(lags, 99)),
+        "statuses": statuses,
+        "http_calls": _summarise_calls(upstreams),
+        "supabase_calls": upstreams.calls[SUPABASE_HOST],
+        "injected_errors": dict(upstreams.errors),
+        "peak_in_flight": upstreams.peak_in_flight,
+    }
+
+
+async def _run_analytics(upstreams: FakeUpstreams, args: argparse.Namespace) -> Dict[str, Any]:
+    from services.scheduler import refresh_analytics
+
+    accounts = _seed_accounts(upstreams, args.accounts)
+    # Old enough to be due under every age tier.
+    published_at = datetime.now(timezone.utc) - timedelta(days=3)
+    _seed_posts(upstreams, accounts, args.posts, published_at, status="published")
+
+    started = time.monotonic()
+    await refresh_analytics()
+    elapsed = time.monotonic() - started
+
+    rows = len(upstreams.db.tables["analytics"])
+    return {
+        "scenario": f"analytics: {args.posts} published posts over {args.accounts} accounts",
+        "elapsed_s": round(elapsed, 3),
+        "rows_upserted": rows,
+        "posts_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "http_calls": _summarise_calls(upstreams),
+        "supabase_calls": upstreams.calls[SUPABASE_HOST],
+        "injected_errors": dict(upstreams.errors),
+        "peak_in_flight": upstreams.peak_in_flight,
+    }
+
+
+async def _run_ai(upstreams: FakeUpstreams, args: argparse.Namespace) -> Dict[str, Any]:
+    from services.ai import generate_text
+
+    latencies: List[float] = []
+    failures = 0
+
+    async def _one(i: int) -> None:
+        nonlocal failures
+        started = time.monotonic()
+        try:
+            await generate_text(f"Benchmark prompt {i}", _AI_MODELS[i % len(_AI_MODELS)])
+        except Exception:
+            failures += 1
+            return
+        latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(_one(i) for i in range(args.requests)))
+    elapsed = time.monotonic() - started
+    return {
+        "scenario": f"ai: {args.requests} concurrent generate_text calls",
+        "elapsed_s": round(elapsed, 3),
+        "succeeded": len(latencies),
+        "failed": failures,
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_p50_s": _round(_percentile(latencies, 50)),
+        "latency_p99_s": _round(_percentile(latencies, 99)),
+        "http_calls": _summarise_calls(upstreams),
+        "peak_in_flight": upstreams.peak_in_flight,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+_SCENARIOS = {"publish": _run_publish, "analytics": _run_analytics, "ai": _run_ai}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one scenario against fresh fakes and return its report."""
+    from services import http_client
+
+    upstreams = FakeUpstreams(
+        default=HostProfile(latency=args.latency, error_rate=args.error_rate),
+        profiles={SUPABASE_HOST: HostProfile(latency=args.db_latency, error_rate=args.db_error_rate)},
+        seed=args.seed,
+    )
+    await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle), resolver=upstreams.resolve)
+    try:
+        return await _SCENARIOS[args.scenario](upstreams, args)
+    finally:
+        await http_client.close_clients()
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(report["scenario"])
+    for key, value in report.items():
+        if key == "scenario":
+            continue
+        if isinstance(value, dict):
+            print(f"  {key}:")
+            for name, count in value.items():
+                print(f"    {name:<40} {count}")
+        else:
+            print(f"  {key:<20} {value}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(_SCENARIOS), default="publish")
+    parser.add_argument("--posts", type=int, default=500, help="posts to seed (publish/analytics)")
+    parser.add_argument("--accounts", type=int, default=100, help="publisher accounts, split across platforms")
+    parser.add_argument("--requests", type=int, default=100, help="concurrent generate_text calls (ai)")
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="share of posts with an image (publish)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean platform/LLM latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of platform/LLM calls answered with 500")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="mean Supabase latency in seconds")
+    parser.add_argument("--db-error-rate", type=float, default=0.0, help="share of Supabase calls answered with 500")
+    parser.add_argument("--timeout", type=float, default=300.0, help="give up on the publish scenario after this long")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for latency jitter and errors")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s - %(levelname)s - %(message)s")
+    _configure_env()
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
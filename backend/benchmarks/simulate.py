@@ -0,0 +1,323 @@
+"""Replay scheduled posts through the real scheduler on an accelerated clock.
+
+Run from backend/:
+
+    python -m benchmarks.simulate                                # synthetic week, 5000 posts
+    python -m benchmarks.simulate --posts 20000 --accounts 300 --days 7
+    python -m benchmarks.simulate --posts-file week.json         # export of the posts table
+    python -m benchmarks.simulate --posts-file week.json --latency 0.5 --json
+    python -m benchmarks.simulate --posts-file week.json --dump-posts out.json
+    python -m benchmarks.simulate --posts 500 --days 1 --bulk 150   # one channel bulk-scheduled
+
+services.scheduler runs unchanged — timer queue, safety poll, claiming,
+catch-up, pre-staging, rate limits, retries and analytics refresh — on a
+virtual clock (services/clock.py): whenever every task is waiting, time
+jumps to the next timer, so a week replays in minutes. Supabase and the
+platform APIs are benchmarks.fakes, with their latency spent in virtual
+time too.
+
+``--posts-file`` takes a JSON array of posts rows (e.g. a Supabase export
+of one week). Only scheduled_at, platform, account_id, content and
+image_url are used; every post starts out "scheduled" and account
+credentials are replaced with fakes. ``--bulk N`` adds N posts on a single
+Telegram channel, all due at the first post's time, which its per-chat rate
+limit drains at TELEGRAM_CHAT_RATE_PER_MINUTE.
+
+The report gives queue depth over time (posts due but not yet published,
+and the in-process timer queue), publish lag per platform
+(published_at − scheduled_at, in virtual seconds), when the last post was
+published, and the peak number of upstream connections in use, overall
+and per host. ``--dump-posts`` also writes the final posts rows (status,
+published_at, ...) for a closer look, e.g. lag per account.
+
+Where the run differs from production:
+
+- APScheduler is not used. It times jobs with datetime.now(), the wall
+  clock, so under the virtual clock start_scheduler runs the same interval
+  jobs with _run_every on loop timers. Runs start on a fixed grid, and a
+  run that falls due while the previous one is still going is skipped, as
+  with max_instances=1 and coalesce. APScheduler's misfire grace handling
+  is not exercised.
+- Connections follow httpx's HTTP/1.1 pool: one request per connection, at
+  most HTTP_MAX_CONNECTIONS per host (HTTP_DOWNLOAD_MAX_CONNECTIONS for
+  images), with the rest waiting (``pool_waits``). With HTTP/2 an upstream
+  would multiplex them over fewer connections, so the peaks are an upper
+  bound.
+- Work in the media process pool takes no virtual time.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.fakes import IMAGE_URL, SUPABASE_HOST, FakeUpstreams, HostProfile
+from benchmarks.publish_bench import _PLATFORMS, _configure_env, _percentile, _print_report, _round
+
+# Posts cluster on round times the way people schedule them.
+_ROUND_MINUTES = (0, 0, 0, 15, 30, 30, 45)
+_TERMINAL = {"published", "failed", "dead_letter", "skipped"}
+
+
+def _parse_ts(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _synthetic_posts(args: argparse.Namespace, start: datetime) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    posts = []
+    for i in range(args.posts):
+        account = rng.randrange(args.accounts)
+        day = start + timedelta(days=rng.randrange(args.days))
+        hour = min(23, max(0, int(rng.gauss(13, 4))))
+        minute = rng.choice(_ROUND_MINUTES) if rng.random() < 0.8 else rng.randrange(60)
+        posts.append({
+            "account_id": f"acct-{account}",
+            "platform": _PLATFORMS[account % len(_PLATFORMS)],
+            "content": f"Simulated post {i}",
+            "image_url": IMAGE_URL if rng.random() < args.image_ratio else None,
+            "scheduled_at": day.replace(hour=hour, minute=minute).isoformat(),
+        })
+    return posts
+
+
+def _bulk_posts(count: int, at: datetime) -> List[Dict[str, Any]]:
+    return [
+        {
+            "account_id": "bulk",
+            "platform": "telegram",
+            "content": f"Bulk post {i}",
+            "image_url": None,
+            "scheduled_at": at.isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def _load_posts(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        rows = json.load(f)
+    posts = [
+        {
+            "account_id": row.get("account_id"),
+            "platform": row["platform"],
+            "content": row.get("content") or "",
+            "image_url": IMAGE_URL if row.get("image_url") else None,
+            "scheduled_at": _parse_ts(row["scheduled_at"]).isoformat(),
+        }
+        for row in rows if row.get("scheduled_at") and row.get("platform")
+    ]
+    if not posts:
+        raise SystemExit(f"{path}: no posts with scheduled_at and platform")
+    return posts
+
+
+def _seed(upstreams: FakeUpstreams, posts: List[Dict[str, Any]], created_at: datetime) -> None:
+    accounts: Dict[str, Dict[str, Any]] = {}
+    for i, post in enumerate(posts):
+        post.update({"id": f"sim-{i}", "status": "scheduled", "attempts": 0, "created_at": created_at.isoformat()})
+        account_id = post.get("account_id")
+        if account_id and account_id not in accounts:
+            n = len(accounts)
+            channel = {"telegram": f"@sim{n}", "linkedin": f"urn:li:person:sim{n}", "vk": f"-{1000 + n}"}
+            accounts[account_id] = {
+                "id": account_id,
+                "platform": post["platform"],
+                "token": f"token-{n}",
+                "channel_id": channel.get(post["platform"], f"sim{n}"),
+            }
+    upstreams.db.tables["posts"] = posts
+    upstreams.db.tables["publisher_accounts"] = list(accounts.values())
+
+
+def _timer_queue_depth() -> int:
+    from services.metrics import DUE_QUEUE_DEPTH
+
+    return int(DUE_QUEUE_DEPTH.collect()[0].samples[0].value)
+
+
+async def _simulate(upstreams: FakeUpstreams, args: argparse.Namespace, end: datetime) -> List[Dict[str, Any]]:
+    from services import clock
+    from services.scheduler import start_scheduler, stop_scheduler
+
+    posts = upstreams.db.tables["posts"]
+    samples: List[Dict[str, Any]] = []
+    await start_scheduler()
+    try:
+        while True:
+            now = clock.now()
+            now_iso = now.isoformat()
+            backlog = sum(
+                1 for p in upstreams.db.tables["posts"]
+                if p["status"] not in _TERMINAL and p["scheduled_at"] <= now_iso
+            )
+            samples.append({
+                "at": now,
+                "backlog": backlog,
+                "timer_queue": _timer_queue_depth(),
+                "in_flight": upstreams.in_flight,
+            })
+            if now >= end or all(p["status"] in _TERMINAL for p in posts):
+                return samples
+            await asyncio.sleep(args.sample_seconds)
+    finally:
+        await stop_scheduler()
+
+
+def _depth_over_time(samples: List[Dict[str, Any]], bucket_minutes: int) -> Dict[str, str]:
+    buckets: Dict[datetime, List[Dict[str, Any]]] = {}
+    width = timedelta(minutes=bucket_minutes)
+    origin = samples[0]["at"]
+    for sample in samples:
+        buckets.setdefault(origin + width * ((sample["at"] - origin) // width), []).append(sample)
+    return {
+        at.strftime("%a %Y-%m-%d %H:%M"): (
+            f"backlog max {max(s['backlog'] for s in group):>5}  "
+            f"timer queue max {max(s['timer_queue'] for s in group):>5}"
+        )
+        for at, group in buckets.items()
+    }
+
+
+def _lag_by_platform(posts: List[Dict[str, Any]]) -> Dict[str, str]:
+    lags: Dict[str, List[float]] = {}
+    for post in posts:
+        if post["status"] == "published" and post.get("published_at"):
+            lag = (_parse_ts(post["published_at"]) - _parse_ts(post["scheduled_at"])).total_seconds()
+            lags.setdefault(post["platform"], []).append(lag)
+    return {
+        platform: (
+            f"n={len(values)} p50={_round(_percentile(values, 50))}s "
+            f"p99={_round(_percentile(values, 99))}s max={_round(max(values))}s"
+        )
+        for platform, values in sorted(lags.items())
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Replay the posts on the current (virtual) clock and return the report."""
+    from services import clock, http_client
+
+    pool = http_client.HTTP_MAX_CONNECTIONS
+    upstreams = FakeUpstreams(
+        default=HostProfile(latency=args.latency, error_rate=args.error_rate, max_connections=pool),
+        profiles={
+            SUPABASE_HOST: HostProfile(latency=args.db_latency, error_rate=args.db_error_rate, max_connections=pool),
+            httpx.URL(IMAGE_URL).host: HostProfile(
+                latency=args.latency, error_rate=args.error_rate,
+                max_connections=http_client.HTTP_DOWNLOAD_MAX_CONNECTIONS,
+            ),
+        },
+        seed=args.seed,
+    )
+    start = clock.now()
+    if args.posts_file:
+        posts = _load_posts(args.posts_file)
+    else:
+        posts = _synthetic_posts(args, start.replace(hour=0, minute=0, second=0, microsecond=0))
+    if args.bulk:
+        posts += _bulk_posts(args.bulk, min(_parse_ts(p["scheduled_at"]) for p in posts) if posts else start)
+    _seed(upstreams, posts, start)
+    last_due = max(_parse_ts(p["scheduled_at"]) for p in posts)
+    end = max(start, last_due) + timedelta(minutes=args.drain_minutes)
+
+    await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle), resolver=upstreams.resolve)
+    wall_started = time.monotonic()
+    try:
+        samples = await _simulate(upstreams, args, end)
+    finally:
+        await http_client.close_clients()
+    wall_elapsed = time.monotonic() - wall_started
+    if args.dump_posts:
+        with open(args.dump_posts, "w") as f:
+            json.dump(posts, f, indent=1, default=str)
+
+    statuses: Dict[str, int] = {}
+    for p in posts:
+        statuses[p["status"]] = statuses.get(p["status"], 0) + 1
+    peak = max(samples, key=lambda s: s["backlog"])
+    published_at = [p["published_at"] for p in posts if p["status"] == "published" and p.get("published_at")]
+    simulated = (clock.now() - start).total_seconds()
+    return {
+        "scenario": f"simulate: {len(posts)} posts from {start:%Y-%m-%d %H:%M} to {last_due:%Y-%m-%d %H:%M} UTC",
+        "simulated_hours": round(simulated / 3600, 1),
+        "wall_s": round(wall_elapsed, 1),
+        "speedup": round(simulated / wall_elapsed) if wall_elapsed else None,
+        "statuses": statuses,
+        "peak_backlog": peak["backlog"],
+        "peak_backlog_at": peak["at"].isoformat(),
+        "queue_depth": _depth_over_time(samples, args.bucket_minutes),
+        "publish_lag": _lag_by_platform(posts),
+        "last_published_at": max(published_at, key=_parse_ts) if published_at else None,
+        "peak_connections": upstreams.peak_in_flight,
+        "peak_connections_by_host": dict(upstreams.peak_by_host.most_common()),
+        "pool_waits": dict(upstreams.pool_waits.most_common()),
+        "http_calls": dict(upstreams.calls.most_common()),
+        "injected_errors": dict(upstreams.errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts-file", help="JSON array of posts rows to replay instead of synthetic posts")
+    parser.add_argument("--posts", type=int, default=5000, help="synthetic posts to schedule")
+    parser.add_argument("--accounts", type=int, default=100, help="synthetic publisher accounts, split across platforms")
+    parser.add_argument("--days", type=int, default=7, help="days the synthetic posts are spread over")
+    parser.add_argument("--image-ratio", type=float, default=0.2, help="share of synthetic posts with an image")
+    parser.add_argument("--bulk", type=int, default=0, help="extra posts on one Telegram channel, all due at once")
+    parser.add_argument("--start", help="virtual start time (ISO-8601); default: just before the first post")
+    parser.add_argument("--drain-minutes", type=int, default=60, help="keep running this long after the last due post")
+    parser.add_argument("--sample-seconds", type=float, default=60.0, help="queue depth sampling interval (virtual)")
+    parser.add_argument("--bucket-minutes", type=int, default=360, help="queue depth report resolution")
+    parser.add_argument("--latency", type=float, default=0.3, help="mean platform latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of platform calls answered with 500")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="mean Supabase latency in seconds")
+    parser.add_argument("--db-error-rate", type=float, default=0.0, help="share of Supabase calls answered with 500")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for synthetic posts, jitter and errors")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--dump-posts", help="write the final posts rows to this JSON file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s - %(levelname)s - %(message)s")
+    _configure_env()
+    # Posts without an account fall back to the env credentials; the outbox
+    # would only add a local SQLite file to the run.
+    for key in ("TELEGRAM_BOT_TOKEN", "TELEGRAM_CHAT_ID", "LINKEDIN_ACCESS_TOKEN", "LINKEDIN_PROFILE_ID", "VK_ACCESS_TOKEN"):
+        os.environ.setdefault(key, "sim")
+    os.environ["OUTBOX_PATH"] = ""
+
+    from services.clock import VirtualClock, use_virtual_clock
+
+    if args.start:
+        start = _parse_ts(args.start)
+    elif args.posts_file:
+        start = min(_parse_ts(p["scheduled_at"]) for p in _load_posts(args.posts_file)) - timedelta(minutes=1)
+    else:
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    virtual = VirtualClock(start)
+    use_virtual_clock(virtual)
+    loop = virtual.new_event_loop()
+    try:
+        report = loop.run_until_complete(run(args))
+    finally:
+        loop.close()
+        use_virtual_clock(None)
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import os
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
@@ -27,12 +27,17 @@ if not ALLOWED_ORIGINS:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    from services.http_client import close_clients, open_clients
+    from services.media import shutdown_media_pool
     from services.scheduler import start_scheduler, stop_scheduler
 
     logger.info("Starting VYUD Publisher API v2.1.0")
+    await open_clients()
     await start_scheduler()
     yield
     await stop_scheduler()
+    shutdown_media_pool()
+    await close_clients()
     logger.info("VYUD Publisher API stopped")
 
 
@@ -46,7 +51,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from routers import accounts, ai, analytics, auth, posts, prompts  # noqa: E402 — env must be loaded first via load_dotenv() above
+from routers import accounts, ai, analytics, auth, posts, prompts, recurring  # noqa: E402 — env must be loaded first via load_dotenv() above
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
@@ -54,8 +59,24 @@ app.include_router(accounts.router, prefix="/api/accounts", tags=["accounts"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(prompts.router, prefix="/api/prompts", tags=["prompts"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(recurring.router, prefix="/api/recurring", tags=["recurring"])
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok", "version": "2.1.0"}
+
+
+@app.get("/health/circuits")
+async def circuits():
+    from services.circuit_breaker import snapshot
+
+    return {"circuits": snapshot()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    from services.metrics import render
+
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
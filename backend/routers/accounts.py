@@ -11,6 +11,10 @@ import httpx
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from services.accounts import invalidate_account
+from services.http_client import get_client
+from services.scheduler import notify_account_changed
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -50,12 +54,12 @@ class VKAccount(BaseModel):
 @router.get("/", response_model=List[Dict[str, Any]])
 async def list_accounts():
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                headers=_service_headers(),
-                params={"order": "created_at.desc", "select": "id,name,platform,created_at"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            params={"order": "created_at.desc", "select": "id,name,platform,created_at"},
+        )
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -75,15 +79,18 @@ async def add_telegram_account(account: TelegramAccount):
         "channel_id": account.channel_id,
     }
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                headers=_service_headers(),
-                json=payload,
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            json=payload,
+        )
         resp.raise_for_status()
         data = resp.json()
-        return data[0] if isinstance(data, list) else data
+        created = data[0] if isinstance(data, list) else data
+        invalidate_account(created.get("id"))
+        notify_account_changed(created.get("id"))
+        return created
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error adding Telegram account: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -101,15 +108,18 @@ async def add_linkedin_account(account: LinkedInAccount):
         "channel_id": account.profile_id,
     }
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                headers=_service_headers(),
-                json=payload,
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            json=payload,
+        )
         resp.raise_for_status()
         data = resp.json()
-        return data[0] if isinstance(data, list) else data
+        created = data[0] if isinstance(data, list) else data
+        invalidate_account(created.get("id"))
+        notify_account_changed(created.get("id"))
+        return created
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error adding LinkedIn account: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -127,15 +137,18 @@ async def add_vk_account(account: VKAccount):
         "channel_id": account.group_id or "",
     }
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                headers=_service_headers(),
-                json=payload,
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            json=payload,
+        )
         resp.raise_for_status()
         data = resp.json()
-        return data[0] if isinstance(data, list) else data
+        created = data[0] if isinstance(data, list) else data
+        invalidate_account(created.get("id"))
+        notify_account_changed(created.get("id"))
+        return created
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error adding VK account: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -147,13 +160,15 @@ async def add_vk_account(account: VKAccount):
 @router.delete("/{account_id}", status_code=204)
 async def delete_account(account_id: str):
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(
-                f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                headers=_service_headers(),
-                params={"id": f"eq.{account_id}"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.delete(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            params={"id": f"eq.{account_id}"},
+        )
         resp.raise_for_status()
+        invalidate_account(account_id)
+        notify_account_changed(account_id)
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error deleting account: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from services.ai import AVAILABLE_MODELS, generate_text
+from services.circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -147,6 +148,10 @@ async def generate_post(req: GeneratePostRequest):
         return {"content": text, "model": req.model, "platform": req.platform}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         logger.error("AI generation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -210,6 +215,10 @@ async def generate_content_plan(req: ContentPlanRequest):
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         logger.error("Content plan generation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -7,6 +7,8 @@ from typing import Any, Dict, List, Optional
 import httpx
 from fastapi import APIRouter, BackgroundTasks, Header, HTTPException
 
+from services.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -38,12 +40,12 @@ async def get_analytics(
         params["platform"] = f"eq.{platform}"
 
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/analytics",
-                headers=_headers(token),
-                params=params,
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/analytics",
+            headers=_headers(token),
+            params=params,
+        )
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -59,12 +61,14 @@ async def trigger_refresh(background_tasks: BackgroundTasks):
     """Manually trigger an analytics refresh in the background.
 
     The scheduler runs this automatically every 30 minutes; this
-    endpoint allows on-demand refresh from the UI.
+    endpoint allows on-demand refresh from the UI. If a refresh is already
+    running, the request joins it instead of starting a second one.
     """
-    from services.scheduler import refresh_analytics
+    from services.scheduler import analytics_refresh_running, refresh_analytics
 
+    already_running = analytics_refresh_running()
     background_tasks.add_task(refresh_analytics)
-    return {"status": "refresh started"}
+    return {"status": "refresh already running" if already_running else "refresh started"}
 
 
 @router.get("/summary")
@@ -72,12 +76,12 @@ async def get_summary(authorization: Optional[str] = Header(None)):
     """Return aggregated totals across all posts."""
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/analytics",
-                headers=_headers(token),
-                params={"select": "views,likes,comments,shares,subscribers,platform"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/analytics",
+            headers=_headers(token),
+            params={"select": "views,likes,comments,shares,subscribers,platform"},
+        )
         resp.raise_for_status()
         rows = resp.json()
     except Exception as e:
@@ -118,12 +122,12 @@ async def get_tgstat_stats(channel_id: str):
     if not TGSTAT_API_KEY:
         raise HTTPException(status_code=503, detail="TGSTAT_API_KEY not configured")
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                "https://api.tgstat.ru/channels/stat",
-                params={"token": TGSTAT_API_KEY, "channelId": channel_id},
-                timeout=15.0,
-            )
+        client = get_client("https://api.tgstat.ru")
+        resp = await client.get(
+            "https://api.tgstat.ru/channels/stat",
+            params={"token": TGSTAT_API_KEY, "channelId": channel_id},
+            timeout=15.0,
+        )
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -10,10 +10,11 @@ Endpoints:
 import logging
 import os
 
-import httpx
 from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 
+from services.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -40,13 +41,13 @@ async def login(body: AuthRequest):
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
-            headers=_anon_headers(),
-            json={"email": body.email, "password": body.password},
-            timeout=15,
-        )
+    client = get_client(SUPABASE_URL)
+    resp = await client.post(
+        f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
+        headers=_anon_headers(),
+        json={"email": body.email, "password": body.password},
+        timeout=15,
+    )
 
     if resp.status_code == 400:
         try:
@@ -76,13 +77,13 @@ async def register(body: AuthRequest):
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{SUPABASE_URL}/auth/v1/signup",
-            headers=_anon_headers(),
-            json={"email": body.email, "password": body.password},
-            timeout=15,
-        )
+    client = get_client(SUPABASE_URL)
+    resp = await client.post(
+        f"{SUPABASE_URL}/auth/v1/signup",
+        headers=_anon_headers(),
+        json={"email": body.email, "password": body.password},
+        timeout=15,
+    )
 
     if resp.status_code == 400:
         try:
@@ -116,12 +117,12 @@ async def get_me(authorization: str | None = Header(default=None)):
 
     token = authorization[len("Bearer "):]
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{SUPABASE_URL}/auth/v1/user",
-            headers={**_anon_headers(), "Authorization": f"Bearer {token}"},
-            timeout=10,
-        )
+    client = get_client(SUPABASE_URL)
+    resp = await client.get(
+        f"{SUPABASE_URL}/auth/v1/user",
+        headers={**_anon_headers(), "Authorization": f"Bearer {token}"},
+        timeout=10,
+    )
 
     if resp.status_code == 401:
         raise HTTPException(status_code=401, detail="Token expired or invalid")
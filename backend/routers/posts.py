@@ -8,6 +8,9 @@ import httpx
 from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 
+from services.http_client import get_client
+from services.scheduler import notify_post_changed, notify_post_deleted
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -61,12 +64,12 @@ async def list_posts(
         params["platform"] = f"eq.{platform}"
 
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_headers(token),
-                params=params,
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_headers(token),
+            params=params,
+        )
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -84,15 +87,17 @@ async def create_post(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_headers(token),
-                json=post.model_dump(exclude_none=True),
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_headers(token),
+            json=post.model_dump(exclude_none=True),
+        )
         resp.raise_for_status()
         data = resp.json()
-        return data[0] if isinstance(data, list) else data
+        created = data[0] if isinstance(data, list) else data
+        notify_post_changed(created)
+        return created
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error creating post: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -108,12 +113,12 @@ async def get_post(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_headers(token),
-                params={"id": f"eq.{post_id}"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_headers(token),
+            params={"id": f"eq.{post_id}"},
+        )
         resp.raise_for_status()
         data = resp.json()
         if not data:
@@ -136,18 +141,42 @@ async def update_post(
     authorization: Optional[str] = Header(None),
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
+    update = post.model_dump(exclude_none=True)
+    if update.get("status") == "scheduled":
+        # (Re)scheduling by hand starts a fresh retry budget and a new
+        # publish, so it also gets a new idempotency key and forgets the id
+        # of any earlier publish.
+        update.update({
+            "attempts": 0,
+            "last_error": None,
+            "next_attempt_at": None,
+            "publish_key": None,
+            "publish_started_at": None,
+            "platform_post_id": None,
+        })
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.patch(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_headers(token),
-                params={"id": f"eq.{post_id}"},
-                json=post.model_dump(exclude_none=True),
-            )
+        client = get_client(SUPABASE_URL)
+        # A post mid-publish must not be edited or reset under the worker
+        # sending it (its attempts and publish_key in particular).
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_headers(token),
+            params={"id": f"eq.{post_id}", "status": "neq.publishing"},
+            json=update,
+        )
         resp.raise_for_status()
         data = resp.json()
         if not data:
+            resp = await client.get(
+                f"{SUPABASE_URL}/rest/v1/posts",
+                headers=_headers(token),
+                params={"id": f"eq.{post_id}", "select": "id"},
+            )
+            resp.raise_for_status()
+            if resp.json():
+                raise HTTPException(status_code=409, detail="Post is being published — try again shortly")
             raise HTTPException(status_code=404, detail="Post not found")
+        notify_post_changed(data[0])
         return data[0]
     except HTTPException:
         raise
@@ -166,13 +195,14 @@ async def delete_post(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_headers(token),
-                params={"id": f"eq.{post_id}"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.delete(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_headers(token),
+            params={"id": f"eq.{post_id}"},
+        )
         resp.raise_for_status()
+        notify_post_deleted(post_id)
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error deleting post: %s", e.response.text)
         raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
@@ -8,6 +8,8 @@ import httpx
 from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 
+from services.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -43,12 +45,12 @@ class PromptUpdate(BaseModel):
 async def list_prompts(authorization: Optional[str] = Header(None)):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/prompts",
-                headers=_headers(token),
-                params={"order": "created_at.desc"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/prompts",
+            headers=_headers(token),
+            params={"order": "created_at.desc"},
+        )
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -66,12 +68,12 @@ async def create_prompt(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{SUPABASE_URL}/rest/v1/prompts",
-                headers=_headers(token),
-                json=prompt.model_dump(exclude_none=True),
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/prompts",
+            headers=_headers(token),
+            json=prompt.model_dump(exclude_none=True),
+        )
         resp.raise_for_status()
         data = resp.json()
         return data[0] if isinstance(data, list) else data
@@ -91,13 +93,13 @@ async def update_prompt(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.patch(
-                f"{SUPABASE_URL}/rest/v1/prompts",
-                headers=_headers(token),
-                params={"id": f"eq.{prompt_id}"},
-                json=prompt.model_dump(exclude_none=True),
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/prompts",
+            headers=_headers(token),
+            params={"id": f"eq.{prompt_id}"},
+            json=prompt.model_dump(exclude_none=True),
+        )
         resp.raise_for_status()
         data = resp.json()
         if not data:
@@ -120,12 +122,12 @@ async def delete_prompt(
 ):
     token = authorization.replace("Bearer ", "") if authorization else None
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(
-                f"{SUPABASE_URL}/rest/v1/prompts",
-                headers=_headers(token),
-                params={"id": f"eq.{prompt_id}"},
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.delete(
+            f"{SUPABASE_URL}/rest/v1/prompts",
+            headers=_headers(token),
+            params={"id": f"eq.{prompt_id}"},
+        )
         resp.raise_for_status()
     except httpx.HTTPStatusError as e:
         logger.error("Supabase error deleting prompt: %s", e.response.text)
@@ -0,0 +1,282 @@
+"""Recurring schedules router — repeating posts stored as one rule.
+
+A schedule holds a post template and an RRULE or cron rule evaluated in its
+timezone. The scheduler turns it into ordinary posts only inside its
+look-ahead window; /preview lists upcoming occurrences without creating
+anything. Changing or deleting a schedule removes its not-yet-published
+occurrences, which are then re-created from the new rule.
+"""
+
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import APIRouter, Header, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from services import clock
+from services.http_client import get_client
+from services.recurrence import occurrences, validate_rule
+from services.scheduler import expand_recurrence, notify_post_deleted
+from services.timeutil import parse_ts
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+_MAX_PREVIEW = 100
+# Fields whose change invalidates already materialised occurrences.
+_RULE_FIELDS = {"rule", "timezone", "starts_at", "ends_at", "platform", "account_id",
+                "content", "image_url", "utm_params", "active"}
+
+
+def _headers(token: Optional[str] = None) -> Dict[str, str]:
+    key = SUPABASE_KEY
+    auth = f"Bearer {token}" if token else f"Bearer {key}"
+    return {
+        "apikey": key,
+        "Authorization": auth,
+        "Content-Type": "application/json",
+        "Prefer": "return=representation",
+    }
+
+
+class RecurringScheduleCreate(BaseModel):
+    name: Optional[str] = None
+    rule: str
+    timezone: str = "UTC"
+    starts_at: Optional[str] = None
+    ends_at: Optional[str] = None
+    platform: str
+    account_id: Optional[str] = None
+    content: str
+    image_url: Optional[str] = None
+    utm_params: Optional[Dict[str, Any]] = None
+    active: bool = True
+
+
+class RecurringScheduleUpdate(BaseModel):
+    name: Optional[str] = None
+    rule: Optional[str] = None
+    timezone: Optional[str] = None
+    starts_at: Optional[str] = None
+    ends_at: Optional[str] = None
+    platform: Optional[str] = None
+    account_id: Optional[str] = None
+    content: Optional[str] = None
+    image_url: Optional[str] = None
+    utm_params: Optional[Dict[str, Any]] = None
+    active: Optional[bool] = None
+
+
+class RecurrencePreview(BaseModel):
+    rule: str
+    timezone: str = "UTC"
+    starts_at: Optional[str] = None
+    ends_at: Optional[str] = None
+    count: int = Field(10, ge=1, le=_MAX_PREVIEW)
+
+
+def _preview(schedule: Dict[str, Any], count: int) -> List[str]:
+    now = clock.now()
+    try:
+        validate_rule(schedule["rule"], schedule.get("timezone"))
+        for field in ("starts_at", "ends_at"):
+            if schedule.get(field) and parse_ts(schedule[field]) is None:
+                raise ValueError(f"Invalid {field}: {schedule[field]!r}")
+        after = now
+        start = parse_ts(schedule.get("starts_at"))
+        if start is not None:
+            after = max(now, start - timedelta(microseconds=1))
+        return [o.isoformat() for o in occurrences(schedule, after, limit=count)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _delete_pending_occurrences(client: httpx.AsyncClient, schedule_id: str, token: Optional[str]) -> None:
+    """Remove occurrences that are still waiting to be published."""
+    resp = await client.delete(
+        f"{SUPABASE_URL}/rest/v1/posts",
+        headers=_headers(token),
+        params={"recurrence_id": f"eq.{schedule_id}", "status": "eq.scheduled"},
+    )
+    resp.raise_for_status()
+    for post in resp.json() if resp.content else []:
+        notify_post_deleted(str(post["id"]))
+
+
+async def _expand(schedule: Dict[str, Any]) -> None:
+    try:
+        await expand_recurrence(schedule)
+    except Exception as e:
+        logger.warning("Could not expand schedule %s now — the next safety poll will: %s", schedule.get("id"), e)
+
+
+@router.get("/", response_model=List[Dict[str, Any]])
+async def list_schedules(authorization: Optional[str] = Header(None)):
+    token = authorization.replace("Bearer ", "") if authorization else None
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_headers(token),
+            params={"order": "created_at.desc"},
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase error listing recurring schedules: %s", e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        logger.error("Error listing recurring schedules: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/preview", response_model=List[str])
+async def preview_rule(preview: RecurrencePreview):
+    """Next ``count`` occurrences (UTC) of an unsaved rule."""
+    return _preview(preview.model_dump(), preview.count)
+
+
+@router.post("/", response_model=Dict[str, Any], status_code=201)
+async def create_schedule(
+    schedule: RecurringScheduleCreate,
+    authorization: Optional[str] = Header(None),
+):
+    token = authorization.replace("Bearer ", "") if authorization else None
+    if not schedule.starts_at:
+        # Rules are anchored to starts_at; without a stored one every
+        # expansion would re-anchor to its own "now".
+        schedule.starts_at = clock.now().replace(second=0, microsecond=0).isoformat()
+    _preview(schedule.model_dump(), 1)
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_headers(token),
+            json=schedule.model_dump(exclude_none=True),
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        created = data[0] if isinstance(data, list) else data
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase error creating recurring schedule: %s", e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        logger.error("Error creating recurring schedule: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if created.get("active", True):
+        await _expand(created)
+    return created
+
+
+@router.get("/{schedule_id}", response_model=Dict[str, Any])
+async def get_schedule(
+    schedule_id: str,
+    authorization: Optional[str] = Header(None),
+):
+    token = authorization.replace("Bearer ", "") if authorization else None
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_headers(token),
+            params={"id": f"eq.{schedule_id}"},
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
+            raise HTTPException(status_code=404, detail="Recurring schedule not found")
+        return data[0]
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase error fetching recurring schedule: %s", e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        logger.error("Error fetching recurring schedule: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{schedule_id}/preview", response_model=List[str])
+async def preview_schedule(
+    schedule_id: str,
+    count: int = Query(10, ge=1, le=_MAX_PREVIEW),
+    authorization: Optional[str] = Header(None),
+):
+    """Next ``count`` occurrences (UTC) of a saved schedule, without creating posts."""
+    schedule = await get_schedule(schedule_id, authorization)
+    return _preview(schedule, count)
+
+
+@router.patch("/{schedule_id}", response_model=Dict[str, Any])
+async def update_schedule(
+    schedule_id: str,
+    schedule: RecurringScheduleUpdate,
+    authorization: Optional[str] = Header(None),
+):
+    token = authorization.replace("Bearer ", "") if authorization else None
+    update = schedule.model_dump(exclude_none=True)
+    if "rule" in update or "timezone" in update:
+        current = await get_schedule(schedule_id, authorization)
+        _preview({**current, **update}, 1)
+    rule_changed = bool(_RULE_FIELDS & update.keys())
+    if rule_changed:
+        # Occurrences are re-created from the new rule, starting from now.
+        update["expanded_until"] = None
+    try:
+        client = get_client(SUPABASE_URL)
+        if rule_changed:
+            await _delete_pending_occurrences(client, schedule_id, token)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_headers(token),
+            params={"id": f"eq.{schedule_id}"},
+            json=update,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
+            raise HTTPException(status_code=404, detail="Recurring schedule not found")
+        updated = data[0]
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase error updating recurring schedule: %s", e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        logger.error("Error updating recurring schedule: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if rule_changed and updated.get("active", True):
+        await _expand(updated)
+    return updated
+
+
+@router.delete("/{schedule_id}", status_code=204)
+async def delete_schedule(
+    schedule_id: str,
+    authorization: Optional[str] = Header(None),
+):
+    token = authorization.replace("Bearer ", "") if authorization else None
+    try:
+        client = get_client(SUPABASE_URL)
+        await _delete_pending_occurrences(client, schedule_id, token)
+        resp = await client.delete(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_headers(token),
+            params={"id": f"eq.{schedule_id}"},
+        )
+        resp.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase error deleting recurring schedule: %s", e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        logger.error("Error deleting recurring schedule: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
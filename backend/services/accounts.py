@@ -0,0 +1,89 @@
+"""Cached publisher_accounts lookups for the publish and analytics paths.
+
+Account rows are batch-loaded with one ``id=in.(...)`` query and kept in a
+TTL cache, so a publish cycle with 50 posts on the same account costs one
+Supabase round trip instead of 50. routers/accounts.py invalidates entries
+in-process when accounts change; other replicas pick changes up once the
+TTL expires.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from services.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+ACCOUNT_CACHE_TTL_SECONDS = float(os.getenv("ACCOUNT_CACHE_TTL_SECONDS", "300"))
+
+_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _service_headers() -> Dict[str, str]:
+    return {
+        "apikey": SUPABASE_SERVICE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+async def get_accounts(account_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Return publisher_accounts rows keyed by id.
+
+    Only ids missing from the cache (or expired) are fetched, all in a single
+    request. Unknown ids are simply absent from the result.
+
+    Raises:
+        httpx.HTTPError: If the Supabase request fails.
+    """
+    now = asyncio.get_running_loop().time()
+    wanted = {str(a) for a in account_ids if a}
+    result: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for account_id in wanted:
+        cached = _cache.get(account_id)
+        if cached is not None and cached[0] > now:
+            result[account_id] = cached[1]
+        else:
+            missing.append(account_id)
+
+    if missing:
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/publisher_accounts",
+            headers=_service_headers(),
+            params={"id": f"in.({','.join(sorted(missing))})"},
+        )
+        resp.raise_for_status()
+        expires = now + ACCOUNT_CACHE_TTL_SECONDS
+        for row in resp.json():
+            account_id = str(row["id"])
+            _cache[account_id] = (expires, row)
+            result[account_id] = row
+        logger.debug("Loaded %d account(s) from Supabase, %d from cache", len(missing), len(wanted) - len(missing))
+
+    return result
+
+
+def cached_accounts(account_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Cached rows for ``account_ids``, expired or not, without asking Supabase.
+
+    For publishing while Supabase is unreachable: credentials stay in
+    process memory and are never written to disk. Ids that were never
+    loaded, or were invalidated since, are absent.
+    """
+    wanted = {str(a) for a in account_ids if a}
+    return {a: _cache[a][1] for a in wanted if a in _cache}
+
+
+def invalidate_account(account_id: Optional[str] = None) -> None:
+    """Drop one cached account, or the whole cache when ``account_id`` is None."""
+    if account_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(str(account_id), None)
@@ -4,7 +4,8 @@ import logging
 import os
 from typing import Any, Dict, List
 
-import httpx
+from services.circuit_breaker import get_breaker
+from services.http_client import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -44,13 +45,22 @@ _PROVIDER_MAP = {m["id"]: m["provider"] for m in AVAILABLE_MODELS}
 
 
 async def generate_text(prompt: str, model: str, system: str = "") -> str:
-    """Generate text using the specified model. Dispatches to the correct provider."""
+    """Generate text using the specified model. Dispatches to the correct provider.
+
+    Raises:
+        CircuitOpenError: If the provider's circuit breaker is open.
+    """
     provider = _PROVIDER_MAP.get(model)
     if provider is None:
         raise ValueError(f"Unknown model: {model}")
 
     logger.info("Generating text with model=%s provider=%s", model, provider)
 
+    async with get_breaker(f"llm:{provider}").guard():
+        return await _dispatch(provider, prompt, model, system)
+
+
+async def _dispatch(provider: str, prompt: str, model: str, system: str) -> str:
     if provider == "openai":
         return await _openai(prompt, model, system)
     elif provider == "anthropic":
@@ -73,15 +83,16 @@ async def _openai(prompt: str, model: str, system: str) -> str:
         messages.append({"role": "system", "content": system})
     messages.append({"role": "user", "content": prompt})
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={"model": model, "messages": messages, "max_tokens": 1024},
-        )
+    client = get_client("https://api.openai.com")
+    resp = await client.post(
+        "https://api.openai.com/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={"model": model, "messages": messages, "max_tokens": 1024},
+        timeout=60.0,
+    )
     resp.raise_for_status()
     return resp.json()["choices"][0]["message"]["content"].strip()
 
@@ -97,16 +108,17 @@ async def _anthropic(prompt: str, model: str, system: str) -> str:
     if system:
         payload["system"] = system
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
+    client = get_client("https://api.anthropic.com")
+    resp = await client.post(
+        "https://api.anthropic.com/v1/messages",
+        headers={
+            "x-api-key": ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json",
+        },
+        json=payload,
+        timeout=60.0,
+    )
     resp.raise_for_status()
     return resp.json()["content"][0]["text"].strip()
 
@@ -119,13 +131,14 @@ async def _google(prompt: str, model: str, system: str) -> str:
         parts.append({"text": system + "\n\n"})
     parts.append({"text": prompt})
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent",
-            params={"key": GOOGLE_AI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": parts}]},
-        )
+    client = get_client("https://generativelanguage.googleapis.com")
+    resp = await client.post(
+        f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent",
+        params={"key": GOOGLE_AI_API_KEY},
+        headers={"Content-Type": "application/json"},
+        json={"contents": [{"parts": parts}]},
+        timeout=60.0,
+    )
     resp.raise_for_status()
     data = resp.json()
     return data["candidates"][0]["content"]["parts"][0]["text"].strip()
@@ -139,15 +152,16 @@ async def _groq(prompt: str, model: str, system: str) -> str:
         messages.append({"role": "system", "content": system})
     messages.append({"role": "user", "content": prompt})
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={"model": model, "messages": messages, "max_tokens": 1024},
-        )
+    client = get_client("https://api.groq.com")
+    resp = await client.post(
+        "https://api.groq.com/openai/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={"model": model, "messages": messages, "max_tokens": 1024},
+        timeout=60.0,
+    )
     resp.raise_for_status()
     return resp.json()["choices"][0]["message"]["content"].strip()
 
@@ -157,17 +171,18 @@ async def _huggingface(prompt: str, model: str, system: str) -> str:
         raise ValueError("HUGGINGFACE_API_KEY not configured")
     full_prompt = f"{system}\n\n{prompt}" if system else prompt
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            f"https://api-inference.huggingface.co/models/{model}/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "messages": [{"role": "user", "content": full_prompt}],
-                "max_tokens": 1024,
-            },
-        )
+    client = get_client("https://api-inference.huggingface.co")
+    resp = await client.post(
+        f"https://api-inference.huggingface.co/models/{model}/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "messages": [{"role": "user", "content": full_prompt}],
+            "max_tokens": 1024,
+        },
+        timeout=60.0,
+    )
     resp.raise_for_status()
     return resp.json()["choices"][0]["message"]["content"].strip()
@@ -1,20 +1,28 @@
-"""Analytics service — fetch real post metrics from Telegram and LinkedIn."""
+"""Analytics service — fetch real post metrics from Telegram, LinkedIn and VK."""
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-import httpx
+from services.http_client import get_client
+from services.vk import call_method as vk_call_method
 
 logger = logging.getLogger(__name__)
 
+# URNs per socialMetadata BATCH_GET request; keeps the query string well
+# under LinkedIn's URL length limit.
+_LINKEDIN_BATCH_SIZE = 50
+# wall.getById accepts at most 100 owner_post ids per call.
+_VK_BATCH_SIZE = 100
+
 
 async def fetch_telegram_channel_stats(bot_token: str, channel_id: str) -> Dict[str, Any]:
     """Get subscriber count for a Telegram channel via Bot API."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(
-            f"https://api.telegram.org/bot{bot_token}/getChatMemberCount",
-            params={"chat_id": channel_id},
-        )
+    client = get_client("https://api.telegram.org")
+    resp = await client.get(
+        f"https://api.telegram.org/bot{bot_token}/getChatMemberCount",
+        params={"chat_id": channel_id},
+        timeout=10.0,
+    )
     resp.raise_for_status()
     data = resp.json()
     if not data.get("ok"):
@@ -34,13 +42,7 @@ async def fetch_linkedin_post_stats(access_token: str, post_id: str) -> Dict[str
     post_id can be a bare numeric ID or a full URN (urn:li:ugcPost:...).
     Returns dict with likes, comments, shares, views.
     """
-    if not post_id.startswith("urn:"):
-        post_urn = f"urn:li:ugcPost:{post_id}"
-    else:
-        post_urn = post_id
-
-    # URL-encode the URN for use as a path segment
-    encoded = post_urn.replace(":", "%3A").replace(",", "%2C")
+    encoded = _encode_urn(_linkedin_urn(post_id))
 
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -48,15 +50,16 @@ async def fetch_linkedin_post_stats(access_token: str, post_id: str) -> Dict[str
     }
 
     # Remove the parentheses
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.get(
-            f"https://api.linkedin.com/rest/socialMetadata/{encoded}",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "LinkedIn-Version": "202401",
-                "X-Restli-Protocol-Version": "2.0.0"
-            },
-        )
+    client = get_client("https://api.linkedin.com")
+    resp = await client.get(
+        f"https://api.linkedin.com/rest/socialMetadata/{encoded}",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "LinkedIn-Version": "202401",
+            "X-Restli-Protocol-Version": "2.0.0"
+        },
+        timeout=15.0,
+    )
 
     if resp.status_code == 401:
         raise ValueError("LinkedIn token expired or missing r_member_social scope")
@@ -65,7 +68,19 @@ async def fetch_linkedin_post_stats(access_token: str, post_id: str) -> Dict[str
         logger.warning("LinkedIn socialMetadata returned %s for %s", resp.status_code, post_id)
         return {"likes": 0, "comments": 0, "shares": 0, "views": 0, "subscribers": 0}
 
-    data = resp.json()
+    return _linkedin_metrics(resp.json())
+
+
+def _linkedin_urn(post_id: str) -> str:
+    return post_id if post_id.startswith("urn:") else f"urn:li:ugcPost:{post_id}"
+
+
+def _encode_urn(urn: str) -> str:
+    # URL-encode the URN for use as a path segment or Rest.li List() item
+    return urn.replace(":", "%3A").replace(",", "%2C")
+
+
+def _linkedin_metrics(data: Dict[str, Any]) -> Dict[str, Any]:
     counts = (
         data.get("socialDetail", {})
         .get("totalSocialActivityCounts", {})
@@ -77,3 +92,111 @@ async def fetch_linkedin_post_stats(access_token: str, post_id: str) -> Dict[str
         "views": 0,     # requires r_organization_social scope; not fetched here
         "subscribers": 0,
     }
+
+
+async def fetch_linkedin_posts_stats(access_token: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get engagement stats for many LinkedIn posts via socialMetadata BATCH_GET.
+
+    Sends up to 50 URNs per request (``ids=List(...)``). Failures are
+    handled per URN: ids LinkedIn reports under ``errors`` (or whose whole
+    chunk failed) are logged and left out of the result, so their existing
+    analytics rows are not overwritten with zeros.
+
+    Args:
+        access_token: Token with r_member_social scope.
+        post_ids: Bare numeric IDs or full URNs, as stored in platform_post_id.
+
+    Returns:
+        Dict mapping each successfully fetched post_id to its metrics.
+
+    Raises:
+        ValueError: If the token is expired or lacks the required scope.
+    """
+    client = get_client("https://api.linkedin.com")
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "LinkedIn-Version": "202401",
+        "X-Restli-Protocol-Version": "2.0.0",
+    }
+    stats: Dict[str, Dict[str, Any]] = {}
+
+    for i in range(0, len(post_ids), _LINKEDIN_BATCH_SIZE):
+        chunk = post_ids[i:i + _LINKEDIN_BATCH_SIZE]
+        urn_to_id = {_linkedin_urn(pid): pid for pid in chunk}
+        ids_param = ",".join(_encode_urn(urn) for urn in urn_to_id)
+        resp = await client.get(
+            f"https://api.linkedin.com/rest/socialMetadata?ids=List({ids_param})",
+            headers=headers,
+            timeout=15.0,
+        )
+
+        if resp.status_code == 401:
+            raise ValueError("LinkedIn token expired or missing r_member_social scope")
+
+        if resp.status_code != 200:
+            logger.warning(
+                "LinkedIn socialMetadata BATCH_GET returned %s for %d post(s)",
+                resp.status_code, len(chunk),
+            )
+            continue
+
+        data = resp.json()
+        results = data.get("results", {})
+        errors = data.get("errors", {})
+        for urn, pid in urn_to_id.items():
+            if urn in results:
+                stats[pid] = _linkedin_metrics(results[urn])
+            else:
+                error = errors.get(urn, {})
+                logger.warning(
+                    "LinkedIn socialMetadata failed for %s: %s",
+                    pid, error.get("message") or error.get("status") or "missing from response",
+                )
+
+    return stats
+
+
+async def fetch_vk_posts_stats(access_token: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get engagement stats for many VK wall posts via wall.getById.
+
+    Sends up to 100 ``{owner_id}_{post_id}`` ids per request. Ids without an
+    owner part (stored before owner ids were recorded) cannot be queried and
+    are skipped, as are ids VK does not return (deleted or hidden posts) and
+    chunks whose request failed.
+
+    Args:
+        access_token: VK API access token with wall access.
+        post_ids: ``owner_post`` ids, as stored in platform_post_id.
+
+    Returns:
+        Dict mapping each successfully fetched post_id to its metrics.
+    """
+    wanted = [pid for pid in post_ids if "_" in pid]
+    if len(wanted) < len(post_ids):
+        logger.warning("Skipping %d VK post id(s) without an owner id", len(post_ids) - len(wanted))
+    stats: Dict[str, Dict[str, Any]] = {}
+
+    for i in range(0, len(wanted), _VK_BATCH_SIZE):
+        chunk = wanted[i:i + _VK_BATCH_SIZE]
+        try:
+            response = await vk_call_method(access_token, "wall.getById", {"posts": ",".join(chunk)})
+        except Exception as e:
+            logger.warning("VK wall.getById failed for %d post(s): %s", len(chunk), e)
+            continue
+
+        items = response.get("items", []) if isinstance(response, dict) else (response or [])
+        for item in items:
+            pid = f"{item.get('owner_id')}_{item.get('id')}"
+            stats[pid] = {
+                "views": item.get("views", {}).get("count", 0),
+                "likes": item.get("likes", {}).get("count", 0),
+                "comments": item.get("comments", {}).get("count", 0),
+                "shares": item.get("reposts", {}).get("count", 0),
+                "subscribers": 0,
+            }
+
+        missing = len(chunk) - sum(1 for pid in chunk if pid in stats)
+        if missing:
+            logger.warning("VK wall.getById returned no data for %d post(s)", missing)
+
+    return stats
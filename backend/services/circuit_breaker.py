@@ -0,0 +1,201 @@
+"""Circuit breakers for platform APIs and LLM providers.
+
+Breakers are keyed by upstream scope and, for platforms, by credential, the
+same way rate-limit buckets are (services/rate_limit.py). After
+CIRCUIT_FAILURE_THRESHOLD consecutive failures (timeouts, connection errors,
+5xx) a breaker opens and calls fail fast with CircuitOpenError instead of
+waiting out the request timeout. After CIRCUIT_RECOVERY_SECONDS it half-opens
+and lets CIRCUIT_HALF_OPEN_PROBES calls through: a success closes it, a
+failure opens it again.
+
+A 4xx answer means the upstream is up and counts as a success; errors
+raised before anything is sent (validation, throttling, cancellation) do not
+count either way.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from services.metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS
+from services.rate_limit import key_id
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "60"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open.
+
+    ``retry_after`` is the time in seconds until the breaker half-opens, so
+    callers (the scheduler) can defer the work instead of failing it.
+    """
+
+    def __init__(self, breaker: str, retry_after: float):
+        super().__init__(f"Circuit {breaker} is open — retry in {retry_after:.0f}s")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+
+def _outcome(exc: BaseException) -> Optional[bool]:
+    """True if ``exc`` is an upstream failure, False if the upstream answered, None if neither."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return None
+
+
+def _describe(exc: BaseException) -> str:
+    """Exception type and status code, for logs.
+
+    Not str(exc): httpx messages carry the request URL, which holds the
+    credential for some upstreams (Telegram bot token, Google API key).
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"{type(exc).__name__} {exc.response.status_code}"
+    return type(exc).__name__
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker on the event loop clock."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_seconds: float = CIRCUIT_RECOVERY_SECONDS,
+        half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.scope = name.partition("/")[0]
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._last_error: Optional[str] = None
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._now() - self._opened_at >= self.recovery_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through; 0 if one would be now."""
+        state = self.state
+        if state == OPEN:
+            return max(0.0, self.recovery_seconds - (self._now() - self._opened_at))
+        if state == HALF_OPEN and self._probes >= self.half_open_probes:
+            # Probes are in flight; their outcome decides.
+            return self.recovery_seconds
+        return 0.0
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = self._now()
+        elif state == CLOSED:
+            self._failures = 0
+        CIRCUIT_TRANSITIONS.labels(scope=self.scope, state=state).inc()
+        if state == OPEN:
+            logger.warning("Circuit %s open (last error: %s)", self.name, self._last_error)
+        else:
+            logger.info("Circuit %s %s", self.name, state.replace("_", "-"))
+
+    def _acquire(self) -> bool:
+        """Let a call through or raise CircuitOpenError; returns True for a half-open probe."""
+        retry_after = self.retry_after()
+        if retry_after > 0:
+            CIRCUIT_REJECTED.labels(scope=self.scope).inc()
+            raise CircuitOpenError(self.name, retry_after)
+        if self._state == HALF_OPEN:
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self, error: str = "") -> None:
+        self._failures += 1
+        self._last_error = error or self._last_error
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._transition(OPEN)
+
+    @contextlib.asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Run the enclosed upstream call through the breaker.
+
+        Raises:
+            CircuitOpenError: If the breaker is open (nothing is sent).
+        """
+        probe = self._acquire()
+        try:
+            yield
+        except BaseException as e:
+            failed = _outcome(e)
+            if failed:
+                self.record_failure(_describe(e))
+            elif failed is False:
+                self.record_success()
+            elif probe:
+                self._probes -= 1
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(scope: str, key: str = "", failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD) -> CircuitBreaker:
+    """Return the shared breaker for ``scope`` + ``key``, creating it on first use.
+
+    Args:
+        scope: Upstream name, e.g. "linkedin" or "llm:groq".
+        key: Credential the breaker is specific to; empty for the whole upstream.
+        failure_threshold: Consecutive failures that open a new breaker.
+    """
+    breaker_key = (scope, key)
+    breaker = _breakers.get(breaker_key)
+    if breaker is None:
+        name = f"{scope}/{key_id(key)}" if key else scope
+        breaker = CircuitBreaker(name, failure_threshold=failure_threshold)
+        _breakers[breaker_key] = breaker
+    return breaker
+
+
+def snapshot() -> List[Dict[str, Any]]:
+    """State of every breaker, open ones first."""
+    order = {OPEN: 0, HALF_OPEN: 1, CLOSED: 2}
+    return sorted((b.snapshot() for b in _breakers.values()), key=lambda s: (order[s["state"]], s["name"]))
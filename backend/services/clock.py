@@ -0,0 +1,103 @@
+"""Time source for the scheduler — the wall clock, or a virtual one.
+
+Scheduling code reads "now" through now() instead of datetime.now(), and
+every wait goes through the asyncio event loop (asyncio.sleep, wait_for,
+loop.time()), so both can be replaced together for simulations:
+VirtualClock.new_event_loop() returns a loop whose clock is virtual and
+which, whenever nothing is ready to run, jumps straight to its next timer
+instead of sleeping. A week of timers then replays in seconds through the
+unchanged publishing code (see benchmarks/simulate.py).
+
+Work handed to an executor (thread or process pools) takes no virtual
+time: the clock stands still until it completes.
+"""
+
+import asyncio
+import selectors
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+class VirtualClock:
+    """Clock that only moves when its event loop would otherwise sleep."""
+
+    def __init__(self, start: datetime):
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        self._start = start.astimezone(timezone.utc)
+        self._elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def advance(self, seconds: float) -> None:
+        if seconds > 0:
+            self._elapsed += seconds
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        return _VirtualEventLoop(self)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self._clock = clock
+        self.executor_jobs = 0
+
+    def select(self, timeout: Optional[float] = None):
+        # The loop passes the delay until its next timer when nothing is
+        # ready: skip that delay instead of waiting it out — unless executor
+        # jobs are running, in which case time stands still and the loop
+        # blocks until one of them reports back. A zero timeout (callbacks
+        # are ready) is a poll and stays one.
+        if timeout == 0:
+            pass
+        elif self.executor_jobs:
+            timeout = None
+        elif timeout is not None:
+            self._clock.advance(timeout)
+            timeout = 0
+        return super().select(timeout)
+
+
+class _VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock):
+        self._virtual_selector = _VirtualSelector(clock)
+        super().__init__(self._virtual_selector)
+        self._virtual_clock = clock
+
+    def time(self) -> float:
+        return self._virtual_clock.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._virtual_selector.executor_jobs += 1
+
+        def _done(_):
+            self._virtual_selector.executor_jobs -= 1
+
+        future.add_done_callback(_done)
+        return future
+
+
+_virtual: Optional[VirtualClock] = None
+
+
+def now() -> datetime:
+    """Current time as an aware UTC datetime."""
+    if _virtual is not None:
+        return _virtual.now()
+    return datetime.now(timezone.utc)
+
+
+def is_virtual() -> bool:
+    return _virtual is not None
+
+
+def use_virtual_clock(clock: Optional[VirtualClock]) -> None:
+    """Route now() to ``clock``; None restores the wall clock."""
+    global _virtual
+    _virtual = clock
@@ -0,0 +1,109 @@
+"""In-memory timer queue of upcoming scheduled_at times.
+
+The scheduler keeps a min-heap of (due time, post id) for posts inside its
+look-ahead window and sleeps until exactly the next due time instead of
+polling Supabase every minute. Routers notify it in-process when a post is
+created, rescheduled or removed; a slow safety-net poll refreshes the
+window and catches anything changed through another replica.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services import clock
+
+logger = logging.getLogger(__name__)
+
+
+class DueQueue:
+    """Min-heap of post due times that fires a callback when posts fall due.
+
+    Rescheduled and cancelled posts are removed lazily: the heap may hold
+    stale entries, but only the time recorded in ``_due`` for a post id is
+    authoritative.
+    """
+
+    def __init__(self, on_due: Callable[[], Awaitable[None]]):
+        self._on_due = on_due
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, post_id: str, when: datetime) -> None:
+        """Add or move a post to fire at ``when`` (an aware datetime)."""
+        ts = when.timestamp()
+        if self._due.get(post_id) == ts:
+            return
+        self._due[post_id] = ts
+        heapq.heappush(self._heap, (ts, post_id))
+        if self._heap[0] == (ts, post_id):
+            # New earliest deadline — re-arm the timer.
+            self._wakeup.set()
+
+    def cancel(self, post_id: str) -> None:
+        """Forget a post (published elsewhere, unscheduled or deleted)."""
+        self._due.pop(post_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """Epoch seconds of the earliest live entry, discarding stale ones."""
+        while self._heap:
+            ts, post_id = self._heap[0]
+            if self._due.get(post_id) == ts:
+                return ts
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[str]:
+        """Remove and return the ids of every live entry due at or before ``now``."""
+        due: List[str] = []
+        while True:
+            ts = self.next_due()
+            if ts is None or ts > now:
+                return due
+            _, post_id = heapq.heappop(self._heap)
+            del self._due[post_id]
+            due.append(post_id)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="due-queue")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Clear before reading the heap so a schedule() racing with this
+            # iteration still wakes the wait below.
+            self._wakeup.clear()
+            next_ts = self.next_due()
+            timeout = None
+            if next_ts is not None:
+                timeout = max(0.0, next_ts - clock.now().timestamp())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due = self.pop_due(clock.now().timestamp())
+            if not due:
+                continue
+            logger.debug("Due queue fired for %d post(s)", len(due))
+            try:
+                await self._on_due()
+            except Exception as e:
+                logger.error("Due queue callback failed: %s", e)
@@ -0,0 +1,73 @@
+"""Weighted round-robin interleaving of due posts across accounts.
+
+Due posts are ordered by scheduled_at, so one account with a bulk-scheduled
+content plan would otherwise fill a whole claim batch and push every other
+account's post due at the same minute behind it. The scheduler groups due
+posts by account and takes them in smooth weighted round-robin order (the
+nginx upstream algorithm): with weights 3 and 1 the picks run A A B A, not
+A A A B, and an account with nothing left simply drops out of the rotation.
+Each account's own posts keep their scheduled_at order.
+"""
+
+import logging
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """Parse ``"key:weight,key:weight"`` (e.g. PUBLISH_ACCOUNT_WEIGHTS)."""
+    weights: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.rpartition(":")
+        try:
+            weights[key] = max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring malformed weight %r (expected key:weight)", item)
+    return weights
+
+
+def weighted_round_robin(
+    items: Iterable[T],
+    key: Callable[[T], Hashable],
+    weight: Optional[Callable[[Hashable], int]] = None,
+    limit: Optional[int] = None,
+    per_key_cap: Optional[int] = None,
+) -> Tuple[List[T], List[T]]:
+    """Interleave ``items`` across their keys.
+
+    Args:
+        items: Items in per-key priority order (e.g. sorted by scheduled_at).
+        key: Groups items, e.g. by publisher account.
+        weight: Share of picks per key; defaults to 1 for every key.
+        limit: Stop after this many picks.
+        per_key_cap: Take at most this many items from one key.
+
+    Returns:
+        (selected in pick order, items left over).
+    """
+    queues: Dict[Hashable, List[T]] = {}
+    for item in items:
+        queues.setdefault(key(item), []).append(item)
+
+    weights = {k: max(1, weight(k)) if weight else 1 for k in queues}
+    current = {k: 0 for k in queues}
+    taken = {k: 0 for k in queues}
+    selected: List[T] = []
+
+    active = [k for k in queues if queues[k]]
+    while active and (limit is None or len(selected) < limit):
+        total = sum(weights[k] for k in active)
+        for k in active:
+            current[k] += weights[k]
+        best = max(active, key=lambda k: current[k])
+        current[best] -= total
+        selected.append(queues[best][taken[best]])
+        taken[best] += 1
+        if taken[best] >= len(queues[best]) or (per_key_cap is not None and taken[best] >= per_key_cap):
+            active.remove(best)
+
+    leftover = [item for k, queue in queues.items() for item in queue[taken[k]:]]
+    return selected, leftover
@@ -0,0 +1,148 @@
+"""Shared pooled HTTP clients for Supabase, platform and LLM APIs.
+
+One httpx.AsyncClient is kept per upstream host so keep-alive connections
+(and HTTP/2 where the server and the optional ``h2`` package support it)
+are reused across requests instead of paying a TCP+TLS handshake per call.
+
+URLs supplied by users (post images) go through get_download_client()
+instead: one bounded client that does not follow redirects, so arbitrary
+hosts never grow the registry and callers can vet every hop (see resolve()).
+
+The registry is opened in the FastAPI lifespan and closed on shutdown.
+get_client() also creates clients lazily, so the scheduler and scripts work
+outside the app as well.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from services.metrics import on_request, on_response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 — only needed to enable HTTP/2 in httpx
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("HTTP_DOWNLOAD_MAX_CONNECTIONS", "10"))
+
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_download_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[httpx.AsyncBaseTransport] = None
+_resolver: Optional[Resolver] = None
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url or "")
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _new_client(max_connections: int = HTTP_MAX_CONNECTIONS, http2: bool = True) -> httpx.AsyncClient:
+    # Upstream latency per host is recorded for /metrics via event hooks.
+    event_hooks = {"request": [on_request], "response": [on_response]}
+    if _transport is not None:
+        return httpx.AsyncClient(transport=_transport, timeout=HTTP_TIMEOUT, event_hooks=event_hooks)
+    return httpx.AsyncClient(
+        event_hooks=event_hooks,
+        http2=http2 and HTTP2_ENABLED and _HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(HTTP_MAX_KEEPALIVE, max_connections),
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the pooled client for the host of ``url``.
+
+    Args:
+        url: Any URL (or base URL) on the upstream host.
+
+    Returns:
+        A long-lived httpx.AsyncClient. Callers must not close it.
+    """
+    key = _host_key(url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[key] = client
+        logger.debug("Opened pooled HTTP client for %s", key)
+    return client
+
+
+def get_download_client() -> httpx.AsyncClient:
+    """Return the shared client for user-supplied URLs.
+
+    It has its own small connection pool (HTTP_DOWNLOAD_MAX_CONNECTIONS) and
+    never follows redirects: callers vet each hop with resolve() before
+    requesting it. Callers must not close it.
+    """
+    global _download_client
+    if _download_client is None or _download_client.is_closed:
+        _download_client = _new_client(max_connections=max(1, HTTP_DOWNLOAD_MAX_CONNECTIONS), http2=False)
+    return _download_client
+
+
+async def resolve(host: str, port: int) -> List[str]:
+    """Addresses ``host`` resolves to, as strings.
+
+    Raises:
+        OSError: If the name cannot be resolved.
+    """
+    if _resolver is not None:
+        return await _resolver(host, port)
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+async def open_clients(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    resolver: Optional[Resolver] = None,
+) -> None:
+    """Reset the registry; optionally route every client through ``transport``.
+
+    A custom transport is how benchmarks and simulations plug in fake
+    upstreams without touching the service code; ``resolver`` stands in for
+    DNS the same way, for hosts that only exist in the fakes.
+    """
+    global _transport, _resolver
+    await close_clients()
+    _transport = transport
+    _resolver = resolver
+    logger.info(
+        "HTTP client registry ready (http2=%s, max_connections=%d per host)",
+        HTTP2_ENABLED and _HTTP2_AVAILABLE, HTTP_MAX_CONNECTIONS,
+    )
+
+
+async def close_clients() -> None:
+    """Close every pooled client. Safe to call more than once."""
+    global _download_client
+    clients = list(_clients.values())
+    _clients.clear()
+    if _download_client is not None:
+        clients.append(_download_client)
+        _download_client = None
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning("Error closing HTTP client: %s", e)
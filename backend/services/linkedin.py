@@ -3,7 +3,9 @@
 import logging
 from typing import Optional
 
-import httpx
+from services.http_client import get_client
+from services.media import fetch_image, prepare_image
+from services.media_cache import media_cache, media_key
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,76 @@ _LINKEDIN_REST_API = "https://api.linkedin.com/rest"
 _LINKEDIN_VERSION = "202604"
 
 
+def _headers(access_token: str) -> dict:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+        "LinkedIn-Version": _LINKEDIN_VERSION,
+        "X-Restli-Protocol-Version": "2.0.0",
+    }
+
+
+async def upload_image(access_token: str, owner: str, image_url: str) -> str:
+    """Upload an image through the Images API and return its image URN.
+
+    The URN is cached per token and owner under both the image URL and its
+    content hash, so re-sending or cross-posting the same image uploads it
+    once, and an image uploaded ahead of time (stage_image) is reused
+    without downloading it again.
+
+    Raises:
+        httpx.HTTPError: If the download, upload registration or upload fails.
+        ValueError: If the image cannot be fitted to LinkedIn's limits.
+    """
+    url_key = media_key("linkedin", access_token, f"{owner}:{image_url}")
+    image_urn = media_cache.get(url_key)
+    if image_urn:
+        return image_urn
+
+    source, digest = await fetch_image(image_url)
+    cache_key = media_key("linkedin", access_token, f"{owner}:{digest}")
+    image_urn = media_cache.get(cache_key)
+    if image_urn:
+        media_cache.put(url_key, image_urn)
+        return image_urn
+
+    client = get_client(_LINKEDIN_REST_API)
+    resp = await client.post(
+        f"{_LINKEDIN_REST_API}/images",
+        params={"action": "initializeUpload"},
+        headers=_headers(access_token),
+        json={"initializeUploadRequest": {"owner": owner}},
+        timeout=30.0,
+    )
+    resp.raise_for_status()
+    value = resp.json()["value"]
+    upload_url, image_urn = value["uploadUrl"], value["image"]
+
+    data, content_type = await prepare_image(source, "linkedin")
+    upload_client = get_client(upload_url)
+    resp = await upload_client.put(
+        upload_url,
+        content=data,
+        headers={"Authorization": f"Bearer {access_token}", "Content-Type": content_type},
+        timeout=60.0,
+    )
+    resp.raise_for_status()
+
+    media_cache.put(cache_key, image_urn)
+    media_cache.put(url_key, image_urn)
+    logger.info("LinkedIn image uploaded: %s", image_urn)
+    return image_urn
+
+
+def _author_urn(profile_id: str) -> str:
+    return profile_id if profile_id.startswith("urn:") else f"urn:li:person:{profile_id}"
+
+
+async def stage_image(access_token: str, profile_id: str, image_url: str) -> None:
+    """Upload ``image_url`` ahead of a post that is due soon (see upload_image)."""
+    await upload_image(access_token, _author_urn(profile_id), image_url)
+
+
 async def post_to_linkedin(
     access_token: str,
     profile_id: str,
@@ -24,7 +96,7 @@ async def post_to_linkedin(
         profile_id: LinkedIn member URN (urn:li:person:xxx) or
                     organization URN (urn:li:organization:xxx).
         text: Post text content.
-        image_url: Optional image URL (not yet supported by this integration).
+        image_url: Optional image URL; uploaded via the Images API.
 
     Returns:
         Dict with post id and status.
@@ -32,17 +104,9 @@ async def post_to_linkedin(
     Raises:
         httpx.HTTPStatusError: If LinkedIn API returns an error.
     """
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "LinkedIn-Version": _LINKEDIN_VERSION,
-        "X-Restli-Protocol-Version": "2.0.0",
-    }
+    headers = _headers(access_token)
 
-    if not profile_id.startswith("urn:"):
-        author = f"urn:li:person:{profile_id}"
-    else:
-        author = profile_id
+    author = _author_urn(profile_id)
 
     payload: dict = {
         "author": author,
@@ -58,10 +122,12 @@ async def post_to_linkedin(
     }
 
     if image_url:
-        logger.warning("Image posting is not yet supported in REST API; posting text only.")
+        payload["content"] = {"media": {"id": await upload_image(access_token, author, image_url)}}
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(f"{_LINKEDIN_REST_API}/posts", headers=headers, json=payload)
+    client = get_client(_LINKEDIN_REST_API)
+    resp = await client.post(
+        f"{_LINKEDIN_REST_API}/posts", headers=headers, json=payload, timeout=30.0
+    )
 
     if not resp.is_success:
         logger.error("LinkedIn API error %s: %s", resp.status_code, resp.text)
@@ -0,0 +1,257 @@
+"""Image pipeline for platform uploads: download once, fit per platform, upload.
+
+Images referenced by URL are downloaded once (concurrent requests for the
+same URL share one download, and recent downloads are kept in a small LRU),
+then resized/re-encoded to each platform's limits. Pillow work is CPU-bound,
+so it runs in a process pool instead of on the event loop. The platform
+modules upload the result with multipart/binary requests and cache the
+returned asset ids in services.media_cache.
+
+Image URLs come from users, so downloads only go to public addresses: the
+host is resolved and checked before every request, redirects are followed
+by hand (each hop checked the same way) and the body size is capped.
+
+Posts due soon can be staged: the scheduler downloads and fits their images
+ahead of time (stage_upload) and the send collects the upload-ready bytes
+(take_staged) instead of doing that work at the due instant.
+
+Pillow is optional: without it images are uploaded unchanged, provided they
+are within the platform's size limit.
+"""
+
+import asyncio
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from services.http_client import get_download_client, resolve
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+MEDIA_MAX_DOWNLOAD_BYTES = int(os.getenv("MEDIA_MAX_DOWNLOAD_BYTES", str(20 * 1024 * 1024)))
+MEDIA_MAX_REDIRECTS = int(os.getenv("MEDIA_MAX_REDIRECTS", "3"))
+MEDIA_DOWNLOAD_CACHE_ENTRIES = int(os.getenv("MEDIA_DOWNLOAD_CACHE_ENTRIES", "16"))
+MEDIA_PROCESS_WORKERS = int(os.getenv("MEDIA_PROCESS_WORKERS", "2"))
+# Upload-ready images prepared ahead of a post's due time, bounded by size.
+MEDIA_STAGED_MAX_BYTES = int(os.getenv("MEDIA_STAGED_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# (longest side in px, max bytes) accepted by each platform's photo upload.
+# Telegram: sendPhoto ≤ 10 MB and is downscaled to 2560 px anyway.
+# VK: wall photos ≤ 50 MB, width + height ≤ 14000.
+# LinkedIn: images API ≤ 36,152,320 px.
+_PLATFORM_LIMITS: Dict[str, Tuple[int, int]] = {
+    "telegram": (2560, 10 * 1024 * 1024),
+    "vk": (4096, 50 * 1024 * 1024),
+    "linkedin": (4096, 10 * 1024 * 1024),
+}
+
+_PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif"}
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif"}
+
+_downloads: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_staged: "OrderedDict[Tuple[str, str], Tuple[bytes, str, str]]" = OrderedDict()
+_staged_bytes = 0
+_inflight: Dict[str, asyncio.Task] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _sniff_content_type(data: bytes) -> Optional[str]:
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def _fit_image(data: bytes, max_side: int, max_bytes: int) -> Tuple[bytes, str]:
+    """Resize/re-encode ``data`` to fit the limits. Runs in a worker process."""
+    if Image is None:
+        content_type = _sniff_content_type(data)
+        if content_type is None:
+            raise ValueError("Unsupported image format (install Pillow to convert it)")
+        if len(data) > max_bytes:
+            raise ValueError(f"Image is {len(data)} bytes, limit is {max_bytes} (install Pillow to shrink it)")
+        return data, content_type
+
+    with Image.open(io.BytesIO(data)) as img:
+        content_type = _PASSTHROUGH_FORMATS.get(img.format or "")
+        if content_type and max(img.size) <= max_side and len(data) <= max_bytes:
+            return data, content_type
+
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_side, max_side))
+
+        quality = 90
+        while True:
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=quality, optimize=True)
+            if buf.tell() <= max_bytes or quality <= 50:
+                return buf.getvalue(), "image/jpeg"
+            quality -= 10
+
+
+async def _check_public(url: httpx.URL) -> None:
+    """Refuse URLs that are not http(s) or whose host has a non-public address.
+
+    Raises:
+        ValueError: If the URL may not be fetched.
+        httpx.ConnectError: If the host cannot be resolved.
+    """
+    if url.scheme not in ("http", "https") or not url.host:
+        raise ValueError(f"Image URL {url} is not an http(s) URL")
+    if _is_ip(url.host):
+        addresses = [url.host]
+    else:
+        try:
+            addresses = await resolve(url.host, url.port or (443 if url.scheme == "https" else 80))
+        except OSError as e:
+            raise httpx.ConnectError(f"Cannot resolve image host {url.host}: {e}") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        mapped = getattr(ip, "ipv4_mapped", None)
+        if not (mapped or ip).is_global:
+            raise ValueError(f"Image host {url.host} resolves to non-public address {address}")
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+async def _download(url: str) -> Tuple[bytes, str]:
+    client = get_download_client()
+    target = httpx.URL(url)
+    for _ in range(MEDIA_MAX_REDIRECTS + 1):
+        await _check_public(target)
+        async with client.stream("GET", target, timeout=30.0) as resp:
+            if resp.has_redirect_location:
+                target = target.join(resp.headers["location"])
+                continue
+            resp.raise_for_status()
+            declared = int(resp.headers.get("content-length") or 0)
+            if declared > MEDIA_MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"Image at {url} is {declared} bytes, limit is {MEDIA_MAX_DOWNLOAD_BYTES}")
+            chunks = []
+            size = 0
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                if size > MEDIA_MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Image at {url} exceeds {MEDIA_MAX_DOWNLOAD_BYTES} bytes")
+                chunks.append(chunk)
+        data = b"".join(chunks)
+        return data, hashlib.sha256(data).hexdigest()
+    raise ValueError(f"Image at {url} redirects more than {MEDIA_MAX_REDIRECTS} times")
+
+
+async def fetch_image(url: str) -> Tuple[bytes, str]:
+    """Download an image once and return ``(bytes, sha256 hex digest)``.
+
+    Raises:
+        httpx.HTTPError: If the download fails.
+        ValueError: If the image exceeds MEDIA_MAX_DOWNLOAD_BYTES, or the URL
+            (or a redirect) points at a non-public address.
+    """
+    cached = _downloads.get(url)
+    if cached is not None:
+        _downloads.move_to_end(url)
+        return cached
+
+    task = _inflight.get(url)
+    if task is None:
+        task = asyncio.create_task(_download(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda _: _inflight.pop(url, None))
+    result = await asyncio.shield(task)
+
+    _downloads[url] = result
+    _downloads.move_to_end(url)
+    while len(_downloads) > max(0, MEDIA_DOWNLOAD_CACHE_ENTRIES):
+        _downloads.popitem(last=False)
+    return result
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, MEDIA_PROCESS_WORKERS))
+    return _pool
+
+
+async def prepare_image(data: bytes, platform: str) -> Tuple[bytes, str]:
+    """Fit image bytes to ``platform``'s limits; returns ``(bytes, content type)``.
+
+    Raises:
+        ValueError: If the image cannot be converted or is too large.
+    """
+    max_side, max_bytes = _PLATFORM_LIMITS[platform]
+    if Image is None:
+        return _fit_image(data, max_side, max_bytes)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _fit_image, data, max_side, max_bytes)
+
+
+async def stage_upload(url: str, platform: str) -> str:
+    """Download and fit an image now so a later send can upload it at once.
+
+    The result is held until take_staged() collects it (oldest dropped first
+    beyond MEDIA_STAGED_MAX_BYTES). Returns the image's sha256 digest.
+    """
+    global _staged_bytes
+    source, digest = await fetch_image(url)
+    data, content_type = await prepare_image(source, platform)
+
+    previous = _staged.pop((platform, url), None)
+    if previous is not None:
+        _staged_bytes -= len(previous[0])
+    _staged[(platform, url)] = (data, content_type, digest)
+    _staged_bytes += len(data)
+    while _staged_bytes > MEDIA_STAGED_MAX_BYTES and _staged:
+        _, (dropped, _, _) = _staged.popitem(last=False)
+        _staged_bytes -= len(dropped)
+    return digest
+
+
+def take_staged(url: str, platform: str) -> Optional[Tuple[bytes, str, str]]:
+    """Collect a staged image as ``(bytes, content type, digest)``, if any."""
+    global _staged_bytes
+    staged = _staged.pop((platform, url), None)
+    if staged is not None:
+        _staged_bytes -= len(staged[0])
+    return staged
+
+
+def upload_filename(content_type: str) -> str:
+    """File name to send in multipart uploads for ``content_type``."""
+    return f"image.{_EXTENSIONS.get(content_type, 'jpg')}"
+
+
+def shutdown_media_pool() -> None:
+    """Stop the image worker processes (called from the app lifespan)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,55 @@
+"""LRU cache of platform media ids for images that were already uploaded.
+
+Platforms hand back a reusable id once they have ingested an image
+(Telegram ``file_id``, VK ``photo{owner}_{id}``, LinkedIn image URN). Re-sending
+the id skips the platform re-downloading or us re-uploading the same bytes,
+which matters when one image is cross-posted to several channels. Ids are
+scoped to the credential that uploaded them, since e.g. a Telegram file_id
+is only valid for the bot that received it.
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from services.rate_limit import key_id
+
+logger = logging.getLogger(__name__)
+
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "1000"))
+
+
+class MediaCache:
+    """Bounded mapping of media key → platform media id, evicting least recently used."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        media_id = self._entries.get(key)
+        if media_id is not None:
+            self._entries.move_to_end(key)
+        return media_id
+
+    def put(self, key: Hashable, media_id: str) -> None:
+        self._entries[key] = media_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        """Forget an id the platform rejected, so the next send re-uploads."""
+        self._entries.pop(key, None)
+
+
+def media_key(platform: str, credential: str, source: str) -> Tuple[str, str, str]:
+    """Cache key for ``source`` (image URL or content hash) uploaded with ``credential``."""
+    return (platform, key_id(credential), source)
+
+
+media_cache = MediaCache(MEDIA_CACHE_MAX_ENTRIES)
@@ -0,0 +1,123 @@
+"""Prometheus metrics for the scheduler, publish pipeline and upstream calls.
+
+Metrics live in the default prometheus_client registry and are served by
+the /metrics endpoint in main.py. Each API process exposes its own values;
+Prometheus aggregates across replicas.
+"""
+
+import functools
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DUE_QUEUE_DEPTH = Gauge(
+    "scheduler_due_queue_depth",
+    "Posts waiting in the in-process timer queue",
+)
+PUBLISH_LAG = Histogram(
+    "publish_lag_seconds",
+    "Actual publish time minus scheduled_at",
+    ["platform"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 14400),
+)
+PUBLISH_RESULTS = Counter(
+    "publish_results_total",
+    "Publish attempts by platform and outcome (published, retry, deferred, failed, dead_letter, skipped)",
+    ["platform", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Wall-clock duration of scheduler job runs",
+    ["job"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+JOB_OVERRUNS = Counter(
+    "scheduler_job_overruns_total",
+    "Scheduled job runs skipped or missed because a previous run was still going",
+    ["job"],
+)
+JOB_COALESCED = Counter(
+    "scheduler_job_coalesced_total",
+    "Job calls that joined or queued behind an in-flight run instead of starting one",
+    ["job"],
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes by upstream scope and new state",
+    ["scope", "state"],
+)
+CIRCUIT_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Upstream calls failed fast because their circuit breaker was open",
+    ["scope"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Time to response headers for outgoing HTTP requests, by upstream "
+    "(telegram, vk, linkedin, supabase or other)",
+    ["host"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+_STARTED_AT = "metrics_started_at"
+
+# The host label is one of a fixed set of upstreams: image downloads go to
+# arbitrary user-supplied hosts, which must not become label values.
+_SUPABASE_HOST = (urlsplit(os.getenv("SUPABASE_URL") or "").hostname or "").lower()
+_UPSTREAM_DOMAINS = (
+    ("telegram.org", "telegram"),
+    ("vk.com", "vk"),
+    ("linkedin.com", "linkedin"),
+    ("supabase.co", "supabase"),
+)
+
+
+def upstream_label(host: str) -> str:
+    """Metric label for an outgoing request's host."""
+    host = (host or "").lower()
+    if _SUPABASE_HOST and host == _SUPABASE_HOST:
+        return "supabase"
+    for domain, label in _UPSTREAM_DOMAINS:
+        if host == domain or host.endswith("." + domain):
+            return label
+    return "other"
+
+
+def timed_job(job: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator recording an async job's run time in JOB_DURATION."""
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> T:
+            started = time.monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                JOB_DURATION.labels(job=job).observe(time.monotonic() - started)
+        return wrapper
+    return decorator
+
+
+async def on_request(request: httpx.Request) -> None:
+    """httpx event hook: remember when the request was sent."""
+    request.extensions[_STARTED_AT] = time.monotonic()
+
+
+async def on_response(response: httpx.Response) -> None:
+    """httpx event hook: observe latency for the request's host."""
+    started = response.request.extensions.get(_STARTED_AT)
+    if started is not None:
+        UPSTREAM_LATENCY.labels(host=upstream_label(response.request.url.host)).observe(time.monotonic() - started)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
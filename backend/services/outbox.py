@@ -0,0 +1,190 @@
+"""Local write-ahead outbox that keeps publishing alive through Supabase outages.
+
+A SQLite database in WAL mode holds two things:
+
+* copies of posts due within the prefetch window, refreshed by the
+  scheduler's safety poll, so the timer queue keeps firing on time while
+  Supabase is unreachable;
+* status updates that could not be written to Supabase, replayed in order
+  once it is reachable again. An update that carries a publish_key only
+  applies while the row still has that key, so replaying it twice, or after
+  the post was rescheduled, changes nothing.
+
+Local post rows move through pending → claimed (being handled by the normal
+Supabase-leased path). A claimed post whose attempt was recorded upstream
+but whose retry could only be queued here is held: held posts, and only
+those, may be re-sent offline (held → sending → deleted once the outcome is
+queued). Credentials are never written here; the offline path reads them
+from the in-process account cache.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id      TEXT PRIMARY KEY,
+    due_ts  REAL NOT NULL,
+    state   TEXT NOT NULL DEFAULT 'pending',
+    data    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_state_due_idx ON posts (state, due_ts);
+-- Earlier versions kept publisher account rows, tokens included, here.
+DROP TABLE IF EXISTS accounts;
+CREATE TABLE IF NOT EXISTS pending_updates (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_id TEXT NOT NULL,
+    data    TEXT NOT NULL
+);
+"""
+
+
+class Outbox:
+    """SQLite-backed store of prefetched posts and unsent status updates."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across process crashes in WAL mode; only an OS
+        # crash can lose the last transactions.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # -- prefetched posts ---------------------------------------------------
+
+    def store_window(self, posts: Iterable[Tuple[Dict[str, Any], float]], horizon_ts: float) -> None:
+        """Replace the pending copies of posts due up to ``horizon_ts``.
+
+        ``posts`` are (row, due timestamp) pairs for every scheduled post in
+        the window. Pending copies no longer in it (published elsewhere,
+        rescheduled, deleted) are dropped; claimed/sending rows are left
+        alone.
+        """
+        rows = [(str(p["id"]), due_ts, json.dumps(p)) for p, due_ts in posts]
+        with self._lock, self._db:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS window_ids (id TEXT PRIMARY KEY)")
+            self._db.execute("DELETE FROM window_ids")
+            self._db.executemany("INSERT OR IGNORE INTO window_ids VALUES (?)", [(r[0],) for r in rows])
+            self._db.execute(
+                "DELETE FROM posts WHERE state = 'pending' AND due_ts <= ? "
+                "AND id NOT IN (SELECT id FROM window_ids)",
+                (horizon_ts,),
+            )
+            self._db.executemany(
+                "INSERT INTO posts (id, due_ts, state, data) VALUES (?, ?, 'pending', ?) "
+                "ON CONFLICT(id) DO UPDATE SET due_ts = excluded.due_ts, data = excluded.data "
+                "WHERE posts.state = 'pending'",
+                rows,
+            )
+
+    def store_post(self, post: Dict[str, Any], due_ts: float) -> None:
+        """Insert or refresh one pending copy (e.g. after an edit through the API)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO posts (id, due_ts, state, data) VALUES (?, ?, 'pending', ?) "
+                "ON CONFLICT(id) DO UPDATE SET due_ts = excluded.due_ts, data = excluded.data "
+                "WHERE posts.state = 'pending'",
+                (str(post["id"]), due_ts, json.dumps(post)),
+            )
+
+    def due_posts(self, now_ts: float, limit: int, state: str = "pending") -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT data FROM posts WHERE state = ? AND due_ts <= ? ORDER BY due_ts LIMIT ?",
+                (state, now_ts, limit),
+            )
+            return [json.loads(row[0]) for row in cur.fetchall()]
+
+    def interrupted(self) -> List[Dict[str, Any]]:
+        """Posts whose offline send started but never finished (process died)."""
+        with self._lock:
+            cur = self._db.execute("SELECT data FROM posts WHERE state = 'sending'")
+            return [json.loads(row[0]) for row in cur.fetchall()]
+
+    def begin_send(self, post: Dict[str, Any]) -> None:
+        """Mark an offline send as started, before the platform call."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE posts SET state = 'sending', data = ? WHERE id = ?",
+                (json.dumps(post), str(post["id"])),
+            )
+
+    def drop_state(self, state: str) -> int:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM posts WHERE state = ?", (state,)).rowcount
+
+    def set_state(self, post_ids: Iterable[str], state: str) -> None:
+        with self._lock, self._db:
+            self._db.executemany("UPDATE posts SET state = ? WHERE id = ?", [(state, str(i)) for i in post_ids])
+
+    def hold(self, post: Dict[str, Any], due_ts: float) -> None:
+        """Keep a claimed post for an offline retry at ``due_ts`` (held state)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO posts (id, due_ts, state, data) VALUES (?, ?, 'held', ?) "
+                "ON CONFLICT(id) DO UPDATE SET due_ts = excluded.due_ts, state = 'held', data = excluded.data",
+                (str(post["id"]), due_ts, json.dumps(post)),
+            )
+
+    def reschedule(self, post: Dict[str, Any], due_ts: float) -> None:
+        """Put an offline send back to held with updated data (offline retry)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE posts SET state = 'held', due_ts = ?, data = ? WHERE id = ?",
+                (due_ts, json.dumps(post), str(post["id"])),
+            )
+
+    def release(self, post_id: str) -> None:
+        """Drop the copy of a post handled through Supabase, unless it is held."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM posts WHERE id = ? AND state != 'held'", (str(post_id),))
+
+    def forget(self, post_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM posts WHERE id = ?", (str(post_id),))
+
+    # -- status updates awaiting replay ---------------------------------------
+
+    def queue_update(self, post_id: str, update: Dict[str, Any]) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO pending_updates (post_id, data) VALUES (?, ?)",
+                (str(post_id), json.dumps(update)),
+            )
+
+    def pending_updates(self, limit: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """Oldest queued updates as (seq, post_id, update)."""
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT seq, post_id, data FROM pending_updates ORDER BY seq LIMIT ?", (limit,),
+            )
+            return [(seq, post_id, json.loads(data)) for seq, post_id, data in cur.fetchall()]
+
+    def has_pending_updates(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM pending_updates LIMIT 1").fetchone() is not None
+
+    def ack_updates(self, seqs: Iterable[int]) -> None:
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM pending_updates WHERE seq = ?", [(s,) for s in seqs])
+
+
+def open_outbox(path: Optional[str]) -> Optional[Outbox]:
+    """Open the outbox at ``path``; None (disabled) if unset or it cannot be opened."""
+    if not path:
+        return None
+    try:
+        return Outbox(path)
+    except sqlite3.Error as e:
+        logger.error("Could not open outbox at %s — offline publishing disabled: %s", path, e)
+        return None
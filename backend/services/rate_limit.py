@@ -0,0 +1,102 @@
+"""Token-bucket rate limiting for platform APIs.
+
+Buckets are keyed by platform scope and credential (bot token, access
+token, chat), so every publish that shares a quota also shares a bucket.
+When a platform signals throttling (Telegram 429 retry_after, VK error 6)
+the bucket is paused, and every caller waits instead of failing.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MIN_WAIT = 0.001
+
+
+class RateLimitedError(Exception):
+    """Raised when a platform keeps throttling after local backoff is exhausted.
+
+    ``retry_after`` is the platform's suggested wait in seconds, so callers
+    (the scheduler) can re-queue the work instead of failing it.
+    """
+
+    def __init__(self, platform: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.platform = platform
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Async token bucket with an adaptive pause.
+
+    Waiters are served in FIFO order. Time comes from the event loop clock,
+    which is monotonic.
+    """
+
+    def __init__(self, rate: float, capacity: float, name: str = ""):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._tokens = capacity
+        self._updated: Optional[float] = None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available, then take it."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # Floored: a float-rounding deficit would otherwise sleep
+                # for less than the loop's clock resolution, which returns
+                # without time passing (and spins forever on a virtual clock).
+                await asyncio.sleep(max((1 - self._tokens) / self.rate, _MIN_WAIT))
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` and drain the bucket."""
+        now = asyncio.get_running_loop().time()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+        logger.warning("Rate limiter %s paused for %.1fs", self.name, seconds)
+
+
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+
+def key_id(secret: str) -> str:
+    """Short, non-reversible id for a token, safe to use in logs."""
+    return hashlib.sha256(secret.encode()).hexdigest()[:8]
+
+
+def get_bucket(scope: str, key: str, rate: float, capacity: float) -> TokenBucket:
+    """Return the shared bucket for ``scope`` + ``key``, creating it on first use.
+
+    Args:
+        scope: Quota name, e.g. "telegram:bot" or "vk:token".
+        key: Credential or chat the quota applies to.
+        rate: Tokens added per second.
+        capacity: Maximum burst size.
+    """
+    bucket_key = (scope, key)
+    bucket = _buckets.get(bucket_key)
+    if bucket is None:
+        bucket = TokenBucket(rate, capacity, name=f"{scope}/{key_id(key)}")
+        _buckets[bucket_key] = bucket
+    return bucket
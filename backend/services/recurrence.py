@@ -0,0 +1,103 @@
+"""Recurring schedules — rules stored once, expanded into posts lazily.
+
+A recurring_schedules row holds a post template (platform, account,
+content, image) and a rule, either an iCalendar RRULE
+("FREQ=WEEKLY;BYDAY=MO;BYHOUR=10;BYMINUTE=0") or a five-field cron
+expression ("0 10 * * mon"). Rules are evaluated in the schedule's IANA
+timezone, so "10:00 every Monday" stays at 10:00 local time across DST
+changes. The scheduler materialises occurrences into posts only inside its
+look-ahead window (see services.scheduler.expand_recurrences); previews are
+computed here without touching the posts table.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from apscheduler.triggers.cron import CronTrigger
+from dateutil.rrule import rrulestr
+
+from services import clock
+from services.timeutil import parse_ts
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on occurrences returned by one preview or expansion call, so a
+# rule like FREQ=MINUTELY cannot flood the posts table.
+MAX_OCCURRENCES = 500
+
+
+def _zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def _is_rrule(rule: str) -> bool:
+    return "FREQ=" in rule.upper()
+
+
+def _iter_occurrences(rule: str, tz: ZoneInfo, starts_at: datetime, after: datetime) -> Iterator[datetime]:
+    """Occurrences strictly after ``after``, as aware datetimes in ``tz``."""
+    if _is_rrule(rule):
+        parsed = rrulestr(rule, dtstart=starts_at.astimezone(tz))
+        yield from parsed.xafter(after.astimezone(tz), inc=False)
+        return
+
+    trigger = CronTrigger.from_crontab(rule, timezone=tz)
+    # Cron has no start of its own; nothing fires before starts_at, and a
+    # fire time exactly on starts_at counts (as RRULE's dtstart does).
+    fire = trigger.get_next_fire_time(None, max(after + timedelta(microseconds=1), starts_at))
+    while fire is not None:
+        yield fire
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(seconds=1))
+
+
+def validate_rule(rule: str, tz_name: Optional[str]) -> None:
+    """Raise ValueError if ``rule`` or ``tz_name`` cannot be evaluated."""
+    tz = _zone(tz_name)
+    try:
+        next(_iter_occurrences(rule, tz, clock.now(), clock.now()), None)
+    except Exception as e:
+        kind = "RRULE" if _is_rrule(rule) else "cron expression"
+        raise ValueError(f"Invalid {kind} {rule!r}: {e}")
+
+
+def occurrences(
+    schedule: Dict[str, Any],
+    after: datetime,
+    until: Optional[datetime] = None,
+    limit: int = MAX_OCCURRENCES,
+) -> List[datetime]:
+    """Occurrences of ``schedule`` after ``after`` (and up to ``until``), in UTC.
+
+    ``schedule`` is a recurring_schedules row (or the same fields from a
+    request): rule, timezone, starts_at, ends_at. Rows are created with a
+    starts_at; older rows without one are anchored to created_at, unsaved
+    rules to now — to the minute, so occurrences don't inherit its seconds.
+
+    Raises:
+        ValueError: If the rule or timezone is invalid.
+    """
+    tz = _zone(schedule.get("timezone"))
+    starts_at = (
+        parse_ts(schedule.get("starts_at"))
+        or parse_ts(schedule.get("created_at"))
+        or clock.now()
+    )
+    if not schedule.get("starts_at"):
+        starts_at = starts_at.replace(second=0, microsecond=0)
+    ends_at = parse_ts(schedule.get("ends_at"))
+    if ends_at is not None and (until is None or ends_at < until):
+        until = ends_at
+
+    result: List[datetime] = []
+    for occurrence in _iter_occurrences(schedule["rule"], tz, starts_at, after):
+        if until is not None and occurrence > until:
+            break
+        result.append(occurrence.astimezone(timezone.utc))
+        if len(result) >= min(limit, MAX_OCCURRENCES):
+            break
+    return result
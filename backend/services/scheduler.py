@@ -1,27 +1,239 @@
 """APScheduler-based auto-posting service.
 
-Checks for scheduled posts every minute and publishes them via the
-appropriate platform service (Telegram / LinkedIn / VK).
-Refreshes analytics metrics every 30 minutes.
+Keeps an in-memory timer queue of upcoming scheduled_at times and publishes
+posts via the appropriate platform service (Telegram / LinkedIn / VK) the
+moment they fall due. routers/posts.py notifies the queue when posts are
+created or rescheduled; a slow safety-net poll refreshes the look-ahead
+window and publishes anything the queue missed.
+Due posts are published concurrently, bounded by a global limit plus
+per-platform and per-account limits, so one slow upstream cannot stall
+the rest of the batch. Claimed posts are handed to a pool of publish tasks
+that outlive the cycle that claimed them, so the next claim never waits
+for the slowest send of the previous one.
+
+Every API replica runs this scheduler. Due posts are claimed with a
+conditional PATCH (scheduled -> publishing, with a lease owner and expiry)
+so replicas split the due set instead of publishing duplicates; leases
+left behind by a crashed worker are returned to "scheduled" once expired.
+
+Transient publish errors (timeouts, 5xx, throttling) put the post back to
+"scheduled" with a jittered exponential next_attempt_at; permanent errors
+(auth, validation) mark it "failed", and a post that exhausts its attempts
+is moved to "dead_letter". Both record last_error.
+
+Every attempt stamps publish_started_at and a stable publish_key before the
+platform call. Expired leases on posts that were never sent are simply
+re-queued; interrupted sends are reconciled instead — re-sent only where
+the platform deduplicates on the key (VK guid), otherwise dead-lettered for
+review — so a crash mid-publish never produces a duplicate post.
+Refreshes analytics metrics every 30 minutes: each run pages through all
+published posts and only refreshes those whose age-based interval has
+elapsed since their last fetch.
+
+Publish cycles and analytics refreshes are single-flight per process
+(services/singleflight.py), whoever triggers them.
+
+Platform calls go through circuit breakers (services/circuit_breaker.py),
+one per platform and one per account token. Posts whose breaker is open
+are deferred until it half-opens, without using up an attempt.
 """
 
+import asyncio
+import html
+import json
 import logging
 import os
-from typing import Any, Dict, Optional
+import random
+import re
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import httpx
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from services.linkedin import post_to_linkedin
-from services.telegram import send_message
-from services.vk import post_to_vk
+from services import clock
+from services.accounts import ACCOUNT_CACHE_TTL_SECONDS, cached_accounts, get_accounts
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from services.due_queue import DueQueue
+from services.fairness import parse_weights, weighted_round_robin
+from services.http_client import get_client
+from services.linkedin import post_to_linkedin, stage_image
+from services.metrics import DUE_QUEUE_DEPTH, JOB_OVERRUNS, PUBLISH_LAG, PUBLISH_RESULTS, timed_job
+from services.outbox import Outbox, open_outbox
+from services.recurrence import MAX_OCCURRENCES, occurrences
+from services.rate_limit import RateLimitedError
+from services.singleflight import SingleFlight
+from services.telegram import send_message, stage_photo
+from services.timeutil import parse_ts
+from services.vk import post_to_vk, upload_wall_photo
 
 logger = logging.getLogger(__name__)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
+# Concurrency limits for a publish cycle. PUBLISH_CONCURRENCY=1 restores the
+# old strictly sequential behaviour.
+PUBLISH_CONCURRENCY = int(os.getenv("PUBLISH_CONCURRENCY", "20"))
+PUBLISH_ACCOUNT_CONCURRENCY = int(os.getenv("PUBLISH_ACCOUNT_CONCURRENCY", "2"))
+_PLATFORM_CONCURRENCY: Dict[str, int] = {
+    "telegram": int(os.getenv("PUBLISH_CONCURRENCY_TELEGRAM", "10")),
+    "linkedin": int(os.getenv("PUBLISH_CONCURRENCY_LINKEDIN", "5")),
+    "vk": int(os.getenv("PUBLISH_CONCURRENCY_VK", "5")),
+}
+
+# Lease-based claiming — lets several replicas share the publish load.
+SCHEDULER_WORKER_ID = os.getenv("SCHEDULER_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+PUBLISH_LEASE_SECONDS = int(os.getenv("PUBLISH_LEASE_SECONDS", "300"))
+PUBLISH_CLAIM_BATCH_SIZE = int(os.getenv("PUBLISH_CLAIM_BATCH_SIZE", "500"))
+
+# Fair claiming — at most PUBLISH_ACCOUNT_CLAIM_CAP posts per account are
+# claimed and not yet finished at a time, and a claim picks its batch by
+# weighted round-robin across accounts, so a bulk schedule on one account
+# cannot crowd out everyone else's posts. When
+# a candidate page is dominated by accounts already at the cap, up to
+# PUBLISH_FAIR_SCAN_ROUNDS pages are read, each excluding those accounts.
+# PUBLISH_ACCOUNT_WEIGHTS gives accounts a larger share: "account_id:3,...".
+PUBLISH_FAIR_SCAN_ROUNDS = int(os.getenv("PUBLISH_FAIR_SCAN_ROUNDS", "3"))
+PUBLISH_ACCOUNT_CLAIM_CAP = int(os.getenv("PUBLISH_ACCOUNT_CLAIM_CAP", "50"))
+# Claimed posts pending in this process's publish pool, across accounts.
+PUBLISH_MAX_IN_FLIGHT = int(os.getenv("PUBLISH_MAX_IN_FLIGHT", str(PUBLISH_CLAIM_BATCH_SIZE)))
+# On shutdown, sends already in progress get this long to finish; claimed
+# posts that have not started are left to lease recovery.
+PUBLISH_SHUTDOWN_GRACE_SECONDS = float(os.getenv("PUBLISH_SHUTDOWN_GRACE_SECONDS", "30"))
+_ACCOUNT_WEIGHTS = parse_weights(os.getenv("PUBLISH_ACCOUNT_WEIGHTS", ""))
+
+# Catch-up after downtime. Posts overdue by more than
+# PUBLISH_CATCHUP_AFTER_SECONDS are spread out per account — a burst of
+# PUBLISH_CATCHUP_BURST, then one every PUBLISH_CATCHUP_SPACING_SECONDS —
+# instead of all hitting the platform at once. Posts overdue by more than
+# PUBLISH_STALE_AFTER_MINUTES (0 = never stale) are handled by
+# PUBLISH_STALE_POLICY: "publish" anyway, "skip" (status skipped) or
+# "reschedule" to the same time of day on the next day.
+PUBLISH_CATCHUP_AFTER_SECONDS = int(os.getenv("PUBLISH_CATCHUP_AFTER_SECONDS", "300"))
+PUBLISH_CATCHUP_BURST = int(os.getenv("PUBLISH_CATCHUP_BURST", "3"))
+PUBLISH_CATCHUP_SPACING_SECONDS = float(os.getenv("PUBLISH_CATCHUP_SPACING_SECONDS", "60"))
+PUBLISH_STALE_AFTER_MINUTES = int(os.getenv("PUBLISH_STALE_AFTER_MINUTES", "0"))
+PUBLISH_STALE_POLICY = os.getenv("PUBLISH_STALE_POLICY", "publish").lower()
+_STALE_POLICIES = ("publish", "skip", "reschedule")
+
+# Retries — transient failures are re-queued with jittered exponential backoff.
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))
+PUBLISH_RETRY_BASE_SECONDS = float(os.getenv("PUBLISH_RETRY_BASE_SECONDS", "30"))
+PUBLISH_RETRY_MAX_SECONDS = float(os.getenv("PUBLISH_RETRY_MAX_SECONDS", "3600"))
+
+# Crash safety — platforms whose publish call accepts an idempotency key
+# (VK wall.post guid) can be re-sent after an interrupted attempt; for the
+# others an attempt whose outcome is unknown is dead-lettered for review
+# rather than risking a duplicate post.
+_IDEMPOTENT_PLATFORMS = {"vk"}
+# VK deduplicates wall.post by guid for about an hour only; an interrupted
+# send is re-sent with the same key only if it started within this window.
+VK_GUID_DEDUPE_SECONDS = int(os.getenv("VK_GUID_DEDUPE_SECONDS", "3000"))
+_PUBLISH_ENDPOINTS = ("/sendMessage", "/sendPhoto", "/rest/posts", "/wall.post")
+_MARK_PUBLISHED_ATTEMPTS = 3
+
+# Circuit breakers — the per-platform breaker opens only after this many
+# consecutive failures across all accounts; per-account breakers use
+# CIRCUIT_FAILURE_THRESHOLD.
+CIRCUIT_PLATFORM_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_PLATFORM_FAILURE_THRESHOLD", "10"))
+
+# Analytics refresh — parallel metric fetches per platform, chunked bulk upserts.
+ANALYTICS_FETCH_CONCURRENCY = int(os.getenv("ANALYTICS_FETCH_CONCURRENCY", "5"))
+ANALYTICS_UPSERT_CHUNK_SIZE = int(os.getenv("ANALYTICS_UPSERT_CHUNK_SIZE", "500"))
+# Age-weighted refresh: (max post age, refresh interval) tiers, oldest last.
+# Posts younger than a day refresh every run, older ones hourly for a week,
+# then daily. At most ANALYTICS_REFRESH_MAX_POSTS are refreshed per run.
+_ANALYTICS_REFRESH_TIERS: List[Tuple[Optional[timedelta], timedelta]] = [
+    (timedelta(days=1), timedelta(minutes=30)),
+    (timedelta(days=7), timedelta(hours=1)),
+    (None, timedelta(days=1)),
+]
+ANALYTICS_REFRESH_MAX_POSTS = int(os.getenv("ANALYTICS_REFRESH_MAX_POSTS", "500"))
+ANALYTICS_PAGE_SIZE = int(os.getenv("ANALYTICS_PAGE_SIZE", "1000"))
+# A run fires every 30 min; allow some jitter so a 30-min tier isn't skipped
+# because the previous fetch landed a few seconds later than this run.
+_ANALYTICS_DUE_SLACK = timedelta(minutes=5)
+
+# Timer queue — posts due within the look-ahead window are held in memory;
+# the safety-net poll reloads the window and catches anything missed.
+PUBLISH_LOOKAHEAD_MINUTES = int(os.getenv("PUBLISH_LOOKAHEAD_MINUTES", "60"))
+PUBLISH_SAFETY_POLL_MINUTES = int(os.getenv("PUBLISH_SAFETY_POLL_MINUTES", "10"))
+
+# Pre-staging — PUBLISH_PRESTAGE_SECONDS before a post is due its account is
+# resolved, its text checked against the platform limit (posts that would be
+# rejected fail early, while there is still time to fix them) and its image
+# downloaded, fitted and, where the platform allows, uploaded. The send at
+# the due instant then needs no account lookup or media work. 0 disables.
+PUBLISH_PRESTAGE_SECONDS = int(os.getenv("PUBLISH_PRESTAGE_SECONDS", "300"))
+PUBLISH_PRESTAGE_CONCURRENCY = int(os.getenv("PUBLISH_PRESTAGE_CONCURRENCY", "5"))
+# Text limits per platform; Telegram captions (text sent with a photo) are shorter.
+_CONTENT_LIMITS = {"telegram": 4096, "linkedin": 3000, "vk": 16384}
+_TELEGRAM_CAPTION_LIMIT = 1024
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_STAGED_TTL = timedelta(hours=1)
+
+# Recurring schedules are expanded into concrete posts only as far ahead as
+# the timer queue (plus one safety-poll interval) — or the outbox prefetch
+# window when the outbox is on — reading this many schedules per request.
+RECURRENCE_PAGE_SIZE = int(os.getenv("RECURRENCE_PAGE_SIZE", "500"))
+_RECURRENCE_TEMPLATE_FIELDS = ("platform", "account_id", "content", "image_url", "utm_params")
+
+# Local outbox — prefetched posts and queued status updates that survive a
+# Supabase outage. Off unless OUTBOX_PATH is set. Offline publishing only
+# retries posts this process had claimed and started before the outage (lease
+# still live, publish_key recorded upstream), so no other replica can send
+# them meanwhile; it starts after OUTBOX_OFFLINE_AFTER_FAILURES consecutive
+# publish cycles found Supabase unreachable, so a single 5xx does not
+# trigger it.
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "")
+OUTBOX_PREFETCH_HOURS = float(os.getenv("OUTBOX_PREFETCH_HOURS", "6"))
+OUTBOX_OFFLINE_PUBLISH = os.getenv("OUTBOX_OFFLINE_PUBLISH", "false").lower() in ("1", "true", "yes")
+OUTBOX_OFFLINE_AFTER_FAILURES = int(os.getenv("OUTBOX_OFFLINE_AFTER_FAILURES", "3"))
+OUTBOX_REPLAY_BATCH_SIZE = int(os.getenv("OUTBOX_REPLAY_BATCH_SIZE", "500"))
+
 _scheduler: Optional[AsyncIOScheduler] = None
+_job_tasks: List[asyncio.Task] = []
+_due_queue: Optional[DueQueue] = None
+_stage_queue: Optional[DueQueue] = None
+_outbox: Optional[Outbox] = None
+# Consecutive publish cycles that found Supabase unreachable.
+_supabase_failures = 0
+
+_global_semaphore: Optional[asyncio.Semaphore] = None
+_platform_semaphores: Dict[str, asyncio.Semaphore] = {}
+_account_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+# Publish pool: task per claimed post that has not finished yet, and how
+# many of them each account has.
+_in_flight: Dict[str, asyncio.Task] = {}
+_in_flight_by_account: Dict[str, int] = {}
+_stopping = False
+# Set when a cycle left due posts behind for want of room in the pool; the
+# next publish to finish starts another cycle (_backlog_task) to claim them.
+_backlog_waiting = False
+_backlog_task: Optional[asyncio.Task] = None
+
+# Pre-staged posts: id → {"fingerprint", "account", "staged_at"}.
+_staged: Dict[str, Dict[str, Any]] = {}
+
+# When a post's last analytics refresh produced no metrics (no token,
+# deleted upstream, failed fetch). Aged like analytics.fetched_at, so such
+# posts don't hold the top of every refresh plan.
+_analytics_missed: Dict[str, datetime] = {}
+
+# Next free catch-up slot per account, so consecutive claim chunks keep the
+# spacing instead of each starting a fresh burst.
+_catchup_slots: Dict[str, datetime] = {}
+
+# Posts passed over on time because the pool or their account was full.
+# They are overdue by our own doing, not after downtime, so catch-up neither
+# spreads them nor applies the stale policy to them.
+_held_back: set = set()
 
 
 def _service_headers() -> Dict[str, str]:
@@ -33,277 +245,1981 @@ def _service_headers() -> Dict[str, str]:
     }
 
 
-async def _publish_post(post: Dict[str, Any]) -> None:
-    """Publish a single post via the correct platform service."""
+def _publish_lag(post: Dict[str, Any]) -> Optional[float]:
+    """Seconds between the post's scheduled_at and now, or None if unscheduled."""
+    scheduled_at = parse_ts(post.get("scheduled_at"))
+    if scheduled_at is None:
+        return None
+    return (clock.now() - scheduled_at).total_seconds()
+
+
+def _due_time(post: Dict[str, Any]) -> Optional[datetime]:
+    """When a scheduled post should next be attempted (retries wait for next_attempt_at)."""
+    scheduled_at = parse_ts(post.get("scheduled_at"))
+    next_attempt_at = parse_ts(post.get("next_attempt_at"))
+    if scheduled_at is None:
+        return None
+    if next_attempt_at is not None and next_attempt_at > scheduled_at:
+        return next_attempt_at
+    return scheduled_at
+
+
+def _account_key(post: Dict[str, Any]) -> str:
+    return f"{post.get('platform', '')}:{post.get('account_id') or 'env'}"
+
+
+def _account_weight(key: str) -> int:
+    return _ACCOUNT_WEIGHTS.get(key.partition(":")[2], 1)
+
+
+def _fair_order(posts: List[Dict[str, Any]], limit: Optional[int] = None, per_account_cap: Optional[int] = None):
+    """Weighted round-robin across accounts; returns (selected, left over)."""
+    return weighted_round_robin(posts, _account_key, _account_weight, limit=limit, per_key_cap=per_account_cap)
+
+
+def _limits_for(post: Dict[str, Any]) -> List[asyncio.Semaphore]:
+    """Semaphores a publish must hold, most specific first.
+
+    Acquiring the account slot before the platform and global slots means a
+    task waiting behind a busy account never sits on a global slot that a
+    post for another account or platform could use.
+    """
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(max(1, PUBLISH_CONCURRENCY))
+
+    platform = post.get("platform", "")
+    account_key = _account_key(post)
+
+    if account_key not in _account_semaphores:
+        _account_semaphores[account_key] = asyncio.Semaphore(max(1, PUBLISH_ACCOUNT_CONCURRENCY))
+    if platform not in _platform_semaphores:
+        limit = _PLATFORM_CONCURRENCY.get(platform, PUBLISH_CONCURRENCY)
+        _platform_semaphores[platform] = asyncio.Semaphore(max(1, limit))
+
+    return [
+        _account_semaphores[account_key],
+        _platform_semaphores[platform],
+        _global_semaphore,
+    ]
+
+
+async def _start_attempt(post: Dict[str, Any]) -> bool:
+    """Record that a publish attempt is about to hit the platform.
+
+    One conditional PATCH (still publishing, still our lease) renews the
+    lease — posts queued behind a busy account or a throttled platform can
+    wait longer than it — and stamps publish_started_at plus the post's
+    idempotency key. After a crash, lease recovery uses publish_started_at
+    to tell posts that were never sent from posts that may have been.
+    Returns False if the lease was lost, in which case the post must not be
+    sent.
+    """
+    now = clock.now()
+    new_expiry = (now + timedelta(seconds=PUBLISH_LEASE_SECONDS)).isoformat()
+    publish_key = post.get("publish_key") or uuid.uuid4().hex
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "id": f"eq.{post.get('id')}",
+                "status": "eq.publishing",
+                "lease_owner": f"eq.{SCHEDULER_WORKER_ID}",
+            },
+            json={
+                "lease_expires_at": new_expiry,
+                "publish_key": publish_key,
+                "publish_started_at": now.isoformat(),
+            },
+        )
+        resp.raise_for_status()
+        started = resp.json()
+    except Exception as e:
+        logger.error("Failed to start publish attempt for post %s: %s", post.get("id"), e)
+        return False
+
+    if not started:
+        logger.warning("Lost publish lease on post %s — skipping", post.get("id"))
+        return False
+    post["lease_expires_at"] = new_expiry
+    post["publish_key"] = publish_key
+    post["publish_started_at"] = now.isoformat()
+    return True
+
+
+async def _publish_with_limits(post: Dict[str, Any], account: Dict[str, Any]) -> Optional[float]:
+    """Run _publish_post while holding the account, platform and global slots."""
+    try:
+        _check_circuits(post, account)
+    except CircuitOpenError as e:
+        # Fail fast rather than hold slots for a call that cannot go out.
+        await _handle_publish_failure(post, e)
+        return None
+
+    semaphores = _limits_for(post)
+    for sem in semaphores:
+        await sem.acquire()
+    try:
+        if _stopping or not await _start_attempt(post):
+            return None
+        return await _publish_post(post, account)
+    finally:
+        for sem in reversed(semaphores):
+            sem.release()
+        _staged.pop(str(post.get("id")), None)
+        if _outbox is not None:
+            # Handled through Supabase; the next prefetch re-adds it if it
+            # is still scheduled (e.g. re-queued for a retry). Held posts stay
+            # for an offline retry.
+            _outbox.release(str(post.get("id")))
+
+
+def _credentials(platform: str, account: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """(token, channel) for a post, falling back to the env credentials."""
+    if platform == "telegram":
+        return (
+            account.get("token", os.getenv("TELEGRAM_BOT_TOKEN", "")),
+            account.get("channel_id", os.getenv("TELEGRAM_CHAT_ID", "")),
+        )
+    if platform == "linkedin":
+        return (
+            account.get("token", os.getenv("LINKEDIN_ACCESS_TOKEN", "")),
+            account.get("channel_id", os.getenv("LINKEDIN_PROFILE_ID", "")),
+        )
+    if platform == "vk":
+        return account.get("token", os.getenv("VK_ACCESS_TOKEN", "")), account.get("channel_id") or None
+    raise ValueError(f"Unsupported platform: {platform}")
+
+
+def _breakers_for(platform: str, token: str) -> Tuple[CircuitBreaker, CircuitBreaker]:
+    """The platform-wide and per-token circuit breakers for a platform call."""
+    return (
+        get_breaker(platform, failure_threshold=CIRCUIT_PLATFORM_FAILURE_THRESHOLD),
+        get_breaker(platform, token),
+    )
+
+
+def _check_circuits(post: Dict[str, Any], account: Dict[str, Any]) -> None:
+    """Raise CircuitOpenError if a breaker would reject the post's platform call."""
+    platform = post.get("platform", "")
+    if platform not in _CONTENT_LIMITS:
+        return
+    token, _ = _credentials(platform, account)
+    for breaker in _breakers_for(platform, token):
+        retry_after = breaker.retry_after()
+        if retry_after > 0:
+            raise CircuitOpenError(breaker.name, retry_after)
+
+
+async def _send_to_platform(post: Dict[str, Any], account: Dict[str, Any]) -> Optional[str]:
+    """Send a post via the correct platform service; returns the platform post id.
+
+    ``account`` is the post's publisher_accounts row (empty to fall back to
+    the env credentials).
+
+    Raises:
+        CircuitOpenError: If the platform or account breaker is open.
+    """
+    platform = post.get("platform", "")
+    token, _ = _credentials(platform, account)
+    platform_breaker, account_breaker = _breakers_for(platform, token)
+    async with platform_breaker.guard(), account_breaker.guard():
+        return await _call_platform(post, account)
+
+
+async def _call_platform(post: Dict[str, Any], account: Dict[str, Any]) -> Optional[str]:
     platform = post.get("platform", "")
     content = post.get("content", "")
-    post_id = post.get("id")
-    account_id = post.get("account_id")
     image_url = post.get("image_url")
+    token, channel = _credentials(platform, account)
+    platform_post_id: Optional[str] = None
+
+    if platform == "telegram":
+        result = await send_message(
+            bot_token=token,
+            channel_id=channel,
+            text=content,
+            image_url=image_url,
+        )
+        # Capture Telegram message_id for analytics
+        message_id = result.get("result", {}).get("message_id")
+        if message_id:
+            platform_post_id = str(message_id)
+
+    elif platform == "linkedin":
+        result = await post_to_linkedin(
+            access_token=token,
+            profile_id=channel,
+            text=content,
+            image_url=image_url,
+        )
+        # Capture LinkedIn post URN for analytics
+        platform_post_id = result.get("id") or None
+
+    elif platform == "vk":
+        result = await post_to_vk(
+            access_token=token,
+            owner_id=channel,
+            text=content,
+            image_url=image_url,
+            guid=post.get("publish_key"),
+        )
+        # Capture VK "{owner_id}_{post_id}" for wall.getById analytics
+        vk_post_id = result.get("post_id")
+        if vk_post_id:
+            platform_post_id = f"{result['owner_id']}_{vk_post_id}"
+
+    return platform_post_id
+
+
+async def _publish_post(post: Dict[str, Any], account: Dict[str, Any]) -> Optional[float]:
+    """Publish a single post and record the outcome in Supabase.
+
+    ``account`` is the post's publisher_accounts row (empty to fall back to
+    the env credentials), batch-loaded by the caller.
+
+    Returns the publish lag in seconds (publish time minus scheduled_at) on
+    success, None if the post failed or had no scheduled_at.
+    """
+    platform = post.get("platform", "")
+    post_id = post.get("id")
 
     logger.info("Publishing post id=%s platform=%s", post_id, platform)
 
-    # Fetch account credentials
-    account: Dict[str, Any] = {}
-    if account_id:
+    try:
+        platform_post_id = await _send_to_platform(post, account)
+
+        lag = _publish_lag(post)
+        await _mark_post_published(post_id, platform_post_id)
+        PUBLISH_RESULTS.labels(platform=platform, outcome="published").inc()
+        if lag is not None:
+            PUBLISH_LAG.labels(platform=platform).observe(lag)
+        logger.info(
+            "Post %s published on %s (platform_post_id=%s, publish_lag=%s)",
+            post_id, platform, platform_post_id,
+            f"{lag:.1f}s" if lag is not None else "n/a",
+        )
+        return lag
+
+    except Exception as e:
+        logger.error("Failed to publish post %s: %s", post_id, _error_reason(e))
+        await _handle_publish_failure(post, e)
+        return None
+
+
+def _error_reason(exc: Exception) -> str:
+    """Describe a publish error for last_error, which API clients can read.
+
+    Not str(exc): httpx puts the request URL in its messages, and Telegram
+    URLs carry the bot token. HTTP errors are reduced to the status code and
+    the platform's own error text (Telegram "description", LinkedIn
+    "message").
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        reason = f"HTTP {exc.response.status_code} from {exc.request.url.host}"
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(
-                    f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                    headers=_service_headers(),
-                    params={"id": f"eq.{account_id}"},
-                )
-            resp.raise_for_status()
-            accounts_list = resp.json()
-            if accounts_list:
-                account = accounts_list[0]
-        except Exception as e:
-            logger.error("Failed to fetch account %s: %s", account_id, e)
-            await _mark_post_failed(post_id, str(e))
-            return
+            body = exc.response.json()
+        except ValueError:
+            body = None
+        detail = (body.get("description") or body.get("message")) if isinstance(body, dict) else None
+        return f"{reason}: {detail}" if detail else reason
+    if isinstance(exc, httpx.TransportError):
+        try:
+            return f"{type(exc).__name__} talking to {exc.request.url.host}"
+        except RuntimeError:
+            return type(exc).__name__
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _classify_error(exc: Exception) -> Tuple[bool, float]:
+    """Decide whether a publish error is worth retrying.
 
+    Returns (retryable, minimum delay in seconds). Auth errors, bad requests
+    and platform validation errors (ValueError) are permanent; timeouts,
+    connection errors, 408/425/429/5xx responses and throttling are not.
+    """
+    if isinstance(exc, (RateLimitedError, CircuitOpenError)):
+        return True, exc.retry_after
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status in (408, 425, 429) or status >= 500:
+            try:
+                retry_after = float(exc.response.headers.get("retry-after", 0))
+            except ValueError:
+                retry_after = 0.0
+            return True, retry_after
+        return False, 0.0
+    if isinstance(exc, httpx.TransportError):
+        return True, 0.0
+    return False, 0.0
+
+
+def _outcome_unknown(exc: Exception, platform: str) -> bool:
+    """True if a failed publish call may still have created the post.
+
+    A timeout or dropped connection after the publish request was sent
+    leaves the outcome unknown; connect errors and pool timeouts happen
+    before anything reaches the platform. Upload and download steps are not
+    publish requests, so their errors are always safe to retry.
+    """
+    if platform in _IDEMPOTENT_PLATFORMS or not isinstance(exc, httpx.TransportError):
+        return False
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return False
     try:
-        platform_post_id: Optional[str] = None
+        path = exc.request.url.path
+    except RuntimeError:
+        return False
+    return path.endswith(_PUBLISH_ENDPOINTS)
 
-        if platform == "telegram":
-            token = account.get("token", os.getenv("TELEGRAM_BOT_TOKEN", ""))
-            channel = account.get("channel_id", os.getenv("TELEGRAM_CHAT_ID", ""))
-            result = await send_message(
-                bot_token=token,
-                channel_id=channel,
-                text=content,
-                image_url=image_url,
-            )
-            # Capture Telegram message_id for analytics
-            message_id = result.get("result", {}).get("message_id")
-            if message_id:
-                platform_post_id = str(message_id)
 
-        elif platform == "linkedin":
-            token = account.get("token", os.getenv("LINKEDIN_ACCESS_TOKEN", ""))
-            profile_id = account.get("channel_id", os.getenv("LINKEDIN_PROFILE_ID", ""))
-            result = await post_to_linkedin(
-                access_token=token,
-                profile_id=profile_id,
-                text=content,
-                image_url=image_url,
-            )
-            # Capture LinkedIn post URN for analytics
-            platform_post_id = result.get("id") or None
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with equal jitter for the given attempt number (1-based)."""
+    ceiling = min(PUBLISH_RETRY_MAX_SECONDS, PUBLISH_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
 
-        elif platform == "vk":
-            token = account.get("token", os.getenv("VK_ACCESS_TOKEN", ""))
-            owner_id = account.get("channel_id") or None
-            await post_to_vk(
-                access_token=token,
-                owner_id=owner_id,
-                text=content,
-                image_url=image_url,
-            )
 
-        else:
-            raise ValueError(f"Unsupported platform: {platform}")
+def _supabase_unreachable(exc: Exception) -> bool:
+    """True for errors that mean Supabase is down rather than rejecting the request."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (502, 503, 504)
 
-        await _mark_post_published(post_id, platform_post_id)
-        logger.info("Post %s published on %s (platform_post_id=%s)", post_id, platform, platform_post_id)
 
+async def _update_post(post_id: str, update: Dict[str, Any]) -> Optional[bool]:
+    """PATCH a post's status fields; queue the update in the outbox if Supabase is down.
+
+    Returns True if Supabase accepted the update, None if it was queued in
+    the outbox and False if it was lost.
+    """
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={"id": f"eq.{post_id}"},
+            json=update,
+        )
+        resp.raise_for_status()
+        return True
     except Exception as e:
-        logger.error("Failed to publish post %s: %s", post_id, e)
-        await _mark_post_failed(post_id, str(e))
+        if _outbox is not None and _supabase_unreachable(e):
+            _outbox.queue_update(str(post_id), update)
+            logger.warning("Supabase unreachable — queued %s update for post %s: %s", update.get("status"), post_id, e)
+            return None
+        logger.error("Failed to update post %s to %s: %s", post_id, update.get("status"), e)
+        return False
 
 
-async def _mark_post_published(post_id: str, platform_post_id: Optional[str] = None) -> None:
-    update: Dict[str, Any] = {"status": "published"}
+def _failure_update(post: Dict[str, Any], exc: Exception) -> Dict[str, Any]:
+    """Decide how a failed attempt is recorded: re-queued, failed or dead-lettered."""
+    post_id = post.get("id")
+    platform = post.get("platform", "unknown")
+    if isinstance(exc, CircuitOpenError):
+        # Nothing was sent: defer past the breaker's recovery time, with
+        # jitter so deferred posts don't all queue up for the half-open
+        # probe, and leave the attempt count alone.
+        PUBLISH_RESULTS.labels(platform=platform, outcome="deferred").inc()
+        delay = exc.retry_after + random.uniform(0, max(exc.retry_after, 1.0))
+        logger.warning("Post %s deferred for %.0fs: %s", post_id, delay, exc)
+        return {
+            "attempts": post.get("attempts") or 0,
+            "status": "scheduled",
+            "last_error": str(exc),
+            "next_attempt_at": (clock.now() + timedelta(seconds=delay)).isoformat(),
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "publish_started_at": None,
+        }
+
+    attempts = (post.get("attempts") or 0) + 1
+    retryable, min_delay = _classify_error(exc)
+    reason = _error_reason(exc)
+    update: Dict[str, Any] = {
+        "attempts": attempts,
+        "next_attempt_at": None,
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
+
+    if _outcome_unknown(exc, platform):
+        logger.error("Post %s may have been published despite %s — not retrying", post_id, reason)
+        PUBLISH_RESULTS.labels(platform=platform, outcome="dead_letter").inc()
+        reason = f"Publish outcome unknown, not retried to avoid a duplicate ({reason})"
+        return {**update, "status": "dead_letter", "last_error": reason[:1000]}
+    if not retryable:
+        PUBLISH_RESULTS.labels(platform=platform, outcome="failed").inc()
+        return {**update, "status": "failed", "last_error": reason[:1000]}
+    if attempts >= PUBLISH_MAX_ATTEMPTS:
+        logger.error("Post %s dead-lettered after %d attempts: %s", post_id, attempts, reason)
+        PUBLISH_RESULTS.labels(platform=platform, outcome="dead_letter").inc()
+        return {**update, "status": "dead_letter", "last_error": reason[:1000]}
+
+    PUBLISH_RESULTS.labels(platform=platform, outcome="retry").inc()
+    delay = max(min_delay, _retry_delay(attempts))
+    next_attempt_at = clock.now() + timedelta(seconds=delay)
+    logger.warning(
+        "Post %s attempt %d/%d failed (%s) — retrying in %.0fs",
+        post_id, attempts, PUBLISH_MAX_ATTEMPTS, reason, delay,
+    )
+    return {
+        **update,
+        "status": "scheduled",
+        "last_error": reason[:1000],
+        "next_attempt_at": next_attempt_at.isoformat(),
+        "publish_started_at": None,
+    }
+
+
+async def _handle_publish_failure(post: Dict[str, Any], exc: Exception) -> None:
+    """Re-queue a post after a transient error, or fail / dead-letter it."""
+    update = _failure_update(post, exc)
+    if post.get("publish_key"):
+        # Unchanged upstream; a queued copy of the update replays only while
+        # the row still carries this key.
+        update["publish_key"] = post["publish_key"]
+    applied = await _update_post(post.get("id"), update)
+    if applied is None and update["status"] == "scheduled":
+        _hold_for_offline_retry(post, update)
+    if not applied:
+        # Either queued in the outbox or left to lease recovery.
+        return
+    if update["status"] == "scheduled" and _due_queue is not None:
+        _due_queue.schedule(str(post.get("id")), parse_ts(update["next_attempt_at"]))
+
+
+def _hold_for_offline_retry(post: Dict[str, Any], update: Dict[str, Any]) -> None:
+    """Keep a post whose retry could only be queued, so _publish_offline can send it.
+
+    Only attempts recorded upstream qualify: the row still says publishing
+    under our lease with this publish_key and publish_started_at, so no
+    other replica sends it before the lease expires, and recovery after
+    that treats it as possibly sent.
+    """
+    if not (post.get("publish_key") and post.get("publish_started_at") and post.get("lease_expires_at")):
+        return
+    held = {
+        **post,
+        "attempts": update["attempts"],
+        "last_error": update["last_error"],
+        "next_attempt_at": update["next_attempt_at"],
+    }
+    _outbox.hold(held, parse_ts(update["next_attempt_at"]).timestamp())
+
+
+def _published_update(platform_post_id: Optional[str]) -> Dict[str, Any]:
+    update: Dict[str, Any] = {
+        "status": "published",
+        "published_at": clock.now().isoformat(),
+        "last_error": None,
+        "next_attempt_at": None,
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
     if platform_post_id:
         update["platform_post_id"] = platform_post_id
-    try:
-        async with httpx.AsyncClient() as client:
-            await client.patch(
+    return update
+
+
+async def _mark_post_published(post_id: str, platform_post_id: Optional[str] = None) -> None:
+    update = _published_update(platform_post_id)
+    # The post is live at this point, so try hard to record it: retry, then
+    # fall back to the outbox. If even that is unavailable, the lease expires
+    # and recovery reconciles the post instead of re-sending it.
+    for attempt in range(_MARK_PUBLISHED_ATTEMPTS):
+        try:
+            client = get_client(SUPABASE_URL)
+            resp = await client.patch(
                 f"{SUPABASE_URL}/rest/v1/posts",
                 headers=_service_headers(),
                 params={"id": f"eq.{post_id}"},
                 json=update,
             )
+            resp.raise_for_status()
+            return
+        except Exception as e:
+            logger.error(
+                "Failed to mark post %s as published (attempt %d/%d): %s",
+                post_id, attempt + 1, _MARK_PUBLISHED_ATTEMPTS, e,
+            )
+            if attempt + 1 < _MARK_PUBLISHED_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+            elif _outbox is not None:
+                _outbox.queue_update(str(post_id), update)
+                logger.warning("Queued published update for post %s in the outbox", post_id)
+
+
+async def _resolve_interrupted(post_id: str, update: Dict[str, Any], now: str) -> bool:
+    """Apply ``update`` to a post whose lease expired mid-attempt.
+
+    Filtered on the expired lease, so when replicas recover concurrently
+    only one of them resolves each post.
+    """
+    client = get_client(SUPABASE_URL)
+    resp = await client.patch(
+        f"{SUPABASE_URL}/rest/v1/posts",
+        headers=_service_headers(),
+        params={"id": f"eq.{post_id}", "status": "eq.publishing", "lease_expires_at": f"lt.{now}"},
+        json={**update, "lease_owner": None, "lease_expires_at": None},
+    )
+    resp.raise_for_status()
+    return bool(resp.json())
+
+
+def _resend_is_deduplicated(post: Dict[str, Any], now: datetime) -> bool:
+    """True if re-sending an interrupted post with its publish_key cannot duplicate it."""
+    if post.get("platform") not in _IDEMPOTENT_PLATFORMS:
+        return False
+    started = parse_ts(post.get("publish_started_at"))
+    return started is not None and (now - started).total_seconds() < VK_GUID_DEDUPE_SECONDS
+
+
+_DEDUPE_EXPIRED_ERROR = (
+    "Publish interrupted longer ago than the platform deduplicates re-sends; "
+    "not retried to avoid a duplicate — check the channel and re-schedule if missing"
+)
+
+
+async def _reconcile_interrupted(post: Dict[str, Any], now: str) -> None:
+    """Decide what happened to a post whose worker died after starting the send."""
+    post_id = str(post.get("id"))
+    platform = post.get("platform", "unknown")
+
+    # platform_post_id is only ever written together with status=published,
+    # so a publishing row carries none from this attempt — what happened to
+    # the send is unknown.
+    if _resend_is_deduplicated(post, parse_ts(now)):
+        # Re-sending with the same publish_key cannot create a second post.
+        update: Dict[str, Any] = {"status": "scheduled", "publish_started_at": None}
+        outcome = "re-queued"
+    elif platform in _IDEMPOTENT_PLATFORMS:
+        update = {"status": "failed", "last_error": _DEDUPE_EXPIRED_ERROR, "next_attempt_at": None}
+        outcome = "failed"
+    else:
+        update = {
+            "status": "dead_letter",
+            "last_error": "Publish interrupted after the platform call started; "
+                          "not retried to avoid a duplicate — check the channel and re-schedule if missing",
+            "next_attempt_at": None,
+        }
+        outcome = "dead-lettered"
+
+    try:
+        resolved = await _resolve_interrupted(post_id, update, now)
     except Exception as e:
-        logger.error("Failed to mark post %s as published: %s", post_id, e)
+        logger.error("Failed to reconcile interrupted post %s: %s", post_id, e)
+        return
+    if resolved:
+        logger.warning("Reconciled interrupted %s post %s: %s", platform, post_id, outcome)
+        if outcome == "re-queued" and _due_queue is not None:
+            _due_queue.schedule(post_id, clock.now())
+
 
+async def _recover_expired_leases() -> None:
+    """Handle posts whose publishing lease expired (crashed or stuck worker).
 
-async def _mark_post_failed(post_id: str, reason: str) -> None:
+    Posts that never reached the platform (no publish_started_at) go back to
+    the queue in one PATCH. Posts whose send had started are reconciled one
+    by one, so a crash between the platform call and the status update does
+    not publish them twice.
+    """
+    now = clock.now().isoformat()
     try:
-        async with httpx.AsyncClient() as client:
-            await client.patch(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_service_headers(),
-                params={"id": f"eq.{post_id}"},
-                json={"status": "failed"}, # Removed error_message since it's not in DB
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "status": "eq.publishing",
+                "lease_expires_at": f"lt.{now}",
+                "publish_started_at": "is.null",
+            },
+            json={"status": "scheduled", "lease_owner": None, "lease_expires_at": None},
+        )
+        resp.raise_for_status()
+        recovered = resp.json()
+
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "select": "id,platform,publish_key,publish_started_at",
+                "status": "eq.publishing",
+                "lease_expires_at": f"lt.{now}",
+                "publish_started_at": "not.is.null",
+            },
+        )
+        resp.raise_for_status()
+        interrupted = resp.json()
     except Exception as e:
-        logger.error("Failed to mark post %s as failed: %s", post_id, e)
+        logger.error("Failed to recover expired publish leases: %s", e)
+        return
 
+    if recovered:
+        logger.warning(
+            "Recovered %d post(s) with expired publish leases: %s",
+            len(recovered), ", ".join(str(p.get("id")) for p in recovered),
+        )
+    if interrupted:
+        await asyncio.gather(*(_reconcile_interrupted(p, now) for p in interrupted))
 
-async def check_and_publish_scheduled_posts() -> None:
-    """Check for posts due for publishing and send them."""
-    from datetime import datetime, timezone
 
-    now = datetime.now(timezone.utc).isoformat()
-    logger.debug("Checking scheduled posts at %s", now)
+def _triage_overdue(
+    rows: List[Dict[str, Any]], now: datetime,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[datetime, List[str]]]:
+    """Split due candidates into (publish now, stale, deferred by slot).
+
+    Overdue is measured from _due_time, so a post already deferred or
+    waiting for a retry is only overdue past that time. Posts in _held_back
+    are always published now.
+    """
+    stale_after = timedelta(minutes=PUBLISH_STALE_AFTER_MINUTES)
+    catchup_after = timedelta(seconds=PUBLISH_CATCHUP_AFTER_SECONDS)
+    spacing = timedelta(seconds=PUBLISH_CATCHUP_SPACING_SECONDS)
+
+    for key in [k for k, slot in _catchup_slots.items() if slot <= now]:
+        del _catchup_slots[key]
+
+    publish_now: List[Dict[str, Any]] = []
+    stale: List[Dict[str, Any]] = []
+    deferred: Dict[datetime, List[str]] = {}
+    burst: Dict[str, int] = {}
+    for row in rows:
+        if str(row["id"]) in _held_back:
+            publish_now.append(row)
+            continue
+        overdue = now - (_due_time(row) or now)
+        if PUBLISH_STALE_AFTER_MINUTES > 0 and PUBLISH_STALE_POLICY in ("skip", "reschedule") and overdue > stale_after:
+            stale.append(row)
+            continue
+        if overdue <= catchup_after:
+            publish_now.append(row)
+            continue
+
+        key = _account_key(row)
+        next_slot = _catchup_slots.get(key)
+        if next_slot is None:
+            burst[key] = burst.get(key, 0) + 1
+            if burst[key] >= PUBLISH_CATCHUP_BURST:
+                _catchup_slots[key] = now + spacing
+            publish_now.append(row)
+            continue
+        deferred.setdefault(next_slot, []).append(str(row["id"]))
+        _catchup_slots[key] = next_slot + spacing
+    return publish_now, stale, deferred
+
+
+async def _apply_stale_policy(client: httpx.AsyncClient, stale: List[Dict[str, Any]], now: datetime) -> None:
+    """Skip stale posts or move them to the same time of day on the next day."""
+    if PUBLISH_STALE_POLICY == "skip":
+        ids = [str(p["id"]) for p in stale]
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={"id": f"in.({','.join(ids)})", "status": "eq.scheduled"},
+            json={
+                "status": "skipped",
+                "last_error": f"Skipped: more than {PUBLISH_STALE_AFTER_MINUTES} min overdue",
+                "next_attempt_at": None,
+            },
+        )
+        resp.raise_for_status()
+        for post in resp.json():
+            PUBLISH_RESULTS.labels(platform=post.get("platform", "unknown"), outcome="skipped").inc()
+            if _due_queue is not None:
+                _due_queue.cancel(str(post["id"]))
+        logger.warning("Catch-up: skipped %d post(s) overdue by more than %d min", len(ids), PUBLISH_STALE_AFTER_MINUTES)
+        return
+
+    moved: Dict[datetime, List[str]] = {}
+    for post in stale:
+        scheduled_at = parse_ts(post.get("scheduled_at")) or now
+        days = -(-(now - scheduled_at) // timedelta(days=1))
+        moved.setdefault(scheduled_at + timedelta(days=max(1, days)), []).append(str(post["id"]))
+
+    async def _move(when: datetime, ids: List[str]) -> None:
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={"id": f"in.({','.join(ids)})", "status": "eq.scheduled"},
+            json={"scheduled_at": when.isoformat(), "next_attempt_at": None},
+        )
+        resp.raise_for_status()
+
+    await asyncio.gather(*(_move(when, ids) for when, ids in moved.items()))
+    logger.warning(
+        "Catch-up: moved %d post(s) overdue by more than %d min to the same time tomorrow",
+        len(stale), PUBLISH_STALE_AFTER_MINUTES,
+    )
+
+
+async def _defer_catchup(client: httpx.AsyncClient, deferred: Dict[datetime, List[str]]) -> None:
+    """Give spread-out catch-up posts their slots as next_attempt_at (one PATCH per slot)."""
+    async def _defer(slot: datetime, ids: List[str]) -> None:
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={"id": f"in.({','.join(ids)})", "status": "eq.scheduled"},
+            json={"next_attempt_at": slot.isoformat()},
+        )
+        resp.raise_for_status()
+        if _due_queue is not None:
+            for post_id in ids:
+                _due_queue.schedule(post_id, slot)
+
+    await asyncio.gather(*(_defer(slot, ids) for slot, ids in deferred.items()))
+    last = max(deferred)
+    logger.info(
+        "Catch-up: spread %d overdue post(s) over the next %.0fs",
+        sum(len(ids) for ids in deferred.values()),
+        (last - clock.now()).total_seconds(),
+    )
+
+
+async def _scan_due_candidates(
+    client: httpx.AsyncClient, now: datetime, busy: Iterable[str] = (),
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Read due candidates, oldest first, a claim batch per page.
+
+    Accounts in ``busy`` (already at PUBLISH_ACCOUNT_CLAIM_CAP in the
+    publish pool) are left out. If a full page holds accounts that reached
+    the cap, the next page excludes them too, so posts from other accounts
+    behind one account's bulk schedule are still seen. Returns the
+    candidates and whether every due post was read.
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    saturated: set = set(busy)
+    for _ in range(max(1, PUBLISH_FAIR_SCAN_ROUNDS)):
+        due_filter = f"or(next_attempt_at.is.null,next_attempt_at.lte.{now.isoformat()})"
+        if saturated:
+            due_filter += f",or(account_id.is.null,account_id.not.in.({','.join(sorted(saturated))}))"
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "select": "id,account_id,platform,scheduled_at,next_attempt_at",
+                "status": "eq.scheduled",
+                "scheduled_at": f"lte.{now.isoformat()}",
+                "and": f"({due_filter})",
+                "order": "scheduled_at.asc",
+                "limit": str(PUBLISH_CLAIM_BATCH_SIZE),
+            },
+        )
+        resp.raise_for_status()
+        page = resp.json()
+        for row in page:
+            rows.setdefault(str(row["id"]), row)
+        if len(page) < PUBLISH_CLAIM_BATCH_SIZE:
+            return list(rows.values()), not saturated
+
+        per_account: Dict[str, int] = {}
+        for row in rows.values():
+            if row.get("account_id"):
+                per_account[str(row["account_id"])] = per_account.get(str(row["account_id"]), 0) + 1
+        newly = {a for a, n in per_account.items() if n >= PUBLISH_ACCOUNT_CLAIM_CAP} - saturated
+        if not newly:
+            break
+        saturated |= newly
+    return list(rows.values()), False
 
+
+def _in_flight_room(posts: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split posts into those their account may still claim and the rest.
+
+    An account may have PUBLISH_ACCOUNT_CLAIM_CAP posts in the publish pool;
+    its posts beyond that wait until some of them finish.
+    """
+    room: Dict[str, int] = {}
+    fits: List[Dict[str, Any]] = []
+    rest: List[Dict[str, Any]] = []
+    for post in posts:
+        key = _account_key(post)
+        left = room.get(key, PUBLISH_ACCOUNT_CLAIM_CAP - _in_flight_by_account.get(key, 0))
+        if left > 0:
+            fits.append(post)
+        else:
+            rest.append(post)
+        room[key] = left - 1
+    return fits, rest
+
+
+async def _claim_due_posts(limit: int = PUBLISH_CLAIM_BATCH_SIZE) -> Tuple[List[Dict[str, Any]], bool]:
+    """Atomically claim up to ``limit`` due posts for this worker.
+
+    Candidates are selected first (see _scan_due_candidates) and a batch of
+    them is picked by weighted round-robin across accounts (see
+    services.fairness), skipping accounts at their cap in the publish pool,
+    then claimed with a PATCH filtered on status=scheduled and on still
+    being due (scheduled_at and next_attempt_at not after now).
+    Postgres re-checks that filter under the row lock, so when replicas race
+    for the same rows each row goes to exactly one of them, and a post
+    rescheduled or deferred since the scan is left alone; the PATCH
+    returns only the rows this worker actually took.
+
+    Overdue candidates are triaged first (see _triage_overdue): stale posts
+    get the stale policy and catch-up posts beyond an account's burst are
+    deferred rather than claimed. Returns the claimed posts, interleaved
+    across accounts, and whether more of the backlog may be due.
+    """
+    now = clock.now()
+    client = get_client(SUPABASE_URL)
+    busy = [
+        key.partition(":")[2] for key, n in _in_flight_by_account.items()
+        if n >= PUBLISH_ACCOUNT_CLAIM_CAP and not key.endswith(":env")
+    ]
+    rows, exhausted = await _scan_due_candidates(client, now, busy)
+
+    publish_now, stale, deferred = _triage_overdue(rows, now)
+    if stale:
+        await _apply_stale_policy(client, stale, now)
+    if deferred:
+        await _defer_catchup(client, deferred)
+
+    publish_now, at_cap = _in_flight_room(publish_now)
+    selected, passed_over = _fair_order(publish_now, min(limit, PUBLISH_CLAIM_BATCH_SIZE), PUBLISH_ACCOUNT_CLAIM_CAP)
+    passed_over += at_cap
+    more = not exhausted or bool(passed_over)
+    catchup_after = timedelta(seconds=PUBLISH_CATCHUP_AFTER_SECONDS)
+    for post in passed_over:
+        if now - (_due_time(post) or now) <= catchup_after:
+            _held_back.add(str(post["id"]))
+    if passed_over:
+        logger.info(
+            "Fair claim: %d due post(s) from %d account(s) left for the next chunk",
+            len(passed_over), len({_account_key(p) for p in passed_over}),
+        )
+    candidate_ids = [str(p["id"]) for p in selected]
+    _held_back.difference_update(candidate_ids)
+    if not candidate_ids:
+        return [], more
+
+    lease_expires_at = now + timedelta(seconds=PUBLISH_LEASE_SECONDS)
+    resp = await client.patch(
+        f"{SUPABASE_URL}/rest/v1/posts",
+        headers=_service_headers(),
+        params={
+            "id": f"in.({','.join(candidate_ids)})",
+            "status": "eq.scheduled",
+            "scheduled_at": f"lte.{now.isoformat()}",
+            "or": f"(next_attempt_at.is.null,next_attempt_at.lte.{now.isoformat()})",
+        },
+        json={
+            "status": "publishing",
+            "lease_owner": SCHEDULER_WORKER_ID,
+            "lease_expires_at": lease_expires_at.isoformat(),
+        },
+    )
+    resp.raise_for_status()
+    claimed = resp.json()
+
+    if len(claimed) < len(candidate_ids):
+        logger.info(
+            "Claimed %d/%d due post(s); the rest were taken by other workers or are no longer due",
+            len(claimed), len(candidate_ids),
+        )
+    # Tasks queue for the platform and global slots in list order, so dispatch
+    # follows the same interleaving.
+    claimed.sort(key=lambda p: p.get("scheduled_at") or "")
+    claimed, _ = _fair_order(claimed)
+    return claimed, more
+
+
+async def _replay_outbox() -> bool:
+    """Write status updates queued during an outage to Supabase, oldest first.
+
+    Queued updates for the same post are merged (later fields win) and posts
+    whose merged updates are identical share one PATCH; the PATCHes run
+    concurrently. Returns False while Supabase is still unreachable — the
+    caller must not claim posts then, or a post published offline could be
+    claimed and sent again before its "published" update lands.
+    """
+    if _outbox is None:
+        return True
+    client = get_client(SUPABASE_URL)
+    limit = asyncio.Semaphore(10)
+
+    async def _apply(body: str, post_ids: List[str]) -> bool:
+        update = json.loads(body)
+        params = {"id": f"in.({','.join(post_ids)})"}
+        if update.get("publish_key"):
+            # Written by a specific attempt: only while the row still belongs
+            # to it (not rescheduled or re-keyed since), so replays are idempotent.
+            params["publish_key"] = f"eq.{update['publish_key']}"
+        async with limit:
+            try:
+                resp = await client.patch(
+                    f"{SUPABASE_URL}/rest/v1/posts",
+                    headers=_service_headers(),
+                    params=params,
+                    json=update,
+                )
+                resp.raise_for_status()
+                if len(resp.json()) < len(post_ids):
+                    logger.info(
+                        "Queued update skipped for %d post(s) changed since the attempt",
+                        len(post_ids) - len(resp.json()),
+                    )
+            except Exception as e:
+                if _supabase_unreachable(e):
+                    return False
+                # Rejected outright; retrying cannot help.
+                logger.error("Dropping queued update for post(s) %s: %s — %s", ", ".join(post_ids), e, body)
+            return True
+
+    replayed = 0
+    while True:
+        batch = _outbox.pending_updates(OUTBOX_REPLAY_BATCH_SIZE)
+        if not batch:
+            break
+        merged: Dict[str, Dict[str, Any]] = {}
+        seqs: Dict[str, List[int]] = {}
+        for seq, post_id, update in batch:
+            merged.setdefault(post_id, {}).update(update)
+            seqs.setdefault(post_id, []).append(seq)
+        groups: Dict[str, List[str]] = {}
+        for post_id, update in merged.items():
+            groups.setdefault(json.dumps(update, sort_keys=True), []).append(post_id)
+
+        bodies = list(groups.items())
+        results = await asyncio.gather(*(_apply(body, ids) for body, ids in bodies))
+        done = [seq for (_, ids), ok in zip(bodies, results) if ok for pid in ids for seq in seqs[pid]]
+        _outbox.ack_updates(done)
+        replayed += len(done)
+        if len(done) < len(batch):
+            logger.warning("Supabase still unreachable — %d queued update(s) pending", len(batch) - len(done))
+            return False
+
+    if replayed:
+        logger.info("Replayed %d queued post update(s) from the outbox", replayed)
+    return True
+
+
+async def _prefetch_outbox() -> None:
+    """Copy scheduled posts due within the prefetch window locally."""
+    if _outbox is None:
+        return
+    horizon = clock.now() + timedelta(hours=OUTBOX_PREFETCH_HOURS)
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/posts",
-                headers=_service_headers(),
-                params={
-                    "status": "eq.scheduled",
-                    "scheduled_at": f"lte.{now}",
-                    "order": "scheduled_at.asc",
-                },
-            )
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "select": "*",
+                "status": "eq.scheduled",
+                "scheduled_at": f"lte.{horizon.isoformat()}",
+                "order": "scheduled_at.asc",
+            },
+        )
         resp.raise_for_status()
-        due_posts = resp.json()
+        rows = resp.json()
     except Exception as e:
-        logger.error("Failed to fetch scheduled posts: %s", e)
+        logger.warning("Outbox prefetch failed, keeping the previous copy: %s", e)
         return
 
-    if not due_posts:
+    window = [(p, due_at.timestamp()) for p in rows if (due_at := _due_time(p)) is not None]
+    _outbox.store_window(window, horizon.timestamp())
+    logger.debug("Outbox holds %d post(s) due within %.0f h", len(window), OUTBOX_PREFETCH_HOURS)
+
+
+async def _publish_offline_post(post: Dict[str, Any], account: Dict[str, Any]) -> None:
+    """Retry one held post and queue its status update for replay."""
+    post_id = str(post["id"])
+    platform = post.get("platform", "unknown")
+    semaphores = _limits_for(post)
+    for sem in semaphores:
+        await sem.acquire()
+    try:
+        _outbox.begin_send(post)
+        try:
+            platform_post_id = await _send_to_platform(post, account)
+        except Exception as e:
+            logger.error("Failed to publish post %s offline: %s", post_id, _error_reason(e))
+            update = {**_failure_update(post, e), "publish_key": post["publish_key"]}
+            _outbox.queue_update(post_id, update)
+            if update["status"] == "scheduled":
+                post.update(attempts=update["attempts"], next_attempt_at=update["next_attempt_at"])
+                _outbox.reschedule(post, parse_ts(update["next_attempt_at"]).timestamp())
+            else:
+                _outbox.forget(post_id)
+            return
+
+        _outbox.queue_update(post_id, {**_published_update(platform_post_id), "publish_key": post["publish_key"]})
+        _outbox.forget(post_id)
+        lag = _publish_lag(post)
+        PUBLISH_RESULTS.labels(platform=platform, outcome="published").inc()
+        if lag is not None:
+            PUBLISH_LAG.labels(platform=platform).observe(lag)
+        logger.info("Post %s published on %s from the outbox (platform_post_id=%s)", post_id, platform, platform_post_id)
+    finally:
+        for sem in reversed(semaphores):
+            sem.release()
+
+
+async def _publish_offline() -> None:
+    """Retry held posts once Supabase has been unreachable for a while.
+
+    Posts that were only prefetched are never sent from here: without a
+    lease another replica may claim them as soon as Supabase is back. A
+    held post is sent only while its lease is live and its account's
+    credentials are still in the in-process cache.
+    """
+    global _supabase_failures
+    _supabase_failures += 1
+    if _outbox is None or not OUTBOX_OFFLINE_PUBLISH:
         return
+    if _supabase_failures < OUTBOX_OFFLINE_AFTER_FAILURES:
+        logger.warning(
+            "Supabase unreachable (%d/%d cycles) — not publishing offline yet",
+            _supabase_failures, OUTBOX_OFFLINE_AFTER_FAILURES,
+        )
+        return
+    now = clock.now()
+    due = []
+    for post in _outbox.due_posts(now.timestamp(), PUBLISH_CLAIM_BATCH_SIZE, state="held"):
+        lease_expires_at = parse_ts(post.get("lease_expires_at"))
+        if lease_expires_at is None or lease_expires_at <= now:
+            # Lease recovery decides once Supabase is back; the queued
+            # retry update replays first.
+            _outbox.forget(str(post["id"]))
+            continue
+        due.append(post)
+    if not due:
+        return
+    accounts = cached_accounts(p.get("account_id") for p in due)
+    sendable = [p for p in due if not p.get("account_id") or str(p["account_id"]) in accounts]
+    if len(sendable) < len(due):
+        logger.warning("%d held post(s) have no cached credentials — left for Supabase", len(due) - len(sendable))
+    if not sendable:
+        return
+    logger.warning("Supabase unreachable — retrying %d held post(s) from the local outbox", len(sendable))
+    await asyncio.gather(
+        *(_publish_offline_post(p, accounts.get(str(p.get("account_id")), {})) for p in sendable),
+        return_exceptions=True,
+    )
+
+
+def _recover_outbox() -> None:
+    """Resolve local state left by a previous process (called at startup)."""
+    dropped = _outbox.drop_state("claimed") + _outbox.drop_state("held")
+    if dropped:
+        logger.info("Outbox: dropped %d stale claimed copy(ies); the next prefetch restores them", dropped)
+    for post in _outbox.interrupted():
+        post_id = str(post["id"])
+        # Queued after the retry that made the post held, so it wins the merge.
+        if _resend_is_deduplicated(post, clock.now()):
+            update: Dict[str, Any] = {"status": "scheduled", "publish_started_at": None}
+        elif post.get("platform") in _IDEMPOTENT_PLATFORMS:
+            update = {"status": "failed", "last_error": _DEDUPE_EXPIRED_ERROR}
+        else:
+            update = {
+                "status": "dead_letter",
+                "last_error": "Offline publish interrupted after the platform call started; "
+                              "not retried to avoid a duplicate — check the channel and re-schedule if missing",
+            }
+        _outbox.queue_update(post_id, {
+            **update,
+            "next_attempt_at": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "publish_key": post["publish_key"],
+        })
+        _outbox.forget(post_id)
+        logger.warning("Outbox: %s interrupted %s post %s", update["status"], post.get("platform"), post_id)
+
+
+@timed_job("publish_cycle")
+async def _publish_cycle() -> None:
+    """Claim posts due for publishing and send them concurrently."""
+    global _supabase_failures, _backlog_waiting
+    _backlog_waiting = False
+    logger.debug("Checking scheduled posts at %s", clock.now().isoformat())
+
+    if not await _replay_outbox():
+        await _publish_offline()
+        return
+
+    await _recover_expired_leases()
 
-    logger.info("Found %d post(s) ready to publish", len(due_posts))
+    # A backlog larger than one claim batch (e.g. after downtime) is claimed
+    # chunk by chunk within the cycle, as far as the publish pool has room.
+    while True:
+        room = PUBLISH_MAX_IN_FLIGHT - len(_in_flight)
+        if room <= 0:
+            logger.info("Publish pool full (%d post(s) in flight) — leaving the rest due", len(_in_flight))
+            _backlog_waiting = True
+            return
+        try:
+            due_posts, more = await _claim_due_posts(room)
+        except Exception as e:
+            logger.error("Failed to claim scheduled posts: %s", e)
+            if _supabase_unreachable(e):
+                await _publish_offline()
+            return
+
+        _supabase_failures = 0
+        if due_posts:
+            await _publish_batch(due_posts)
+        if not more or not due_posts:
+            # Posts left behind at an account's cap are claimed once one of
+            # its publishes finishes.
+            _backlog_waiting = more and bool(_in_flight)
+            return
+        logger.info("Catch-up: backlog exceeds %d post(s) — claiming the next chunk", PUBLISH_CLAIM_BATCH_SIZE)
+
+
+async def _publish_batch(due_posts: List[Dict[str, Any]]) -> None:
+    """Hand a batch of claimed posts to the publish pool.
+
+    Returns once each post has its task; the sends run on their own, so
+    the caller can claim again while slow accounts are still publishing.
+    """
+    if _outbox is not None:
+        _outbox.set_state((str(p["id"]) for p in due_posts), "claimed")
+
+    logger.info("Claimed %d post(s) ready to publish (worker=%s)", len(due_posts), SCHEDULER_WORKER_ID)
+
+    # Pre-staged posts bring their account along, as long as the claimed row
+    # still matches what was staged. Edits on this replica drop the entry
+    # (notify_post_changed, notify_account_changed); for edits elsewhere the
+    # staged account is trusted only as long as a cached one would be.
+    fresh_after = clock.now() - timedelta(seconds=ACCOUNT_CACHE_TTL_SECONDS)
+    staged_accounts: Dict[str, Dict[str, Any]] = {}
     for post in due_posts:
-        await _publish_post(post)
+        entry = _staged.get(str(post["id"]))
+        if (
+            entry is not None
+            and entry["fingerprint"] == _stage_fingerprint(post)
+            and entry["staged_at"] >= fresh_after
+        ):
+            staged_accounts[str(post["id"])] = entry["account"]
+    unstaged = [p for p in due_posts if str(p["id"]) not in staged_accounts]
 
+    accounts: Dict[str, Dict[str, Any]] = {}
+    if unstaged:
+        try:
+            accounts = await get_accounts(p.get("account_id") for p in unstaged)
+        except Exception as e:
+            logger.error("Failed to load accounts for %d claimed post(s): %s", len(unstaged), e)
+            await asyncio.gather(*(_handle_publish_failure(post, e) for post in unstaged))
+            due_posts = [p for p in due_posts if str(p["id"]) in staged_accounts]
 
-async def refresh_analytics() -> None:
-    """Fetch fresh metrics for all published posts and upsert into analytics table."""
-    from services.analytics import fetch_telegram_channel_stats, fetch_linkedin_post_stats
-    from datetime import datetime, timezone
+    for post in due_posts:
+        if str(post["id"]) in staged_accounts:
+            account = staged_accounts[str(post["id"])]
+        else:
+            account = accounts.get(str(post.get("account_id")), {})
+        _start_publish(post, account)
 
-    logger.info("Starting analytics refresh")
 
-    # Fetch all published posts that have a linked account
+def _start_publish(post: Dict[str, Any], account: Dict[str, Any]) -> None:
+    """Run _publish_with_limits for a claimed post as a task in the publish pool."""
+    post_id = str(post["id"])
+    key = _account_key(post)
+    task = asyncio.create_task(_publish_with_limits(post, account), name=f"publish-{post_id}")
+    _in_flight[post_id] = task
+    _in_flight_by_account[key] = _in_flight_by_account.get(key, 0) + 1
+    task.add_done_callback(lambda t: _publish_done(post_id, key, t))
+
+
+def _publish_done(post_id: str, key: str, task: asyncio.Task) -> None:
+    global _backlog_waiting, _backlog_task
+    _in_flight.pop(post_id, None)
+    remaining = _in_flight_by_account.get(key, 1) - 1
+    if remaining > 0:
+        _in_flight_by_account[key] = remaining
+    else:
+        _in_flight_by_account.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Unexpected error publishing post %s: %s", post_id, task.exception())
+    if _backlog_waiting and not _stopping:
+        _backlog_waiting = False
+        _backlog_task = asyncio.create_task(check_and_publish_scheduled_posts(), name="publish-backlog")
+
+
+async def drain_publishes() -> None:
+    """Wait until every post handed to the publish pool has finished."""
+    while _in_flight:
+        await asyncio.gather(*list(_in_flight.values()), return_exceptions=True)
+
+
+_publish_flight = SingleFlight("publish_cycle", _publish_cycle, rerun=True)
+
+
+async def check_and_publish_scheduled_posts() -> None:
+    """Run a publish cycle, or queue one follow-up cycle if one is in flight.
+
+    The timer queue, the safety poll and any other caller share a single
+    in-flight cycle per process; calls arriving mid-cycle are coalesced into
+    one more cycle afterwards so posts that fell due meanwhile are claimed.
+    """
+    await _publish_flight.run()
+
+
+def _content_error(post: Dict[str, Any]) -> Optional[str]:
+    """Why the platform would reject this post's content, or None if it looks sendable."""
+    platform = post.get("platform", "")
+    content = post.get("content") or ""
+    image_url = post.get("image_url")
+    if platform not in _CONTENT_LIMITS:
+        return f"Unsupported platform: {platform}"
+    if not content.strip() and not image_url:
+        return "Post has neither text nor an image"
+    if image_url and not str(image_url).startswith(("http://", "https://")):
+        return f"image_url is not an http(s) URL: {image_url}"
+
+    length = len(content)
+    limit = _CONTENT_LIMITS[platform]
+    if platform == "telegram":
+        # Telegram counts characters after parsing the HTML markup.
+        length = len(html.unescape(_HTML_TAG_RE.sub("", content)))
+        if image_url:
+            limit = _TELEGRAM_CAPTION_LIMIT
+    if length > limit:
+        return f"Text is {length} characters; {platform} allows {limit}{' with an image' if image_url else ''}"
+    return None
+
+
+def _stage_fingerprint(post: Dict[str, Any]) -> Tuple[Any, ...]:
+    """What a staged post was prepared from; a claimed row must still match it."""
+    return (post.get("platform"), post.get("account_id"), post.get("content"), post.get("image_url"))
+
+
+async def _stage_media(post: Dict[str, Any], account: Dict[str, Any]) -> None:
+    platform = post.get("platform", "")
+    token, channel = _credentials(platform, account)
+    platform_breaker, account_breaker = _breakers_for(platform, token)
+    async with platform_breaker.guard(), account_breaker.guard():
+        if platform == "telegram":
+            await stage_photo(token, post["image_url"])
+        elif platform == "linkedin":
+            await stage_image(token, channel, post["image_url"])
+        elif platform == "vk":
+            await upload_wall_photo(token, channel, post["image_url"])
+
+
+async def _reject_invalid(post: Dict[str, Any], error: str) -> None:
+    """Fail a post whose content the platform would reject, before it falls due."""
+    post_id = str(post["id"])
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={"id": f"eq.{post_id}", "status": "eq.scheduled"},
+            json={"status": "failed", "last_error": error, "next_attempt_at": None},
+        )
+        resp.raise_for_status()
+        rejected = resp.json()
+    except Exception as e:
+        logger.error("Failed to mark invalid post %s as failed: %s", post_id, e)
+        return
+    if not rejected:
+        return
+    logger.warning("Post %s failed pre-staging checks: %s", post_id, error)
+    PUBLISH_RESULTS.labels(platform=post.get("platform", "unknown"), outcome="failed").inc()
+    if _due_queue is not None:
+        _due_queue.cancel(post_id)
+    if _outbox is not None:
+        _outbox.forget(post_id)
+
+
+@timed_job("prestage")
+async def _prestage_due() -> None:
+    """Get posts due within PUBLISH_PRESTAGE_SECONDS ready to send.
+
+    Fired by the staging timer queue. Accounts are resolved in one batch and
+    kept with the staged entry; content is checked against the platform
+    limits; images are prepared (Telegram) or uploaded (VK, LinkedIn) into
+    the media caches the send path reads. Media failures are only logged —
+    the send falls back to doing the work itself.
+    """
+    now = clock.now()
+    for post_id in [i for i, entry in _staged.items() if now - entry["staged_at"] > _STAGED_TTL]:
+        del _staged[post_id]
+
+    horizon = now + timedelta(seconds=PUBLISH_PRESTAGE_SECONDS)
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "select": "*",
+                "status": "eq.scheduled",
+                "and": f"(scheduled_at.gt.{now.isoformat()},scheduled_at.lte.{horizon.isoformat()})",
+                "next_attempt_at": "is.null",
+                "order": "scheduled_at.asc",
+                "limit": str(PUBLISH_CLAIM_BATCH_SIZE),
+            },
+        )
+        resp.raise_for_status()
+        posts = [
+            p for p in resp.json()
+            if _staged.get(str(p["id"]), {}).get("fingerprint") != _stage_fingerprint(p)
+        ]
+        if not posts:
+            return
+        accounts = await get_accounts(p.get("account_id") for p in posts)
+    except Exception as e:
+        logger.warning("Pre-staging skipped: %s", e)
+        return
+
+    limit = asyncio.Semaphore(max(1, PUBLISH_PRESTAGE_CONCURRENCY))
+
+    async def _stage(post: Dict[str, Any]) -> None:
+        post_id = str(post["id"])
+        error = _content_error(post)
+        if error:
+            await _reject_invalid(post, error)
+            return
+        account = accounts.get(str(post.get("account_id")), {})
+        if post.get("image_url"):
+            async with limit:
+                try:
+                    await _stage_media(post, account)
+                except Exception as e:
+                    logger.warning("Pre-staging media for post %s failed (retried at send): %s", post_id, e)
+        _staged[post_id] = {"fingerprint": _stage_fingerprint(post), "account": account, "staged_at": now}
+
+    await asyncio.gather(*(_stage(p) for p in posts))
+    logger.debug("Pre-staged %d post(s) due within %ds", len(posts), PUBLISH_PRESTAGE_SECONDS)
+
+
+def _schedule_prestage(post_id: str, due_at: datetime) -> None:
+    if _stage_queue is not None:
+        _stage_queue.schedule(post_id, due_at - timedelta(seconds=PUBLISH_PRESTAGE_SECONDS))
+
+
+async def _refresh_due_window() -> None:
+    """Merge scheduled posts due within the look-ahead window into the timer queue."""
+    if _due_queue is None:
+        return
+
+    horizon = clock.now() + timedelta(minutes=PUBLISH_LOOKAHEAD_MINUTES)
+    try:
+        client = get_client(SUPABASE_URL)
+        resp = await client.get(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers=_service_headers(),
+            params={
+                "select": "id,scheduled_at,next_attempt_at",
+                "status": "eq.scheduled",
+                "scheduled_at": f"lte.{horizon.isoformat()}",
+                "order": "scheduled_at.asc",
+            },
+        )
+        resp.raise_for_status()
+        rows = resp.json()
+    except Exception as e:
+        logger.error("Failed to load upcoming posts into the due queue: %s", e)
+        if _outbox is None:
+            return
+        # Keep firing on time from the local copy during an outage.
+        rows = _outbox.due_posts(horizon.timestamp(), PUBLISH_CLAIM_BATCH_SIZE)
+
+    for row in rows:
+        due_at = _due_time(row)
+        if due_at is not None:
+            _due_queue.schedule(str(row["id"]), due_at)
+            _schedule_prestage(str(row["id"]), due_at)
+    logger.debug("Due queue refreshed — %d post(s) within %d min", len(_due_queue), PUBLISH_LOOKAHEAD_MINUTES)
+
+
+def _expansion_horizon(now: datetime) -> datetime:
+    ahead = timedelta(minutes=PUBLISH_LOOKAHEAD_MINUTES + PUBLISH_SAFETY_POLL_MINUTES)
+    if _outbox is not None:
+        ahead = max(ahead, timedelta(hours=OUTBOX_PREFETCH_HOURS))
+    return now + ahead
+
+
+async def _expand_schedules(schedules: List[Dict[str, Any]]) -> int:
+    """Materialise occurrences of ``schedules`` up to the expansion horizon.
+
+    Occurrences after each schedule's expanded_until cursor become posts via
+    an upsert that ignores (recurrence_id, scheduled_at) duplicates, so
+    replicas expanding the same schedule concurrently create each post once.
+    A schedule never expanded before starts from now rather than from a
+    starts_at in the past. Returns the number of posts created.
+    """
+    now = clock.now()
+    horizon = _expansion_horizon(now)
+    rows: List[Dict[str, Any]] = []
+    cursors: Dict[str, List[str]] = {}
+    for schedule in schedules:
+        schedule_id = str(schedule["id"])
+        after = parse_ts(schedule.get("expanded_until"))
+        if after is None:
+            after = max(parse_ts(schedule.get("starts_at")) or now, now) - timedelta(microseconds=1)
+        try:
+            dates = occurrences(schedule, after, until=horizon)
+        except ValueError as e:
+            logger.error("Recurring schedule %s skipped — %s", schedule_id, e)
+            continue
+        # Hitting the cap means the rule has more occurrences in the window;
+        # continue from the last one on the next run.
+        cursor = dates[-1] if len(dates) >= MAX_OCCURRENCES else horizon
+        cursors.setdefault(cursor.isoformat(), []).append(schedule_id)
+        template = {f: schedule[f] for f in _RECURRENCE_TEMPLATE_FIELDS if schedule.get(f) is not None}
+        for when in dates:
+            rows.append({**template, "recurrence_id": schedule_id, "scheduled_at": when.isoformat(), "status": "scheduled"})
+
+    client = get_client(SUPABASE_URL)
+    created: List[Dict[str, Any]] = []
+    for start in range(0, len(rows), RECURRENCE_PAGE_SIZE):
+        resp = await client.post(
+            f"{SUPABASE_URL}/rest/v1/posts",
+            headers={**_service_headers(), "Prefer": "resolution=ignore-duplicates,return=representation"},
+            params={"on_conflict": "recurrence_id,scheduled_at"},
+            json=rows[start:start + RECURRENCE_PAGE_SIZE],
+        )
+        resp.raise_for_status()
+        created.extend(resp.json())
+
+    for cursor, ids in cursors.items():
+        resp = await client.patch(
+            f"{SUPABASE_URL}/rest/v1/recurring_schedules",
+            headers=_service_headers(),
+            params={"id": f"in.({','.join(ids)})"},
+            json={"expanded_until": cursor},
+        )
+        resp.raise_for_status()
+
+    for post in created:
+        notify_post_changed(post)
+    if created:
+        logger.info("Expanded %d recurring schedule(s) into %d post(s)", len(cursors), len(created))
+    return len(created)
+
+
+async def expand_recurrence(schedule: Dict[str, Any]) -> int:
+    """Materialise one schedule's upcoming occurrences now (after an API change)."""
+    return await _expand_schedules([schedule])
+
+
+async def _expand_recurrences() -> None:
+    """Expand every active schedule whose cursor is behind the expansion horizon."""
+    now = clock.now()
+    horizon = _expansion_horizon(now)
+    last_id: Optional[str] = None
     try:
-        async with httpx.AsyncClient() as client:
+        client = get_client(SUPABASE_URL)
+        while True:
+            params = {
+                "select": "*",
+                "active": "is.true",
+                "and": (
+                    f"(or(expanded_until.is.null,expanded_until.lt.{horizon.isoformat()}),"
+                    f"or(ends_at.is.null,ends_at.gt.{now.isoformat()}))"
+                ),
+                "order": "id.asc",
+                "limit": str(RECURRENCE_PAGE_SIZE),
+            }
+            if last_id is not None:
+                params["id"] = f"gt.{last_id}"
             resp = await client.get(
-                f"{SUPABASE_URL}/rest/v1/posts",
+                f"{SUPABASE_URL}/rest/v1/recurring_schedules",
                 headers=_service_headers(),
-                params={
-                    "status": "eq.published",
-                    "select": "id,platform,account_id,platform_post_id,content",
-                    "order": "created_at.desc",
-                    "limit": "100",
-                },
+                params=params,
             )
+            resp.raise_for_status()
+            page = resp.json()
+            if page:
+                await _expand_schedules(page)
+            if len(page) < RECURRENCE_PAGE_SIZE:
+                return
+            last_id = str(page[-1]["id"])
+    except Exception as e:
+        logger.error("Failed to expand recurring schedules: %s", e)
+
+
+@timed_job("auto_publish")
+async def _safety_poll() -> None:
+    """Publish anything the timer queue missed, expand recurring schedules,
+    then refresh the timer queue's window."""
+    await check_and_publish_scheduled_posts()
+    await _expand_recurrences()
+    await _refresh_due_window()
+    await _prefetch_outbox()
+
+
+def notify_post_changed(post: Dict[str, Any]) -> None:
+    """Update the in-process timer queue after a post was created or edited.
+
+    Called by routers/posts.py with the row returned by Supabase. Posts that
+    are no longer "scheduled" are dropped from the queue; posts beyond the
+    look-ahead window are picked up later by the window refresh.
+    """
+    if not post.get("id"):
+        return
+    post_id = str(post["id"])
+    due_at = _due_time(post)
+    _held_back.discard(post_id)
+    _staged.pop(post_id, None)
+    if _outbox is not None:
+        prefetch_horizon = clock.now() + timedelta(hours=OUTBOX_PREFETCH_HOURS)
+        if post.get("status") == "scheduled" and due_at is not None and due_at <= prefetch_horizon:
+            _outbox.store_post(post, due_at.timestamp())
+        else:
+            _outbox.forget(post_id)
+    if _due_queue is None:
+        return
+    if post.get("status") != "scheduled" or due_at is None:
+        _due_queue.cancel(post_id)
+        return
+    horizon = clock.now() + timedelta(minutes=PUBLISH_LOOKAHEAD_MINUTES)
+    if due_at <= horizon:
+        _due_queue.schedule(post_id, due_at)
+        _schedule_prestage(post_id, due_at)
+    else:
+        _due_queue.cancel(post_id)
+
+
+def notify_post_deleted(post_id: str) -> None:
+    """Drop a deleted post from the in-process timer queue and the outbox."""
+    _staged.pop(str(post_id), None)
+    _held_back.discard(str(post_id))
+    if _outbox is not None:
+        _outbox.forget(str(post_id))
+    if _due_queue is not None:
+        _due_queue.cancel(str(post_id))
+
+
+def notify_account_changed(account_id: Optional[str] = None) -> None:
+    """Drop pre-staged posts that carry ``account_id`` (all of them when None).
+
+    Called by routers/accounts.py alongside invalidate_account, so a post
+    staged before its account was edited or removed is re-read at claim time.
+    """
+    for post_id in [
+        i for i, entry in _staged.items()
+        if account_id is None or str(entry["account"].get("id")) == str(account_id)
+    ]:
+        del _staged[post_id]
+
+
+def _telegram_channel_key(account: Dict[str, Any]) -> Tuple[str, str]:
+    """(bot token, channel id) for a Telegram account, with env fallbacks."""
+    return (
+        account.get("token", os.getenv("TELEGRAM_BOT_TOKEN", "")),
+        account.get("channel_id", os.getenv("TELEGRAM_CHAT_ID", "")),
+    )
+
+
+# Platforms whose post metrics are fetched in batches, with the env var
+# holding the fallback access token.
+_ANALYTICS_BATCH_TOKEN_ENV = {
+    "linkedin": "LINKEDIN_ACCESS_TOKEN",
+    "vk": "VK_ACCESS_TOKEN",
+}
+
+
+def _analytics_token(platform: str, account: Dict[str, Any]) -> str:
+    return account.get("token", os.getenv(_ANALYTICS_BATCH_TOKEN_ENV[platform], ""))
+
+
+def _analytics_row(post: Dict[str, Any], metrics: Dict[str, Any], now: str) -> Dict[str, Any]:
+    return {
+        "post_id": post["id"],
+        "platform": post.get("platform", ""),
+        "views": metrics.get("views", 0),
+        "likes": metrics.get("likes", 0),
+        "comments": metrics.get("comments", 0),
+        "shares": metrics.get("shares", 0),
+        "subscribers": metrics.get("subscribers", 0),
+        "fetched_at": now,
+        "updated_at": now,
+        "post_content": (post.get("content") or "")[:200],
+    }
+
+
+async def _upsert_analytics_rows(rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Bulk-upsert analytics rows in chunks (one request per chunk).
+
+    Returns (rows written, requests made). A failed chunk is logged and
+    skipped; its posts are simply refreshed again on the next run.
+    """
+    written = requests = 0
+    client = get_client(SUPABASE_URL)
+    for i in range(0, len(rows), ANALYTICS_UPSERT_CHUNK_SIZE):
+        chunk = rows[i:i + ANALYTICS_UPSERT_CHUNK_SIZE]
+        requests += 1
+        try:
+            resp = await client.post(
+                f"{SUPABASE_URL}/rest/v1/analytics",
+                headers={**_service_headers(), "Prefer": "resolution=merge-duplicates,return=minimal"},
+                params={"on_conflict": "post_id"},
+                json=chunk,
+            )
+            resp.raise_for_status()
+            written += len(chunk)
+        except Exception as e:
+            logger.warning("Analytics refresh: failed to upsert %d row(s): %s", len(chunk), e)
+    return written, requests
+
+
+def _refresh_interval(age: timedelta) -> timedelta:
+    for max_age, interval in _ANALYTICS_REFRESH_TIERS:
+        if max_age is None or age < max_age:
+            return interval
+    return _ANALYTICS_REFRESH_TIERS[-1][1]
+
+
+def _last_fetched_at(post: Dict[str, Any]) -> Optional[datetime]:
+    # The analytics embed is an object (one-to-one via the unique post_id) on
+    # recent PostgREST versions and a list on older ones.
+    embedded = post.get("analytics")
+    if isinstance(embedded, list):
+        embedded = embedded[0] if embedded else None
+    return parse_ts(embedded.get("fetched_at")) if embedded else None
+
+
+def _analytics_fetchable(post: Dict[str, Any]) -> bool:
+    """False for posts whose metrics cannot be fetched at all.
+
+    LinkedIn and VK need the platform post id, VK in ``owner_post`` form
+    (see fetch_vk_posts_stats); Telegram metrics are per channel.
+    """
+    platform = post.get("platform")
+    if platform == "telegram":
+        return True
+    if platform not in _ANALYTICS_BATCH_TOKEN_ENV:
+        return False
+    platform_post_id = str(post.get("platform_post_id") or "")
+    return bool(platform_post_id) and (platform != "vk" or "_" in platform_post_id)
+
+
+def _refresh_priority(post: Dict[str, Any], now: datetime) -> Optional[float]:
+    """How overdue a post's analytics are, as a multiple of its interval.
+
+    None means not due yet; never-fetched posts get infinite priority until
+    a refresh has tried them.
+    """
+    published_at = (
+        parse_ts(post.get("published_at"))
+        or parse_ts(post.get("scheduled_at"))
+        or parse_ts(post.get("created_at"))
+        or now
+    )
+    tried = [t for t in (_last_fetched_at(post), _analytics_missed.get(str(post.get("id")))) if t is not None]
+    if not tried:
+        return float("inf")
+    last = max(tried)
+    interval = _refresh_interval(now - published_at)
+    elapsed = now - last
+    if elapsed + _ANALYTICS_DUE_SLACK < interval:
+        return None
+    return elapsed / interval
+
+
+async def _plan_analytics_refresh() -> Tuple[List[Dict[str, Any]], int]:
+    """Page through every published post and pick the ones due for a refresh.
+
+    Returns (posts to refresh this run, total published posts scanned). Posts
+    are ranked by how overdue they are and capped at ANALYTICS_REFRESH_MAX_POSTS,
+    so platform API calls per run stay flat as the post count grows.
+
+    Raises:
+        httpx.HTTPError: If a page cannot be loaded.
+    """
+    now = clock.now()
+    client = get_client(SUPABASE_URL)
+    due: List[Tuple[float, Dict[str, Any]]] = []
+    scanned = 0
+    last_id: Optional[str] = None
+
+    while True:
+        params = {
+            "status": "eq.published",
+            "select": (
+                "id,platform,account_id,platform_post_id,content,"
+                "published_at,scheduled_at,created_at,analytics(fetched_at)"
+            ),
+            "order": "id.asc",
+            "limit": str(ANALYTICS_PAGE_SIZE),
+        }
+        if last_id is not None:
+            params["id"] = f"gt.{last_id}"
+        resp = await client.get(f"{SUPABASE_URL}/rest/v1/posts", headers=_service_headers(), params=params)
         resp.raise_for_status()
-        posts = resp.json()
+        page = resp.json()
+        for post in page:
+            if not _analytics_fetchable(post):
+                continue
+            priority = _refresh_priority(post, now)
+            if priority is not None:
+                due.append((priority, post))
+        scanned += len(page)
+        if len(page) < ANALYTICS_PAGE_SIZE:
+            break
+        last_id = str(page[-1]["id"])
+
+    due.sort(key=lambda item: item[0], reverse=True)
+    return [post for _, post in due[:ANALYTICS_REFRESH_MAX_POSTS]], scanned
+
+
+@timed_job("analytics_refresh")
+async def _refresh_analytics() -> None:
+    """Fetch fresh metrics for due published posts and bulk-upsert them into analytics.
+
+    Which posts are due is decided by _plan_analytics_refresh(). Metric
+    fetches run concurrently, bounded per platform; the resulting rows are
+    written with one array upsert per chunk. Posts that yield no metrics are
+    remembered in _analytics_missed.
+    """
+    from services.analytics import (
+        fetch_linkedin_posts_stats,
+        fetch_telegram_channel_stats,
+        fetch_vk_posts_stats,
+    )
+
+    logger.info("Starting analytics refresh")
+
+    try:
+        posts, scanned = await _plan_analytics_refresh()
     except Exception as e:
         logger.error("Analytics refresh: failed to fetch posts: %s", e)
         return
 
     if not posts:
-        logger.debug("Analytics refresh: no published posts found")
+        logger.debug("Analytics refresh: none of %d published post(s) due", scanned)
         return
+    logger.info("Analytics refresh: %d of %d published post(s) due", len(posts), scanned)
 
-    # Collect unique account IDs to batch-fetch credentials
-    account_ids = list({p["account_id"] for p in posts if p.get("account_id")})
+    # Batch-fetch credentials (shared TTL cache with the publish path)
     accounts_map: Dict[str, Dict[str, Any]] = {}
-    if account_ids:
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(
-                    f"{SUPABASE_URL}/rest/v1/publisher_accounts",
-                    headers=_service_headers(),
-                    params={"id": f"in.({','.join(account_ids)})"},
+    try:
+        accounts_map = await get_accounts(p.get("account_id") for p in posts)
+    except Exception as e:
+        logger.error("Analytics refresh: failed to fetch accounts: %s", e)
+
+    fetch_started = time.monotonic()
+    limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _limit(platform: str) -> asyncio.Semaphore:
+        if platform not in limits:
+            limits[platform] = asyncio.Semaphore(max(1, ANALYTICS_FETCH_CONCURRENCY))
+        return limits[platform]
+
+    # Telegram metrics are channel-level (subscriber count), identical for
+    # every post on a channel — fetch them once per (token, channel) and fan
+    # the result out to each post's analytics row.
+    channel_keys = set()
+    for post in posts:
+        if post.get("platform") == "telegram":
+            channel_keys.add(_telegram_channel_key(accounts_map.get(str(post.get("account_id")), {})))
+    channel_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    async def _fetch_channel(token: str, channel: str) -> None:
+        async with _limit("telegram"):
+            try:
+                channel_stats[(token, channel)] = await fetch_telegram_channel_stats(token, channel)
+            except Exception as e:
+                logger.warning("Analytics refresh: failed for Telegram channel %s: %s", channel, e)
+
+    await asyncio.gather(*(_fetch_channel(t, c) for t, c in channel_keys if t and c))
+    if channel_stats:
+        logger.info(
+            "Analytics refresh: fetched %d Telegram channel(s) for %d post(s)",
+            len(channel_stats), sum(1 for p in posts if p.get("platform") == "telegram"),
+        )
+
+    # LinkedIn (socialMetadata BATCH_GET) and VK (wall.getById) posts are
+    # fetched in batches, one batch set per (platform, token).
+    batch_ids: Dict[Tuple[str, str], List[str]] = {}
+    for post in posts:
+        platform = post.get("platform")
+        if platform in _ANALYTICS_BATCH_TOKEN_ENV and post.get("platform_post_id"):
+            token = _analytics_token(platform, accounts_map.get(str(post.get("account_id")), {}))
+            if token:
+                batch_ids.setdefault((platform, token), []).append(str(post["platform_post_id"]))
+    post_stats: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    batch_fetchers = {"linkedin": fetch_linkedin_posts_stats, "vk": fetch_vk_posts_stats}
+
+    async def _fetch_batch(platform: str, token: str, post_ids: List[str]) -> None:
+        async with _limit(platform):
+            try:
+                stats = await batch_fetchers[platform](token, post_ids)
+            except Exception as e:
+                logger.warning(
+                    "Analytics refresh: %s batch failed for %d post(s): %s", platform, len(post_ids), e,
                 )
-            resp.raise_for_status()
-            for acc in resp.json():
-                accounts_map[acc["id"]] = acc
-        except Exception as e:
-            logger.error("Analytics refresh: failed to fetch accounts: %s", e)
+                return
+        for platform_post_id, metrics in stats.items():
+            post_stats[(platform, token, platform_post_id)] = metrics
 
-    now = datetime.now(timezone.utc).isoformat()
-    refreshed = 0
+    await asyncio.gather(*(_fetch_batch(p, t, ids) for (p, t), ids in batch_ids.items()))
 
+    fetched_at = clock.now()
+    now = fetched_at.isoformat()
+    rows: List[Dict[str, Any]] = []
     for post in posts:
-        post_id = post["id"]
         platform = post.get("platform", "")
-        account = accounts_map.get(post.get("account_id", ""), {})
-        platform_post_id = post.get("platform_post_id")
+        account = accounts_map.get(str(post.get("account_id")), {})
+        metrics: Dict[str, Any] = {}
+        if platform == "telegram":
+            metrics = channel_stats.get(_telegram_channel_key(account), {})
+        elif platform in _ANALYTICS_BATCH_TOKEN_ENV and post.get("platform_post_id"):
+            token = _analytics_token(platform, account)
+            metrics = post_stats.get((platform, token, str(post["platform_post_id"])), {})
+        if metrics:
+            rows.append(_analytics_row(post, metrics, now))
+            _analytics_missed.pop(str(post["id"]), None)
+        else:
+            _analytics_missed[str(post["id"])] = fetched_at
+    fetch_elapsed = time.monotonic() - fetch_started
 
-        try:
-            metrics: Dict[str, Any] = {}
+    write_started = time.monotonic()
+    refreshed, requests = await _upsert_analytics_rows(rows)
+    write_elapsed = time.monotonic() - write_started
 
-            if platform == "telegram":
-                token = account.get("token", os.getenv("TELEGRAM_BOT_TOKEN", ""))
-                channel = account.get("channel_id", os.getenv("TELEGRAM_CHAT_ID", ""))
-                if token and channel:
-                    metrics = await fetch_telegram_channel_stats(token, channel)
+    logger.info(
+        "Analytics refresh complete — updated %d/%d posts (fetch %.2fs, write %.2fs in %d request(s))",
+        refreshed, len(posts), fetch_elapsed, write_elapsed, requests,
+    )
 
-            elif platform == "linkedin" and platform_post_id:
-                token = account.get("token", os.getenv("LINKEDIN_ACCESS_TOKEN", ""))
-                if token:
-                    metrics = await fetch_linkedin_post_stats(token, platform_post_id)
 
-            if not metrics:
-                continue
+_analytics_flight = SingleFlight("analytics_refresh", _refresh_analytics)
 
-            # Upsert into analytics table (match on post_id)
-            row = {
-                "post_id": post_id,
-                "platform": platform,
-                "views": metrics.get("views", 0),
-                "likes": metrics.get("likes", 0),
-                "comments": metrics.get("comments", 0),
-                "shares": metrics.get("shares", 0),
-                "subscribers": metrics.get("subscribers", 0),
-                "fetched_at": now,
-                "updated_at": now,
-                "post_content": (post.get("content") or "")[:200],
-            }
 
-            async with httpx.AsyncClient() as client:
-                upsert_resp = await client.post(
-                    f"{SUPABASE_URL}/rest/v1/analytics",
-                    headers={**_service_headers(), "Prefer": "resolution=merge-duplicates,return=minimal"},
-                    json=row,
-                )
-            upsert_resp.raise_for_status()
-            refreshed += 1
+async def refresh_analytics() -> None:
+    """Refresh analytics, joining the in-flight refresh if one is running.
+
+    Shared by the interval job and POST /api/analytics/refresh, so a manual
+    refresh never doubles platform API traffic.
+    """
+    await _analytics_flight.run()
+
+
+def analytics_refresh_running() -> bool:
+    return _analytics_flight.running
+
+
+def _on_job_overrun(event: JobEvent) -> None:
+    JOB_OVERRUNS.labels(job=event.job_id).inc()
+    logger.warning(
+        "Scheduler job %s skipped its %s run — previous run still in progress",
+        event.job_id, event.scheduled_run_time,
+    )
 
+
+async def _run_every(job_id: str, job, interval: float, run_now: bool = False) -> None:
+    """Run ``job`` every ``interval`` seconds on the event loop's clock.
+
+    Stands in for the APScheduler interval job under a virtual clock, with
+    the same timing: runs start on a fixed grid, and a run falling due while
+    the previous one is still going is skipped and counted in JOB_OVERRUNS
+    (max_instances=1, coalesce=True).
+    """
+    async def _once() -> None:
+        try:
+            await job()
         except Exception as e:
-            logger.warning("Analytics refresh: failed for post %s: %s", post_id, e)
+            logger.error("Scheduler job %s failed: %s", job_id, e)
 
-    logger.info("Analytics refresh complete — updated %d/%d posts", refreshed, len(posts))
+    loop = asyncio.get_running_loop()
+    next_run = loop.time() + (0 if run_now else interval)
+    running: Optional[asyncio.Task] = None
+    try:
+        while True:
+            await asyncio.sleep(max(0.0, next_run - loop.time()))
+            if running is not None and not running.done():
+                JOB_OVERRUNS.labels(job=job_id).inc()
+                logger.warning("Scheduler job %s skipped a run — previous run still in progress", job_id)
+            else:
+                running = asyncio.create_task(_once(), name=job_id)
+            next_run += interval
+    finally:
+        if running is not None:
+            running.cancel()
+            await asyncio.gather(running, return_exceptions=True)
 
 
 async def start_scheduler() -> None:
-    global _scheduler
+    global _scheduler, _due_queue, _stage_queue, _outbox, _stopping
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         logger.warning(
             "SUPABASE_URL or SUPABASE_SERVICE_KEY not set — scheduler disabled"
         )
         return
 
+    if PUBLISH_STALE_POLICY not in _STALE_POLICIES:
+        logger.warning("Unknown PUBLISH_STALE_POLICY=%r — stale posts will be published", PUBLISH_STALE_POLICY)
+
+    _outbox = open_outbox(OUTBOX_PATH)
+    if _outbox is not None:
+        _recover_outbox()
+
+    _stopping = False
+    _due_queue = DueQueue(on_due=check_and_publish_scheduled_posts)
+    _due_queue.start()
+    if PUBLISH_PRESTAGE_SECONDS > 0:
+        _stage_queue = DueQueue(on_due=_prestage_due)
+        _stage_queue.start()
+    DUE_QUEUE_DEPTH.set_function(lambda: len(_due_queue) if _due_queue is not None else 0)
+
+    # (job id, job, interval in minutes, run at start)
+    jobs = [
+        ("auto_publish", _safety_poll, PUBLISH_SAFETY_POLL_MINUTES, True),
+        ("analytics_refresh", refresh_analytics, 30, False),
+    ]
+    if clock.is_virtual():
+        # APScheduler times its jobs against the wall clock; under a virtual
+        # clock (benchmarks/simulate.py) run the same jobs on loop timers.
+        _job_tasks.extend(
+            asyncio.create_task(_run_every(job_id, job, minutes * 60, run_now=run_now))
+            for job_id, job, minutes, run_now in jobs
+        )
+        logger.info("Scheduler started on a virtual clock (%s)", clock.now().isoformat())
+        return
+
     _scheduler = AsyncIOScheduler(timezone="UTC")
-    _scheduler.add_job(
-        check_and_publish_scheduled_posts,
-        trigger="interval",
-        minutes=1,
-        id="auto_publish",
-        replace_existing=True,
-    )
-    _scheduler.add_job(
-        refresh_analytics,
-        trigger="interval",
-        minutes=30,
-        id="analytics_refresh",
-        replace_existing=True,
-    )
+    for job_id, job, minutes, run_now in jobs:
+        _scheduler.add_job(
+            job,
+            trigger="interval",
+            minutes=minutes,
+            id=job_id,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            **({"next_run_time": clock.now()} if run_now else {}),
+        )
+    _scheduler.add_listener(_on_job_overrun, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
     _scheduler.start()
-    logger.info("APScheduler started — publishing every 1 min, analytics every 30 min")
+    logger.info(
+        "APScheduler started — timer-driven publishing (safety poll every %d min), analytics every 30 min",
+        PUBLISH_SAFETY_POLL_MINUTES,
+    )
 
 
 async def stop_scheduler() -> None:
-    global _scheduler
+    global _scheduler, _due_queue, _stage_queue, _outbox, _stopping
+    _stopping = True
+    if _backlog_task is not None:
+        _backlog_task.cancel()
+        await asyncio.gather(_backlog_task, return_exceptions=True)
+    if _due_queue is not None:
+        await _due_queue.stop()
+        _due_queue = None
+    if _stage_queue is not None:
+        await _stage_queue.stop()
+        _stage_queue = None
+    for task in _job_tasks:
+        task.cancel()
+    await asyncio.gather(*_job_tasks, return_exceptions=True)
+    _job_tasks.clear()
+    if _in_flight:
+        logger.info("Waiting up to %.0fs for %d in-flight publish(es)", PUBLISH_SHUTDOWN_GRACE_SECONDS, len(_in_flight))
+        _, pending = await asyncio.wait(list(_in_flight.values()), timeout=PUBLISH_SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
     if _scheduler and _scheduler.running:
         _scheduler.shutdown(wait=False)
         logger.info("APScheduler stopped")
+    if _outbox is not None:
+        _outbox.close()
+        _outbox = None
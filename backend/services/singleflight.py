@@ -0,0 +1,72 @@
+"""Single-flight guard for scheduler jobs.
+
+A job wrapped in SingleFlight never runs twice at once in a process, no
+matter whether it was started by APScheduler, the timer queue or an API
+call. Callers arriving while a run is in flight either join it (analytics
+refresh — the in-flight run already fetches everything that is due) or get
+one coalesced follow-up run after it (publish cycle — posts that fell due
+after the in-flight run claimed its batch still need a claim).
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from services.metrics import JOB_COALESCED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Collapse concurrent calls of an async job into one run.
+
+    Args:
+        name: Job name for logs and the scheduler_job_coalesced_total metric.
+        fn: The job coroutine function.
+        rerun: If True, calls made during a run share a single follow-up run
+            instead of joining the current one.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Awaitable[T]], rerun: bool = False):
+        self.name = name
+        self._fn = fn
+        self._rerun = rerun
+        self._task: Optional[asyncio.Task] = None
+        self._next: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        # A queued follow-up counts: it starts as soon as the loop gets to it.
+        return self._next is not None or (self._task is not None and not self._task.done())
+
+    async def run(self) -> T:
+        if self._next is not None:
+            # The previous run has finished but its follow-up has not started
+            # yet; starting another run now would overlap it.
+            JOB_COALESCED.labels(job=self.name).inc()
+            logger.debug("%s follow-up pending — joining it", self.name)
+            return await asyncio.shield(self._next)
+
+        if not self.running:
+            self._task = asyncio.create_task(self._fn(), name=self.name)
+            # The starting caller owns the run: cancelling it (shutdown)
+            # cancels the job. Joiners below are shielded.
+            return await self._task
+
+        JOB_COALESCED.labels(job=self.name).inc()
+        if not self._rerun:
+            logger.info("%s already running — joining the in-flight run", self.name)
+            return await asyncio.shield(self._task)
+
+        logger.debug("%s already running — queued a follow-up run", self.name)
+        self._next = asyncio.create_task(self._follow(self._task), name=f"{self.name}-next")
+        return await asyncio.shield(self._next)
+
+    async def _follow(self, previous: asyncio.Task) -> T:
+        await asyncio.wait([previous])
+        # From here this task is the in-flight run; later callers queue behind it.
+        self._next = None
+        self._task = asyncio.current_task()
+        return await self._fn()
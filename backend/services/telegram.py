@@ -6,8 +6,113 @@ from typing import Optional
 
 import httpx
 
+from services.http_client import get_client
+from services.media import fetch_image, prepare_image, stage_upload, take_staged, upload_filename
+from services.media_cache import media_cache, media_key
+from services.rate_limit import RateLimitedError, TokenBucket, get_bucket
+
 logger = logging.getLogger(__name__)
 
+# Bot API limits: ~30 messages/s per bot overall and 20 messages/min per
+# group or channel. https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+TELEGRAM_BOT_RATE_PER_SECOND = float(os.getenv("TELEGRAM_BOT_RATE_PER_SECOND", "30"))
+TELEGRAM_CHAT_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_CHAT_RATE_PER_MINUTE", "20"))
+# How often a 429 is retried locally, and the longest retry_after we will
+# sleep through before handing the post back to the scheduler.
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_MAX_RETRY_AFTER = float(os.getenv("TELEGRAM_MAX_RETRY_AFTER", "60"))
+
+
+def _chat_bucket(bot_token: str, channel_id: str) -> TokenBucket:
+    return get_bucket(
+        "telegram:chat", f"{bot_token}:{channel_id}",
+        rate=TELEGRAM_CHAT_RATE_PER_MINUTE / 60, capacity=3,
+    )
+
+
+def _bot_bucket(bot_token: str) -> TokenBucket:
+    return get_bucket(
+        "telegram:bot", bot_token,
+        rate=TELEGRAM_BOT_RATE_PER_SECOND, capacity=TELEGRAM_BOT_RATE_PER_SECOND,
+    )
+
+
+async def _throttle(bot_token: str, channel_id: str) -> None:
+    """Wait for a slot in the chat bucket, then the bot-wide bucket."""
+    await _chat_bucket(bot_token, channel_id).acquire()
+    await _bot_bucket(bot_token).acquire()
+
+
+async def _post(
+    bot_token: str,
+    channel_id: str,
+    method: str,
+    payload: dict,
+    files: Optional[dict] = None,
+) -> httpx.Response:
+    """POST a Bot API method, pacing per bot/chat and backing off on 429.
+
+    With ``files`` the request is sent as multipart form data.
+    Returns the final response (any status other than 429).
+
+    Raises:
+        RateLimitedError: If Telegram keeps answering 429 after retries.
+    """
+    base_url = f"https://api.telegram.org/bot{bot_token}"
+    client = get_client(base_url)
+    for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+        await _throttle(bot_token, channel_id)
+        if files:
+            resp = await client.post(f"{base_url}/{method}", data=payload, files=files, timeout=60.0)
+        else:
+            resp = await client.post(f"{base_url}/{method}", json=payload, timeout=30.0)
+
+        if resp.status_code != 429:
+            return resp
+
+        try:
+            retry_after = float(resp.json().get("parameters", {}).get("retry_after", 1))
+        except ValueError:
+            retry_after = 1.0
+        if attempt == TELEGRAM_MAX_RETRIES or retry_after > TELEGRAM_MAX_RETRY_AFTER:
+            raise RateLimitedError(
+                "telegram", retry_after,
+                f"Telegram flood control for {channel_id}: retry after {retry_after:.0f}s",
+            )
+        logger.warning(
+            "Telegram 429 for %s — backing off %.1fs (attempt %d/%d)",
+            channel_id, retry_after, attempt + 1, TELEGRAM_MAX_RETRIES,
+        )
+        _chat_bucket(bot_token, channel_id).pause(retry_after)
+    return resp
+
+
+async def _send_cached_photo(
+    bot_token: str, channel_id: str, fields: dict, cache_key: tuple,
+) -> Optional[httpx.Response]:
+    """Send a photo by a cached file_id; None if there is none or it was rejected."""
+    file_id = media_cache.get(cache_key)
+    if not file_id:
+        return None
+    resp = await _post(bot_token, channel_id, "sendPhoto", {**fields, "photo": file_id})
+    if resp.status_code != 400:
+        return resp
+    logger.info("Telegram rejected cached file_id for %s — uploading again", channel_id)
+    media_cache.discard(cache_key)
+    return None
+
+
+async def stage_photo(bot_token: str, image_url: str) -> None:
+    """Get ``image_url`` ready for a send that is due soon.
+
+    Nothing to do if the bot already has a cached file_id for the URL;
+    otherwise the image is downloaded and fitted now, so send_message only
+    has to upload it.
+    """
+    if media_cache.get(media_key("telegram", bot_token, image_url)):
+        return
+    await stage_upload(image_url, "telegram")
+
 
 async def send_message(
     bot_token: str,
@@ -18,6 +123,16 @@ async def send_message(
 ) -> dict:
     """Send a message (optionally with image) to a Telegram channel.
 
+    Requests are paced per bot and per chat. A 429 pauses the chat's bucket
+    for ``retry_after`` seconds and the send is retried.
+
+    Images are downloaded, fitted to Telegram's photo limits and uploaded as
+    multipart. The ``file_id`` Telegram returns is cached per bot under both
+    the URL and the content hash and reused for later sends; a rejected id
+    is evicted and the image uploaded again. If the image cannot be
+    downloaded locally, Telegram is asked to fetch the URL itself. An image
+    prepared by stage_photo() is uploaded as is.
+
     Args:
         bot_token: Telegram Bot API token.
         channel_id: Channel username (@channel) or numeric ID.
@@ -30,34 +145,48 @@ async def send_message(
 
     Raises:
         httpx.HTTPStatusError: If Telegram API returns an error.
+        RateLimitedError: If Telegram keeps answering 429 after retries.
     """
-    base_url = f"https://api.telegram.org/bot{bot_token}"
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        if image_url:
-            resp = await client.post(
-                f"{base_url}/sendPhoto",
-                json={
-                    "chat_id": channel_id,
-                    "photo": image_url,
-                    "caption": text,
-                    "parse_mode": parse_mode,
-                },
-            )
-        else:
-            resp = await client.post(
-                f"{base_url}/sendMessage",
-                json={
-                    "chat_id": channel_id,
-                    "text": text,
-                    "parse_mode": parse_mode,
-                },
-            )
+    cache_keys = []
+    if image_url:
+        fields = {"chat_id": channel_id, "caption": text, "parse_mode": parse_mode}
+        cache_keys.append(media_key("telegram", bot_token, image_url))
+        resp = await _send_cached_photo(bot_token, channel_id, fields, cache_keys[0])
+        if resp is None:
+            staged = take_staged(image_url, "telegram")
+            digest = staged[2] if staged else None
+            if staged is None:
+                try:
+                    source, digest = await fetch_image(image_url)
+                except Exception as e:
+                    logger.warning("Could not download %s (%s) — sending it by URL", image_url, e)
+                    resp = await _post(bot_token, channel_id, "sendPhoto", {**fields, "photo": image_url})
+            if digest is not None:
+                cache_keys.append(media_key("telegram", bot_token, digest))
+                resp = await _send_cached_photo(bot_token, channel_id, fields, cache_keys[1])
+                if resp is None:
+                    data, content_type = staged[:2] if staged else await prepare_image(source, "telegram")
+                    resp = await _post(
+                        bot_token, channel_id, "sendPhoto", fields,
+                        files={"photo": (upload_filename(content_type), data, content_type)},
+                    )
+    else:
+        resp = await _post(bot_token, channel_id, "sendMessage", {
+            "chat_id": channel_id,
+            "text": text,
+            "parse_mode": parse_mode,
+        })
 
     resp.raise_for_status()
     result = resp.json()
     if not result.get("ok"):
         raise ValueError(f"Telegram API error: {result.get('description', 'Unknown error')}")
 
+    # Largest size is last; its file_id refers to the same stored file.
+    photos = result.get("result", {}).get("photo") or []
+    if photos and photos[-1].get("file_id"):
+        for cache_key in cache_keys:
+            media_cache.put(cache_key, photos[-1]["file_id"])
+
     logger.info("Telegram message sent to %s", channel_id)
     return result
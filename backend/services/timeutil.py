@@ -0,0 +1,28 @@
+"""Timestamp parsing shared by the scheduler, recurrence engine and routers."""
+
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+
+def parse_ts(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Supabase/ISO-8601 timestamp into an aware UTC datetime.
+
+    Postgres trims trailing zeros from fractional seconds and clients may
+    send a trailing "Z", neither of which datetime.fromisoformat() accepts
+    on Python 3.10, so both are normalised first. Naive values are UTC.
+    Returns None for empty or unparseable values.
+    """
+    if not value:
+        return None
+    text = value.strip().replace("Z", "+00:00")
+    text = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
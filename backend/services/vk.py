@@ -1,61 +1,201 @@
 """VK API integration — post text/images to groups and user walls."""
 
 import logging
-from typing import Optional
+import os
+from typing import Any, Dict, Optional
 
-import httpx
+from services.http_client import get_client
+from services.media import fetch_image, prepare_image, upload_filename
+from services.media_cache import media_cache, media_key
+from services.rate_limit import RateLimitedError, TokenBucket, get_bucket
 
 logger = logging.getLogger(__name__)
 
 _VK_API = "https://api.vk.com/method"
 _VK_API_VERSION = "5.199"
 
+# VK allows 3 requests/s per user token (20/s for community tokens).
+# https://dev.vk.com/en/api/api-requests#Restrictions%20and%20recommendations
+VK_RATE_PER_SECOND = float(os.getenv("VK_RATE_PER_SECOND", "3"))
+VK_MAX_RETRIES = int(os.getenv("VK_MAX_RETRIES", "4"))
+_VK_TOO_MANY_REQUESTS = 6
+
+# Token → id of the user it belongs to, for posts to the token's own wall.
+_user_ids: Dict[str, str] = {}
+
+
+def _token_bucket(access_token: str) -> TokenBucket:
+    return get_bucket("vk:token", access_token, rate=VK_RATE_PER_SECOND, capacity=VK_RATE_PER_SECOND)
+
+
+async def call_method(access_token: str, method: str, params: Dict[str, Any]) -> Any:
+    """Call a VK API method and return its ``response`` payload.
+
+    Requests are paced per access token. VK error 6 ("Too many requests per
+    second") pauses the token's bucket with exponential backoff and retries.
+
+    Args:
+        access_token: VK API access token.
+        method: Method name, e.g. "wall.post".
+        params: Method parameters (token and API version are added).
+
+    Returns:
+        The ``response`` field of the VK reply.
+
+    Raises:
+        httpx.HTTPStatusError: On HTTP errors.
+        ValueError: On VK API logical errors.
+        RateLimitedError: If VK keeps returning error 6 after retries.
+    """
+    data = {**params, "access_token": access_token, "v": _VK_API_VERSION}
+    client = get_client(_VK_API)
+    bucket = _token_bucket(access_token)
+    for attempt in range(VK_MAX_RETRIES + 1):
+        await bucket.acquire()
+        resp = await client.post(f"{_VK_API}/{method}", data=data, timeout=30.0)
+
+        resp.raise_for_status()
+        result = resp.json()
+
+        error = result.get("error")
+        if not error or error.get("error_code") != _VK_TOO_MANY_REQUESTS:
+            break
+        backoff = 2.0 ** attempt
+        if attempt == VK_MAX_RETRIES:
+            raise RateLimitedError("vk", backoff, f"VK API error 6: {error.get('error_msg')}")
+        logger.warning(
+            "VK rate limit hit on %s — backing off %.1fs (attempt %d/%d)",
+            method, backoff, attempt + 1, VK_MAX_RETRIES,
+        )
+        bucket.pause(backoff)
+
+    if "error" in result:
+        error = result["error"]
+        raise ValueError(f"VK API error {error.get('error_code')}: {error.get('error_msg')}")
+    return result.get("response")
+
+
+async def token_owner_id(access_token: str) -> str:
+    """Id of the user an access token belongs to (users.get), cached per token.
+
+    Raises:
+        httpx.HTTPStatusError: On HTTP errors.
+        ValueError: On VK API logical errors, or for a community token.
+    """
+    user_id = _user_ids.get(access_token)
+    if user_id is None:
+        users = await call_method(access_token, "users.get", {})
+        if not users:
+            raise ValueError("VK token has no user wall — set the account's channel_id to the group id")
+        user_id = str(users[0]["id"])
+        _user_ids[access_token] = user_id
+    return user_id
+
+
+async def upload_wall_photo(access_token: str, owner_id: Optional[str], image_url: str) -> str:
+    """Upload an image to a wall's photo album and return its attachment id.
+
+    Uses the photos.getWallUploadServer → multipart upload →
+    photos.saveWallPhoto flow. The resulting ``photo{owner}_{id}`` is cached
+    per token and wall under both the image URL and its content hash, so
+    re-sending or cross-posting the same image uploads it once, and a photo
+    uploaded ahead of time (the scheduler's pre-staging) is reused without
+    downloading the image again.
+
+    Raises:
+        httpx.HTTPError: If the download or upload fails.
+        ValueError: On VK API logical errors or unusable images.
+        RateLimitedError: If VK keeps returning error 6 after retries.
+    """
+    url_key = media_key("vk", access_token, f"{owner_id or ''}:{image_url}")
+    attachment = media_cache.get(url_key)
+    if attachment:
+        return attachment
+
+    source, digest = await fetch_image(image_url)
+    cache_key = media_key("vk", access_token, f"{owner_id or ''}:{digest}")
+    attachment = media_cache.get(cache_key)
+    if attachment:
+        media_cache.put(url_key, attachment)
+        return attachment
+
+    # Community walls are addressed by group_id; user walls need no params.
+    group: dict = {}
+    if owner_id and str(owner_id).startswith("-"):
+        group["group_id"] = str(owner_id)[1:]
+
+    server = await call_method(access_token, "photos.getWallUploadServer", group)
+    data, content_type = await prepare_image(source, "vk")
+
+    upload_url = server["upload_url"]
+    client = get_client(upload_url)
+    resp = await client.post(
+        upload_url,
+        files={"photo": (upload_filename(content_type), data, content_type)},
+        timeout=60.0,
+    )
+    resp.raise_for_status()
+    uploaded = resp.json()
+    if not uploaded.get("photo") or uploaded["photo"] == "[]":
+        raise ValueError(f"VK photo upload returned no photo: {uploaded.get('error', uploaded)}")
+
+    saved = await call_method(access_token, "photos.saveWallPhoto", {
+        **group,
+        "server": uploaded["server"],
+        "photo": uploaded["photo"],
+        "hash": uploaded["hash"],
+    })
+    attachment = f"photo{saved[0]['owner_id']}_{saved[0]['id']}"
+    media_cache.put(cache_key, attachment)
+    media_cache.put(url_key, attachment)
+    logger.info("VK photo uploaded: %s", attachment)
+    return attachment
+
 
 async def post_to_vk(
     access_token: str,
     owner_id: Optional[str],
     text: str,
     image_url: Optional[str] = None,
+    guid: Optional[str] = None,
 ) -> dict:
     """Post content to VK wall.
 
     Args:
         access_token: VK API access token with wall.post permission.
         owner_id: Group ID (negative, e.g. "-123456") or user ID.
-                  If None, posts to the authenticated user's wall.
+                  If None, posts to the authenticated user's wall, whose
+                  id is looked up so the returned owner_id is always set.
         text: Post text.
-        image_url: Optional image URL (public URL for attachment).
+        image_url: Optional image URL; uploaded as a wall photo attachment.
+        guid: Optional idempotency key; VK does not create a second post
+              when a wall.post with the same guid is repeated.
 
     Returns:
-        VK API response dict with post ID.
+        Dict with VK post_id, the owner_id it was posted to and status.
 
     Raises:
         httpx.HTTPStatusError: On HTTP errors.
         ValueError: On VK API logical errors.
+        RateLimitedError: If VK keeps returning error 6 after retries.
     """
     params: dict = {
-        "access_token": access_token,
         "message": text,
-        "v": _VK_API_VERSION,
         "from_group": 1,
     }
 
-    if owner_id:
-        params["owner_id"] = owner_id
-
     if image_url:
-        params["attachments"] = image_url
+        params["attachments"] = await upload_wall_photo(access_token, owner_id, image_url)
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(f"{_VK_API}/wall.post", data=params)
+    if not owner_id:
+        owner_id = await token_owner_id(access_token)
+    params["owner_id"] = owner_id
 
-    resp.raise_for_status()
-    result = resp.json()
+    if guid:
+        params["guid"] = guid
 
-    if "error" in result:
-        error = result["error"]
-        raise ValueError(f"VK API error {error.get('error_code')}: {error.get('error_msg')}")
+    response = await call_method(access_token, "wall.post", params)
 
-    post_id = result.get("response", {}).get("post_id")
+    post_id = (response or {}).get("post_id")
     logger.info("VK post published, post_id=%s owner_id=%s", post_id, owner_id)
-    return {"post_id": post_id, "status": "published"}
+    return {"post_id": post_id, "owner_id": owner_id, "status": "published"}
@@ -0,0 +1,23 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+# Tests import backend modules the way main.py does (services.*, benchmarks.*).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import clock  # noqa: E402
+
+
+@pytest.fixture
+def virtual_clock():
+    """A VirtualClock routed through services.clock, and a loop that runs on it."""
+    virtual = clock.VirtualClock(datetime(2026, 1, 5, tzinfo=timezone.utc))
+    clock.use_virtual_clock(virtual)
+    loop = virtual.new_event_loop()
+    try:
+        yield virtual, loop
+    finally:
+        loop.close()
+        clock.use_virtual_clock(None)
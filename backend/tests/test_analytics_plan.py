@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+from services import scheduler
+
+NOW = datetime(2026, 10, 20, 12, tzinfo=timezone.utc)
+
+
+def _post(post_id, platform, platform_post_id=None, fetched_at=None):
+    return {
+        "id": post_id,
+        "platform": platform,
+        "platform_post_id": platform_post_id,
+        "published_at": (NOW - timedelta(days=3)).isoformat(),
+        "analytics": {"fetched_at": fetched_at.isoformat()} if fetched_at else None,
+    }
+
+
+def test_unfetchable_posts_are_not_planned():
+    assert scheduler._analytics_fetchable(_post("1", "telegram"))
+    assert scheduler._analytics_fetchable(_post("2", "linkedin", "urn:li:share:1"))
+    assert scheduler._analytics_fetchable(_post("3", "vk", "-100_5"))
+    assert not scheduler._analytics_fetchable(_post("4", "linkedin"))
+    assert not scheduler._analytics_fetchable(_post("5", "vk", "5"))
+    assert not scheduler._analytics_fetchable(_post("6", "vk"))
+
+
+def test_missed_fetch_ages_like_fetched_at():
+    never = _post("never-fetched", "telegram")
+    assert scheduler._refresh_priority(never, NOW) == float("inf")
+
+    scheduler._analytics_missed["never-fetched"] = NOW - timedelta(minutes=10)
+    try:
+        # Tried 10 minutes ago; a 3-day-old post refreshes hourly.
+        assert scheduler._refresh_priority(never, NOW) is None
+        fetched = _post("fetched", "telegram", fetched_at=NOW - timedelta(hours=2))
+        assert scheduler._refresh_priority(fetched, NOW + timedelta(hours=1)) > scheduler._refresh_priority(
+            never, NOW + timedelta(hours=1)
+        )
+    finally:
+        scheduler._analytics_missed.clear()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import scheduler
+
+NOW = datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def triage(monkeypatch):
+    monkeypatch.setattr(scheduler, "PUBLISH_CATCHUP_AFTER_SECONDS", 300)
+    monkeypatch.setattr(scheduler, "PUBLISH_CATCHUP_BURST", 2)
+    monkeypatch.setattr(scheduler, "PUBLISH_CATCHUP_SPACING_SECONDS", 60)
+    monkeypatch.setattr(scheduler, "PUBLISH_STALE_AFTER_MINUTES", 60)
+    monkeypatch.setattr(scheduler, "PUBLISH_STALE_POLICY", "skip")
+    monkeypatch.setattr(scheduler, "_catchup_slots", {})
+    monkeypatch.setattr(scheduler, "_held_back", set())
+    return scheduler._triage_overdue
+
+
+def _post(post_id, overdue, account="a"):
+    return {"id": post_id, "account_id": account, "scheduled_at": (NOW - overdue).isoformat()}
+
+
+def test_stale_and_catchup_split(triage):
+    rows = [
+        _post("on-time", timedelta(minutes=1)),
+        _post("stale", timedelta(hours=2)),
+        *(_post(f"late-{i}", timedelta(minutes=30)) for i in range(4)),
+        _post("other", timedelta(minutes=30), account="b"),
+    ]
+    publish_now, stale, deferred = triage(rows, NOW)
+
+    assert [p["id"] for p in publish_now] == ["on-time", "late-0", "late-1", "other"]
+    assert [p["id"] for p in stale] == ["stale"]
+    assert deferred == {NOW + timedelta(minutes=1): ["late-2"], NOW + timedelta(minutes=2): ["late-3"]}
+
+
+def test_spacing_carries_over_to_next_chunk(triage):
+    triage([_post(f"late-{i}", timedelta(minutes=30)) for i in range(3)], NOW)
+    _, _, deferred = triage([_post("late-3", timedelta(minutes=30))], NOW)
+    assert deferred == {NOW + timedelta(minutes=2): ["late-3"]}
+
+
+def test_held_back_posts_are_not_spread_or_stale(triage):
+    scheduler._held_back.update({"held-0", "held-1", "held-2"})
+    rows = [_post("held-0", timedelta(hours=2)), *(_post(f"held-{i}", timedelta(minutes=30)) for i in (1, 2))]
+    publish_now, stale, deferred = triage(rows, NOW)
+    assert [p["id"] for p in publish_now] == ["held-0", "held-1", "held-2"]
+    assert not stale and not deferred
@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+_REQUEST = httpx.Request("POST", "https://api.example.com/send")
+
+
+def _status_error(status):
+    return httpx.HTTPStatusError("error", request=_REQUEST, response=httpx.Response(status, request=_REQUEST))
+
+
+async def _call(breaker, exc=None):
+    async with breaker.guard():
+        if exc is not None:
+            raise exc
+
+
+async def _fail(breaker, exc):
+    with pytest.raises(type(exc)):
+        await _call(breaker, exc)
+
+
+def test_opens_after_threshold_and_fails_fast(virtual_clock):
+    _, loop = virtual_clock
+
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_seconds=60)
+        for _ in range(2):
+            await _fail(breaker, httpx.ConnectError("down"))
+        assert breaker.state == CLOSED
+        await _fail(breaker, _status_error(503))
+        assert breaker.state == OPEN
+
+        await asyncio.sleep(20)
+        with pytest.raises(CircuitOpenError) as info:
+            await _call(breaker)
+        assert info.value.retry_after == pytest.approx(40)
+
+    loop.run_until_complete(main())
+
+
+def test_half_open_probe_closes_or_reopens(virtual_clock):
+    _, loop = virtual_clock
+
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=60, half_open_probes=1)
+        await _fail(breaker, httpx.ReadTimeout("slow"))
+        await asyncio.sleep(60)
+        assert breaker.state == HALF_OPEN
+
+        # A failed probe opens the breaker again for a full recovery period.
+        await _fail(breaker, _status_error(500))
+        assert breaker.state == OPEN
+        await asyncio.sleep(59)
+        assert breaker.state == OPEN
+        await asyncio.sleep(1)
+
+        release = asyncio.Event()
+
+        async def probe():
+            async with breaker.guard():
+                await release.wait()
+
+        task = asyncio.ensure_future(probe())
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await _call(breaker)  # only one probe at a time
+        release.set()
+        await task
+        assert breaker.state == CLOSED
+
+    loop.run_until_complete(main())
+
+
+def test_client_errors_and_local_errors_do_not_open(virtual_clock):
+    _, loop = virtual_clock
+
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        await _fail(breaker, httpx.ConnectError("down"))
+        # A 4xx means the upstream answered, which resets the count.
+        await _fail(breaker, _status_error(400))
+        await _fail(breaker, httpx.ConnectError("down"))
+        assert breaker.state == CLOSED
+        # Errors raised before anything is sent count neither way.
+        await _fail(breaker, ValueError("bad payload"))
+        assert breaker.state == CLOSED
+        await _fail(breaker, httpx.ConnectError("down"))
+        assert breaker.state == OPEN
+
+    loop.run_until_complete(main())
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from benchmarks.fakes import SUPABASE_HOST, FakeUpstreams
+from services import http_client, scheduler
+
+SUPABASE_URL = f"https://{SUPABASE_HOST}"
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    monkeypatch.setattr(scheduler, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(scheduler, "SUPABASE_SERVICE_KEY", "service")
+    monkeypatch.setattr(scheduler, "_due_queue", None)
+    monkeypatch.setattr(scheduler, "_in_flight_by_account", {})
+    monkeypatch.setattr(scheduler, "_held_back", set())
+    return FakeUpstreams()
+
+
+def _run(upstreams, coro_fn):
+    async def main():
+        await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle))
+        try:
+            return await coro_fn()
+        finally:
+            await http_client.close_clients()
+
+    return asyncio.run(main())
+
+
+def test_claim_skips_posts_no_longer_due(monkeypatch, upstreams):
+    now = datetime.now(timezone.utc)
+    due = (now - timedelta(minutes=1)).isoformat()
+    upstreams.db.tables["posts"] = [
+        {"id": p, "account_id": p, "platform": "telegram", "status": "scheduled", "scheduled_at": due}
+        for p in ("due", "rescheduled", "deferred")
+    ]
+
+    triage = scheduler._triage_overdue
+
+    def edit_after_scan(rows, when):
+        # Another request moves two posts between the scan and the claim.
+        posts = {p["id"]: p for p in upstreams.db.tables["posts"]}
+        posts["rescheduled"]["scheduled_at"] = (now + timedelta(hours=1)).isoformat()
+        posts["deferred"]["next_attempt_at"] = (now + timedelta(minutes=10)).isoformat()
+        return triage(rows, when)
+
+    monkeypatch.setattr(scheduler, "_triage_overdue", edit_after_scan)
+    claimed, _ = _run(upstreams, scheduler._claim_due_posts)
+
+    assert [p["id"] for p in claimed] == ["due"]
+    status = {p["id"]: p["status"] for p in upstreams.db.tables["posts"]}
+    assert status == {"due": "publishing", "rescheduled": "scheduled", "deferred": "scheduled"}
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.due_queue import DueQueue
+
+T0 = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+async def _noop():
+    pass
+
+
+def _at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def test_pop_due_in_time_order():
+    queue = DueQueue(on_due=_noop)
+    for post_id, minutes in (("c", 30), ("a", 10), ("d", 40), ("b", 20)):
+        queue.schedule(post_id, _at(minutes))
+
+    assert queue.next_due() == _at(10).timestamp()
+    assert queue.pop_due(_at(25).timestamp()) == ["a", "b"]
+    assert queue.pop_due(_at(60).timestamp()) == ["c", "d"]
+    assert len(queue) == 0
+
+
+def test_reschedule_and_cancel_leave_only_live_entries():
+    queue = DueQueue(on_due=_noop)
+    queue.schedule("moved", _at(10))
+    queue.schedule("cancelled", _at(20))
+    queue.schedule("kept", _at(30))
+    queue.schedule("moved", _at(50))
+    queue.cancel("cancelled")
+
+    assert len(queue) == 2
+    assert queue.next_due() == _at(30).timestamp()
+    assert queue.pop_due(_at(40).timestamp()) == ["kept"]
+    assert queue.pop_due(_at(60).timestamp()) == ["moved"]
+
+
+def test_fires_at_due_time(virtual_clock):
+    virtual, loop = virtual_clock
+    fired = []
+
+    async def on_due():
+        fired.append(virtual.now())
+
+    async def main():
+        queue = DueQueue(on_due=on_due)
+        queue.start()
+        queue.schedule("later", _at(30))
+        await asyncio.sleep(60)
+        # An earlier post scheduled while the queue waits re-arms its timer.
+        queue.schedule("sooner", _at(5))
+        await asyncio.sleep(30 * 60)
+        await queue.stop()
+
+    loop.run_until_complete(main())
+    assert fired == [_at(5), _at(30)]
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_light_accounts_not_stuck_behind_heavy_one(tmp_path):
+    # One account bulk-schedules a Telegram channel, which its per-chat rate
+    # limit drains at 20/min; posts of other accounts due a minute later must
+    # not wait for that backlog.
+    posts = [
+        {"account_id": "heavy", "platform": "telegram", "content": f"bulk {i}",
+         "scheduled_at": "2026-01-05T10:00:00+00:00"}
+        for i in range(120)
+    ]
+    posts += [
+        {"account_id": f"light-{i}", "platform": "telegram", "content": "hi",
+         "scheduled_at": "2026-01-05T10:01:00+00:00"}
+        for i in range(5)
+    ]
+    posts_file = tmp_path / "posts.json"
+    posts_file.write_text(json.dumps(posts))
+    dump = tmp_path / "out.json"
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.simulate",
+            "--posts-file", str(posts_file), "--dump-posts", str(dump),
+            "--drain-minutes", "30", "--latency", "0.5", "--json",
+        ],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    light = [p for p in json.loads(dump.read_text()) if p["account_id"].startswith("light-")]
+    assert [p["status"] for p in light] == ["published"] * 5
+    for post in light:
+        lag = datetime.fromisoformat(post["published_at"]) - datetime.fromisoformat(post["scheduled_at"])
+        assert lag.total_seconds() < 15
+
+
+def test_bulk_single_channel_completes_at_chat_rate(tmp_path):
+    bulk = 150
+    dump = tmp_path / "out.json"
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.simulate",
+            "--posts", "100", "--accounts", "10", "--days", "1", "--bulk", str(bulk),
+            "--start", "2026-01-05T00:00:00+00:00", "--dump-posts", str(dump), "--json",
+        ],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["statuses"] == {"published": 100 + bulk}
+
+    lags = {"bulk": [], "other": []}
+    for post in json.loads(dump.read_text()):
+        lag = datetime.fromisoformat(post["published_at"]) - datetime.fromisoformat(post["scheduled_at"])
+        lags["bulk" if post["account_id"] == "bulk" else "other"].append(lag.total_seconds())
+    # Telegram's per-chat limit is 20 posts/min; allow a minute on top.
+    assert max(lags["bulk"]) <= bulk / 20 * 60 + 60
+    assert max(lags["other"]) < 15
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.fakes import SUPABASE_HOST, FakeUpstreams
+from routers import posts as posts_router
+from services import http_client, scheduler
+
+SUPABASE_URL = f"https://{SUPABASE_HOST}"
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    monkeypatch.setattr(scheduler, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(scheduler, "SUPABASE_SERVICE_KEY", "service")
+    monkeypatch.setattr(posts_router, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(posts_router, "SUPABASE_KEY", "anon")
+    monkeypatch.setattr(scheduler, "_due_queue", None)
+    return FakeUpstreams()
+
+
+def _run(upstreams, coro_fn):
+    async def main():
+        await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle))
+        try:
+            return await coro_fn()
+        finally:
+            await http_client.close_clients()
+
+    return asyncio.run(main())
+
+
+def _interrupted(post_id, platform, started_ago):
+    now = datetime.now(timezone.utc)
+    return {
+        "id": post_id,
+        "platform": platform,
+        "status": "publishing",
+        "publish_key": "key",
+        "publish_started_at": (now - started_ago).isoformat(),
+        "lease_owner": "dead-worker",
+        "lease_expires_at": (now - timedelta(minutes=1)).isoformat(),
+    }
+
+
+def test_vk_resend_only_within_dedupe_window(upstreams):
+    upstreams.db.tables["posts"] = [
+        _interrupted("recent-vk", "vk", timedelta(minutes=10)),
+        _interrupted("old-vk", "vk", timedelta(hours=2)),
+        _interrupted("telegram", "telegram", timedelta(minutes=10)),
+    ]
+    _run(upstreams, scheduler._recover_expired_leases)
+
+    status = {p["id"]: p["status"] for p in upstreams.db.tables["posts"]}
+    assert status == {"recent-vk": "scheduled", "old-vk": "failed", "telegram": "dead_letter"}
+
+
+def test_update_does_not_reset_a_post_mid_publish(upstreams):
+    post = _interrupted("p1", "telegram", timedelta(seconds=5))
+    post["attempts"] = 2
+    upstreams.db.tables["posts"] = [post]
+
+    update = posts_router.PostUpdate(status="scheduled", content="edited")
+    with pytest.raises(HTTPException) as err:
+        _run(upstreams, lambda: posts_router.update_post("p1", update, None))
+
+    assert err.value.status_code == 409
+    assert post["status"] == "publishing"
+    assert post["attempts"] == 2 and post["publish_key"] == "key"
+
+
+def test_rescheduled_post_interrupted_mid_send_is_not_reported_published(upstreams):
+    post = {
+        "id": "p2",
+        "platform": "telegram",
+        "status": "published",
+        "content": "first version",
+        "platform_post_id": "41",
+        "publish_key": "old-key",
+    }
+    upstreams.db.tables["posts"] = [post]
+
+    update = posts_router.PostUpdate(status="scheduled", content="second version")
+    _run(upstreams, lambda: posts_router.update_post("p2", update, None))
+    assert post["platform_post_id"] is None
+
+    # The next attempt is claimed, started, and its worker dies mid-send.
+    post.update(_interrupted("p2", "telegram", timedelta(minutes=2)))
+    _run(upstreams, scheduler._recover_expired_leases)
+    assert post["status"] == "dead_letter"
+
+    # Even a stale id left on the row does not count as this attempt's post.
+    post.update(_interrupted("p2", "telegram", timedelta(minutes=2)), platform_post_id="41")
+    _run(upstreams, scheduler._recover_expired_leases)
+    assert post["status"] == "dead_letter"
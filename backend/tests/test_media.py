@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fakes import IMAGE_URL, FakeUpstreams
+from services import http_client, media
+
+
+def _fetch(upstreams, url, handler=None):
+    async def main():
+        transport = httpx.MockTransport(handler or upstreams.handle)
+        await http_client.open_clients(transport=transport, resolver=upstreams.resolve)
+        try:
+            return await media.fetch_image(url)
+        finally:
+            await http_client.close_clients()
+
+    media._downloads.clear()
+    return asyncio.run(main())
+
+
+def test_public_image_is_downloaded_without_growing_the_client_registry():
+    upstreams = FakeUpstreams()
+    data, _ = _fetch(upstreams, IMAGE_URL)
+    assert data.startswith(b"\x89PNG")
+    assert "https://images.bench" not in http_client._clients
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/latest/meta-data",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::ffff:10.0.0.1]/x.png",
+    "file:///etc/passwd",
+    "https://internal.bench/x.png",
+])
+def test_non_public_targets_are_refused(url):
+    upstreams = FakeUpstreams(addresses={"internal.bench": "10.1.2.3"})
+    with pytest.raises(ValueError):
+        _fetch(upstreams, url)
+    assert not upstreams.calls
+
+
+def test_redirect_to_a_private_host_is_refused():
+    upstreams = FakeUpstreams(addresses={"internal.bench": "192.168.0.10"})
+
+    async def handler(request):
+        if request.url.host == "images.bench":
+            upstreams.calls[request.url.host] += 1
+            return httpx.Response(302, headers={"location": "https://internal.bench/secret"})
+        return await upstreams.handle(request)
+
+    with pytest.raises(ValueError):
+        _fetch(upstreams, IMAGE_URL, handler)
+    assert upstreams.calls == {"images.bench": 1}
+
+
+def test_oversized_body_is_cut_off(monkeypatch):
+    monkeypatch.setattr(media, "MEDIA_MAX_DOWNLOAD_BYTES", 16)
+    with pytest.raises(ValueError):
+        _fetch(FakeUpstreams(), IMAGE_URL)
@@ -0,0 +1,18 @@
+import pytest
+
+from services import metrics
+
+
+@pytest.mark.parametrize("host,label", [
+    ("api.telegram.org", "telegram"),
+    ("api.vk.com", "vk"),
+    ("api.linkedin.com", "linkedin"),
+    ("abc.supabase.co", "supabase"),
+    ("db.example.net", "supabase"),
+    ("images.example.com", "other"),
+    ("evil-telegram.org", "other"),
+    ("", "other"),
+])
+def test_upstream_label(monkeypatch, host, label):
+    monkeypatch.setattr(metrics, "_SUPABASE_HOST", "db.example.net")
+    assert metrics.upstream_label(host) == label
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from benchmarks.fakes import SUPABASE_HOST, FakeUpstreams, HostProfile
+from services import http_client, scheduler
+from services.outbox import Outbox
+
+SUPABASE_URL = f"https://{SUPABASE_HOST}"
+_DOWN = HostProfile(latency=0, error_rate=1.0, error_status=503)
+
+
+@pytest.fixture
+def upstreams(monkeypatch, tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(scheduler, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(scheduler, "SUPABASE_SERVICE_KEY", "service")
+    monkeypatch.setattr(scheduler, "_due_queue", None)
+    monkeypatch.setattr(scheduler, "_outbox", outbox)
+    monkeypatch.setattr(scheduler, "OUTBOX_OFFLINE_PUBLISH", True)
+    monkeypatch.setattr(scheduler, "_supabase_failures", scheduler.OUTBOX_OFFLINE_AFTER_FAILURES)
+    monkeypatch.setattr(scheduler, "_retry_delay", lambda attempts: 0.0)
+    yield FakeUpstreams()
+    outbox.close()
+
+
+def _run(upstreams, coro_fn):
+    async def main():
+        await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle))
+        try:
+            return await coro_fn()
+        finally:
+            await http_client.close_clients()
+
+    return asyncio.run(main())
+
+
+def _post(post_id, **fields):
+    now = datetime.now(timezone.utc)
+    return {
+        "id": post_id,
+        "platform": "telegram",
+        "account_id": None,
+        "content": "hello",
+        "scheduled_at": now.isoformat(),
+        "attempts": 0,
+        **fields,
+    }
+
+
+def _started(post_id):
+    now = datetime.now(timezone.utc)
+    return _post(
+        post_id,
+        status="publishing",
+        lease_owner=scheduler.SCHEDULER_WORKER_ID,
+        lease_expires_at=(now + timedelta(minutes=5)).isoformat(),
+        publish_key=f"key-{post_id}",
+        publish_started_at=now.isoformat(),
+    )
+
+
+def test_only_started_posts_are_sent_offline_and_replayed(upstreams):
+    started = _started("started")
+    prefetched = _post("prefetched", status="scheduled")
+    upstreams.db.tables["posts"] = [dict(started), dict(prefetched)]
+    scheduler._outbox.store_post(prefetched, datetime.now(timezone.utc).timestamp())
+
+    async def outage():
+        upstreams.profiles[SUPABASE_HOST] = _DOWN
+        await scheduler._handle_publish_failure(dict(started), httpx.ConnectError("reset"))
+        await scheduler._publish_offline()
+        upstreams.profiles.pop(SUPABASE_HOST)
+        return await scheduler._replay_outbox()
+
+    assert _run(upstreams, outage)
+    assert upstreams.calls["api.telegram.org"] == 1
+    rows = {p["id"]: p for p in upstreams.db.tables["posts"]}
+    assert rows["started"]["status"] == "published"
+    assert rows["started"]["platform_post_id"]
+    assert rows["prefetched"]["status"] == "scheduled"
+    assert not scheduler._outbox.has_pending_updates()
+
+
+def test_replay_skips_posts_changed_since_the_attempt(upstreams):
+    # Rescheduled through the API after the offline send, which clears the key.
+    upstreams.db.tables["posts"] = [_post("edited", status="scheduled", publish_key=None)]
+    update = {**scheduler._published_update("42"), "publish_key": "key-edited"}
+    scheduler._outbox.queue_update("edited", update)
+    scheduler._outbox.queue_update("edited", update)
+
+    assert _run(upstreams, scheduler._replay_outbox)
+    assert upstreams.db.tables["posts"][0]["status"] == "scheduled"
+    assert not scheduler._outbox.has_pending_updates()
+
+
+def test_held_post_with_expired_lease_is_not_sent(upstreams):
+    started = _started("expired")
+    started["lease_expires_at"] = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    upstreams.db.tables["posts"] = [dict(started)]
+
+    async def outage():
+        upstreams.profiles[SUPABASE_HOST] = _DOWN
+        await scheduler._handle_publish_failure(dict(started), httpx.ConnectError("reset"))
+        await scheduler._publish_offline()
+
+    _run(upstreams, outage)
+    assert not upstreams.calls["api.telegram.org"]
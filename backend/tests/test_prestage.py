@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from benchmarks.fakes import SUPABASE_HOST, FakeUpstreams
+from services import accounts, http_client, scheduler
+
+SUPABASE_URL = f"https://{SUPABASE_HOST}"
+
+
+@pytest.fixture
+def staged(monkeypatch):
+    monkeypatch.setattr(scheduler, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(scheduler, "SUPABASE_SERVICE_KEY", "service")
+    monkeypatch.setattr(accounts, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(accounts, "SUPABASE_SERVICE_KEY", "service")
+    monkeypatch.setattr(accounts, "_cache", {})
+    monkeypatch.setattr(scheduler, "_due_queue", None)
+    monkeypatch.setattr(scheduler, "_outbox", None)
+    monkeypatch.setattr(scheduler, "_staged", {})
+    return scheduler._staged
+
+
+def _post(post_id, account_id="acct"):
+    return {"id": post_id, "platform": "telegram", "account_id": account_id, "content": "hi", "status": "scheduled"}
+
+
+def _stage(staged, post, account, staged_at):
+    staged[post["id"]] = {
+        "fingerprint": scheduler._stage_fingerprint(post),
+        "account": account,
+        "staged_at": staged_at,
+    }
+
+
+def test_post_and_account_changes_drop_staged_entries(staged):
+    now = datetime.now(timezone.utc)
+    for post_id, account_id in (("edited", "a"), ("other", "a"), ("kept", "b")):
+        _stage(staged, _post(post_id, account_id), {"id": account_id}, now)
+
+    scheduler.notify_post_changed({**_post("edited", "a"), "content": "new"})
+    assert set(staged) == {"other", "kept"}
+    scheduler.notify_account_changed("a")
+    assert set(staged) == {"kept"}
+
+
+def test_claim_rereads_account_staged_too_long_ago(monkeypatch, staged):
+    upstreams = FakeUpstreams()
+    upstreams.db.tables["publisher_accounts"] = [{"id": "acct", "token": "new"}]
+    now = datetime.now(timezone.utc)
+    fresh, old = _post("fresh"), _post("old")
+    _stage(staged, fresh, {"id": "acct", "token": "staged"}, now)
+    _stage(staged, old, {"id": "acct", "token": "staged"}, now - timedelta(hours=1))
+
+    started = {}
+    monkeypatch.setattr(scheduler, "_start_publish", lambda post, account: started.update({post["id"]: account}))
+
+    async def main():
+        await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle))
+        try:
+            await scheduler._publish_batch([fresh, old])
+        finally:
+            await http_client.close_clients()
+
+    asyncio.run(main())
+    assert started["fresh"]["token"] == "staged"
+    assert started["old"]["token"] == "new"
@@ -0,0 +1,27 @@
+import httpx
+
+from services import scheduler
+
+TOKEN = "123456:SECRET-bot-token"
+
+
+def _status_error(status, body):
+    request = httpx.Request("POST", f"https://api.telegram.org/bot{TOKEN}/sendMessage")
+    response = httpx.Response(status, json=body, request=request)
+    return httpx.HTTPStatusError(f"Client error '{status}' for url '{request.url}'", request=request, response=response)
+
+
+def test_last_error_keeps_platform_description_but_not_the_url():
+    exc = _status_error(400, {"ok": False, "description": "Bad Request: chat not found"})
+    update = scheduler._failure_update({"id": "p1", "platform": "telegram", "attempts": 0}, exc)
+    assert update["status"] == "failed"
+    assert update["last_error"] == "HTTP 400 from api.telegram.org: Bad Request: chat not found"
+
+
+def test_transport_errors_name_only_the_host():
+    request = httpx.Request("POST", f"https://api.telegram.org/bot{TOKEN}/sendPhoto")
+    exc = httpx.ConnectError(f"connect failed for {request.url}", request=request)
+    update = scheduler._failure_update({"id": "p2", "platform": "telegram", "attempts": 0}, exc)
+    assert update["status"] == "scheduled"
+    assert TOKEN not in update["last_error"]
+    assert update["last_error"] == "ConnectError talking to api.telegram.org"
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from services.rate_limit import TokenBucket
+
+
+def _acquire_times(loop, bucket, count, pause_after=None):
+    async def main():
+        start = loop.time()
+        times = []
+        for i in range(count):
+            await bucket.acquire()
+            times.append(round(loop.time() - start, 3))
+            if pause_after == i:
+                bucket.pause(30)
+        return times
+
+    return loop.run_until_complete(asyncio.wait_for(main(), 3600))
+
+
+def test_burst_then_refill_rate(virtual_clock):
+    _, loop = virtual_clock
+    bucket = TokenBucket(rate=20 / 60, capacity=3)
+    assert _acquire_times(loop, bucket, 6) == [0, 0, 0, 3, 6, 9]
+
+
+def test_pause_drains_bucket(virtual_clock):
+    _, loop = virtual_clock
+    bucket = TokenBucket(rate=1, capacity=5)
+    # Paused after the second token: nothing for 30 s, then the refill rate
+    # from an empty bucket, not the burst that was left.
+    assert _acquire_times(loop, bucket, 4, pause_after=1) == [0, 0, 31, 32]
+
+
+def test_rounding_deficit_does_not_spin(virtual_clock):
+    # At 30 tokens/s refills leave float deficits whose wait is below the
+    # loop clock's resolution; each wait must still move time forward.
+    _, loop = virtual_clock
+    bucket = TokenBucket(rate=30, capacity=30)
+    times = _acquire_times(loop, bucket, 330)
+    assert times[-1] == pytest.approx(10, abs=0.1)
+
+
+def test_waiters_served_in_order(virtual_clock):
+    _, loop = virtual_clock
+    bucket = TokenBucket(rate=1, capacity=1)
+    served = []
+
+    async def waiter(i):
+        await bucket.acquire()
+        served.append(i)
+
+    async def main():
+        await asyncio.gather(*(waiter(i) for i in range(5)))
+
+    loop.run_until_complete(main())
+    assert served == [0, 1, 2, 3, 4]
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from services import clock
+from services.recurrence import occurrences
+
+UTC = timezone.utc
+
+
+def test_cron_fires_on_starts_at():
+    schedule = {"rule": "0 10 * * *", "timezone": "UTC", "starts_at": "2026-10-20T10:00:00+00:00"}
+    after = datetime(2026, 10, 20, 10, tzinfo=UTC) - timedelta(microseconds=1)
+    assert occurrences(schedule, after, limit=2) == [
+        datetime(2026, 10, 20, 10, tzinfo=UTC),
+        datetime(2026, 10, 21, 10, tzinfo=UTC),
+    ]
+
+
+def test_cron_and_rrule_agree():
+    base = {"timezone": "Europe/Moscow", "starts_at": "2026-10-20T07:00:00Z"}
+    after = datetime(2026, 10, 19, tzinfo=UTC)
+    cron = occurrences({**base, "rule": "0 10 * * *"}, after, limit=3)
+    rrule = occurrences({**base, "rule": "FREQ=DAILY;BYHOUR=10;BYMINUTE=0;BYSECOND=0"}, after, limit=3)
+    assert cron == rrule
+
+
+def test_cursor_is_exclusive():
+    schedule = {"rule": "0 10 * * *", "timezone": "UTC", "starts_at": "2026-10-20T10:00:00+00:00"}
+    after = datetime(2026, 10, 20, 10, tzinfo=UTC)
+    assert occurrences(schedule, after, limit=1) == [datetime(2026, 10, 21, 10, tzinfo=UTC)]
+
+
+def test_rrule_without_starts_at_anchors_to_created_at():
+    # Expanded window by window, the way the scheduler's safety poll does.
+    schedule = {"rule": "FREQ=DAILY", "timezone": "UTC", "created_at": "2026-10-20T09:30:37.123+00:00"}
+    virtual = clock.VirtualClock(datetime(2026, 10, 20, 9, 31, tzinfo=UTC))
+    clock.use_virtual_clock(virtual)
+    try:
+        found = []
+        cursor = virtual.now()
+        for _ in range(3 * 24 * 6):
+            virtual.advance(600)
+            horizon = virtual.now() + timedelta(minutes=70)
+            found += occurrences(schedule, cursor, until=horizon)
+            cursor = horizon
+    finally:
+        clock.use_virtual_clock(None)
+    assert found[:3] == [
+        datetime(2026, 10, 21, 9, 30, tzinfo=UTC),
+        datetime(2026, 10, 22, 9, 30, tzinfo=UTC),
+        datetime(2026, 10, 23, 9, 30, tzinfo=UTC),
+    ]
@@ -0,0 +1,45 @@
+import asyncio
+
+from services.singleflight import SingleFlight
+
+
+def _tracked():
+    state = {"active": 0, "peak": 0, "runs": 0}
+
+    async def job():
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        state["runs"] += 1
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            state["active"] -= 1
+        return state["runs"]
+
+    return state, job
+
+
+def test_many_callers_run_one_at_a_time():
+    state, job = _tracked()
+    flight = SingleFlight("test", job, rerun=True)
+
+    async def caller(delay):
+        await asyncio.sleep(delay)
+        await flight.run()
+
+    async def main():
+        await asyncio.gather(*(caller(i * 0.003) for i in range(30)))
+
+    asyncio.run(main())
+    assert state["peak"] == 1
+
+
+def test_join_returns_the_in_flight_result():
+    state, job = _tracked()
+    flight = SingleFlight("test", job)
+
+    async def main():
+        return await asyncio.gather(*(flight.run() for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert state["runs"] == 1
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from services.timeutil import parse_ts
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("2026-01-05T10:00:00Z", datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+    ("2026-01-05T10:00:00.5+00:00", datetime(2026, 1, 5, 10, 0, 0, 500000, tzinfo=timezone.utc)),
+    ("2026-01-05T12:00:00+02:00", datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+    ("2026-01-05T10:00:00", datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+    ("", None),
+    (None, None),
+    ("not a date", None),
+])
+def test_parse_ts(value, expected):
+    assert parse_ts(value) == expected
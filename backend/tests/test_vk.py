@@ -0,0 +1,27 @@
+import asyncio
+
+import httpx
+
+from benchmarks.fakes import FakeUpstreams
+from services import http_client
+from services.vk import post_to_vk
+
+
+def test_post_to_own_wall_returns_owner_id():
+    upstreams = FakeUpstreams()
+
+    async def main():
+        await http_client.open_clients(transport=httpx.MockTransport(upstreams.handle))
+        try:
+            first = await post_to_vk("user-token", None, "hello")
+            second = await post_to_vk("user-token", None, "again")
+            group = await post_to_vk("user-token", "-42", "group post")
+        finally:
+            await http_client.close_clients()
+        return first, second, group
+
+    first, second, group = asyncio.run(main())
+    assert first["owner_id"] == second["owner_id"] == "1000"
+    assert group["owner_id"] == "-42"
+    # The owner id is looked up once per token.
+    assert upstreams.calls["api.vk.com"] == 4
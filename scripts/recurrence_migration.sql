@@ -0,0 +1,41 @@
+-- Recurring schedules migration v2.5
+-- Run once in Supabase SQL editor: https://app.supabase.com → SQL Editor
+-- Requires scheduler_migration.sql.
+
+-- 1. Recurring schedules
+--    rule is an iCalendar RRULE ("FREQ=WEEKLY;BYDAY=MO;BYHOUR=10;BYMINUTE=0")
+--    or a five-field cron expression ("0 10 * * mon"), evaluated in the IANA
+--    timezone. The scheduler creates posts for occurrences inside its
+--    look-ahead window only; expanded_until records how far it has got.
+CREATE TABLE IF NOT EXISTS recurring_schedules (
+    id             UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    name           TEXT,
+    rule           TEXT NOT NULL,
+    timezone       TEXT NOT NULL DEFAULT 'UTC',
+    starts_at      TIMESTAMPTZ,
+    ends_at        TIMESTAMPTZ,
+    platform       TEXT NOT NULL,
+    account_id     UUID,
+    content        TEXT NOT NULL,
+    image_url      TEXT,
+    utm_params     JSONB,
+    active         BOOLEAN NOT NULL DEFAULT TRUE,
+    expanded_until TIMESTAMPTZ,
+    created_at     TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS recurring_schedules_expansion_idx ON recurring_schedules (expanded_until)
+    WHERE active;
+
+-- 2. Occurrences are ordinary posts linked to their schedule. The unique
+--    index lets concurrent expansions upsert with ignore-duplicates; posts
+--    without a schedule (NULL recurrence_id) are unaffected.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS recurrence_id UUID
+    REFERENCES recurring_schedules(id) ON DELETE SET NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS posts_recurrence_occurrence_key ON posts (recurrence_id, scheduled_at);
+
+-- 3. RLS — authenticated users manage schedules, the scheduler (service role) expands them
+ALTER TABLE recurring_schedules ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "recurring_schedules_access" ON recurring_schedules;
+CREATE POLICY "recurring_schedules_access" ON recurring_schedules
+    FOR ALL USING (auth.role() IN ('authenticated', 'service_role'));
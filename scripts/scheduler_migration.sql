@@ -0,0 +1,32 @@
+-- Scheduler migration v2.4
+-- Run once in Supabase SQL editor: https://app.supabase.com → SQL Editor
+
+-- 1. Publish leases
+--    Replicas claim due posts by flipping status scheduled → publishing and
+--    stamping who holds the post and until when. Expired leases are returned
+--    to "scheduled" by the next scheduler cycle on any replica.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS lease_owner      TEXT;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+-- 2. Indexes for the due-post claim and lease recovery queries
+CREATE INDEX IF NOT EXISTS posts_status_scheduled_at_idx ON posts (status, scheduled_at);
+CREATE INDEX IF NOT EXISTS posts_publishing_lease_idx ON posts (lease_expires_at)
+    WHERE status = 'publishing';
+
+-- 3. Publish retries
+--    Transient failures go back to "scheduled" with next_attempt_at set;
+--    permanent ones end in "failed", exhausted retries in "dead_letter".
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS attempts        INTEGER DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS last_error      TEXT;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+
+-- 4. Publish time, used to age-weight analytics refreshes
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS published_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS posts_published_id_idx ON posts (id) WHERE status = 'published';
+
+-- 5. Crash-safe publishing
+--    publish_key is a stable idempotency key per post (sent to VK as guid);
+--    publish_started_at is stamped right before the platform call, so lease
+--    recovery can tell never-sent posts from interrupted sends.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS publish_key        TEXT;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS publish_started_at TIMESTAMPTZ;